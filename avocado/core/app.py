@@ -41,9 +41,10 @@ class AvocadoApp:
         os.environ['LIBC_FATAL_STDERR_'] = '1'
 
         def sigterm_handler(signum, frame):     # pylint: disable=W0613
-            children = process.get_children_pids(os.getpid())
-            for child in children:
-                process.kill_process_tree(int(child), sig=signal.SIGKILL)
+            table = process.ProcessTable()
+            for child in table.get_children_pids(os.getpid()):
+                process.kill_process_tree(child, sig=signal.SIGKILL,
+                                          table=table, pidfd=True)
             raise SystemExit('Terminated')
 
         signal.signal(signal.SIGTERM, sigterm_handler)
@@ -0,0 +1,398 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+asyncio based execution of tests which only wrap an executable
+
+Tests like :class:`avocado.core.test.SimpleTest` spend nearly all their
+time waiting for a command.  Instead of using a test process (and a
+:class:`avocado.utils.process.SubProcess` with its drainer threads) per
+test, this engine executes the commands of many tests at once from a
+single event loop in the runner process.
+
+Once the command finishes, the test itself is executed in the runner
+process, except that the command is not executed again: its recorded
+output is logged and its result is used (see
+:meth:`avocado.core.test.SimpleTest._run_cmd`).  The test logs, output
+check and statuses are therefore the same as with the process engine,
+only the test log is written once the command finished.
+"""
+
+import asyncio
+import collections
+import contextlib
+import os
+import signal
+import subprocess
+import time
+
+from . import defaults
+from . import test
+from . import unittestbatch
+from .loader import loader
+from .output import LOG_JOB
+from .settings import settings
+from ..utils import astring
+from ..utils import process
+from ..utils import runtime
+
+
+#: Test execution engines
+ENGINES = ('process', 'asyncio')
+
+#: Loggers (and log prefixes) used for the streams of the commands, the
+#: same ones used by :func:`avocado.utils.process.run`
+_STREAMS = collections.OrderedDict((
+    ('stdout', ('[stdout] %s', process.stdout_log)),
+    ('stderr', ('[stderr] %s', process.stderr_log)),
+    ('output', ('[output] %s', process.output_log))))
+
+
+def is_async_capable(test_factory):
+    """
+    Whether the command of the test can be executed by the event loop
+
+    :param test_factory: Test factory (test class and parameters)
+    """
+    test_class = test_factory[0]
+    return (isinstance(test_class, type) and
+            issubclass(test_class, test.SimpleTest) and
+            test_class.ASYNC_COMMAND)
+
+
+class CommandOutput:
+
+    """
+    Output of a test command executed by the event loop
+    """
+
+    def __init__(self, command, combined=False):
+        """
+        :param command: the command line
+        :param combined: whether the stdout and stderr are combined into
+                         a single stream (used by the output check)
+        """
+        self.command = command
+        self.combined = combined
+        #: list of tuple(stream name, data) in the order they were read
+        self.chunks = []
+        self.exit_status = None
+        self.pid = None
+        self.time_start = time.time()
+        self.duration = 0
+        self.interrupted = False
+        #: Exception raised when the command could not be executed
+        self.error = None
+
+    def add_data(self, fd, data):
+        """
+        Records data read from the stdout (1) or stderr (2) of the command
+        """
+        if self.combined:
+            name = 'output'
+        elif fd == 1:
+            name = 'stdout'
+        else:
+            name = 'stderr'
+        self.chunks.append((name, data))
+
+    @staticmethod
+    def _log_lines(name, data):
+        prefix, stream_logger = _STREAMS[name]
+        for line in data.splitlines():
+            line = astring.to_text(line, defaults.ENCODING, 'replace')
+            process.log.debug(prefix, line)
+            stream_logger.debug(line)
+
+    def replay(self):
+        """
+        Logs the command output the same way :func:`process.run` does
+
+        :return: the command result
+        :rtype: :class:`avocado.utils.process.CmdResult`
+        :raise OSError: when the command could not be executed
+        """
+        process.log.info("Running '%s'", self.command)
+        if self.error is not None:
+            raise self.error
+        data = collections.defaultdict(list)
+        buffers = collections.defaultdict(bytes)
+        for name, chunk in self.chunks:
+            data[name].append(chunk)
+            buffers[name] += chunk
+            if chunk.endswith(b'\n'):
+                self._log_lines(name, buffers.pop(name))
+        for name in _STREAMS:
+            if buffers.get(name):
+                self._log_lines(name, buffers[name])
+        process.log.info("Command '%s' finished with %s after %ss",
+                         self.command, self.exit_status, self.duration)
+        if self.combined:
+            stdout = b''.join(data['output'])
+        else:
+            stdout = b''.join(data['stdout'])
+        result = process.CmdResult(self.command, stdout,
+                                   b''.join(data['stderr']),
+                                   self.exit_status, self.duration,
+                                   self.pid, defaults.ENCODING)
+        result.interrupted = self.interrupted
+        return result
+
+
+class _CommandProtocol(asyncio.SubprocessProtocol):
+
+    """
+    Records the output of the command and signals its end
+    """
+
+    def __init__(self, output, finished):
+        self.output = output
+        self.finished = finished
+
+    def pipe_data_received(self, fd, data):
+        self.output.add_data(fd, data)
+
+    def connection_lost(self, exc):
+        # Called once the process exited and all its pipes were closed
+        if not self.finished.done():
+            self.finished.set_result(None)
+
+
+@contextlib.contextmanager
+def isolated():
+    """
+    Restores the process wide state changed by a test
+
+    Tests are written to be executed in their own process, but this
+    engine loads and executes them in the runner process.
+    """
+    environ = os.environ.copy()
+    output_check_mode = process.OUTPUT_CHECK_RECORD_MODE
+    # :class:`avocado.core.test.Test` wraps the warning methods
+    log_methods = {name: LOG_JOB.__dict__.get(name)
+                   for name in ('warn', 'warning')}
+    try:
+        yield
+    finally:
+        runtime.CURRENT_TEST = None
+        for name, method in log_methods.items():
+            if method is None:
+                LOG_JOB.__dict__.pop(name, None)
+            else:
+                setattr(LOG_JOB, name, method)
+        process.OUTPUT_CHECK_RECORD_MODE = output_check_mode
+        os.environ.clear()
+        os.environ.update(environ)
+
+
+class AsyncTestSlot:
+
+    """
+    Book-keeping of a test whose command is executed by the event loop
+    """
+
+    def __init__(self, index, test_factory, loop):
+        """
+        Loads the test (in the runner process)
+
+        :param index: Position of the test in the job (0 based)
+        :param test_factory: Test factory (test class and parameters)
+        :param loop: the event loop executing the command
+        :type loop: :class:`asyncio.AbstractEventLoop`
+        """
+        self.index = index
+        self.loop = loop
+        with isolated():
+            self.instance = loader.load_test(test_factory)
+            #: Warning method installed by the test
+            self._log_warning = LOG_JOB.__dict__.get('warning')
+        self.early_status = self.instance.get_state()
+        self.early_status['early_status'] = True
+        self.time_started = time.time()
+        #: Test execution deadline
+        self.deadline = None
+        #: Deadline to finish the command (set once it's interrupted)
+        self.finish_deadline = None
+        self.abort_reason = None
+        self.start_reported = False
+        #: Resolved once the command finishes
+        self.finished = asyncio.Future(loop=loop)
+        #: The recorded command output (None when there is no command)
+        self.output = None
+        self.transport = None
+        #: The final test state
+        self.test_state = None
+        # The command waiting for the record of a batch (if any)
+        self._pending_command = None
+
+    @property
+    def pid(self):
+        """
+        PID of the command (None when it's not running)
+        """
+        if self.transport is None or self.finished.done():
+            return None
+        return self.transport.get_pid()
+
+    def start(self):
+        """
+        Starts the command of the test on the event loop
+        """
+        if self.finished.done():    # Given up while waiting for a record
+            return
+        command = None
+        if (isinstance(self.instance, test.SimpleTest) and
+                self.instance.ASYNC_COMMAND and
+                self.instance._command_output is None):
+            command = self.instance._get_command()
+        if command is not None:
+            recorded = self.instance._pop_recorded_output(command[0],
+                                                          command[1],
+                                                          wait=False)
+            if recorded is unittestbatch.PENDING:
+                self._pending_command = command
+                self.loop.call_later(unittestbatch.POLL_INTERVAL, self.start)
+                return
+            self._pending_command = None
+            if recorded is not None:
+                self.instance._command_output = recorded
+                command = None
+        if command is None:     # Nothing to wait for
+            self.finished.set_result(None)
+            return
+        command, env, cwd = command
+        # The test log is opened (created) before the command is executed
+        # in the test process and commands might rely on it
+        open(self.instance.logfile, 'a').close()
+        combined = self.instance.get_data('output.expected') is not None
+        self.output = CommandOutput(command, combined)
+        cmd_env = os.environ.copy()
+        cmd_env.update(self.instance._get_environment_variables())
+        if env:
+            cmd_env.update(env)
+        try:
+            args = process.cmd_split(command)
+        except ValueError as details:
+            self.output.error = details
+            self.finished.set_result(None)
+            return
+        if combined:
+            stderr = subprocess.STDOUT
+        else:
+            stderr = subprocess.PIPE
+        protocol = _CommandProtocol(self.output, self.finished)
+        task = self.loop.create_task(self.loop.subprocess_exec(
+            lambda: protocol, *args, stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=stderr, env=cmd_env, cwd=cwd))
+        task.add_done_callback(self._command_started)
+
+    def _command_started(self, task):
+        error = task.exception()
+        if error is not None:
+            if isinstance(error, OSError) and error.strerror:
+                error.strerror += " (%s)" % self.output.command
+            self.output.error = error
+            if not self.finished.done():
+                self.finished.set_result(None)
+            return
+        self.transport = task.result()[0]
+        self.output.pid = self.transport.get_pid()
+        if self.finished.done():    # Given up in the meantime
+            process.kill_process_tree(self.output.pid, signal.SIGKILL)
+            self.transport.close()
+
+    def abort(self, reason, sig):
+        """
+        Interrupt the command
+
+        :param reason: Reason recorded in the test results
+        :param sig: Signal to be sent to the command (process tree)
+        """
+        self.abort_reason = reason
+        if self._pending_command is not None:     # Never started
+            self.output = CommandOutput(self._pending_command[0])
+            self._pending_command = None
+            self.finished.set_result(None)
+        if self.output is not None:
+            self.output.interrupted = reason
+        if self.pid is not None:
+            process.kill_process_tree(self.pid, sig)
+        self.finish_deadline = time.time() + settings.get_value(
+            'runner.timeout',
+            'after_interrupted',
+            key_type=int,
+            default=defaults.TIMEOUT_AFTER_INTERRUPTED)
+
+    def give_up(self):
+        """
+        Kill the command and stop waiting for it
+        """
+        if self.pid is not None:
+            process.kill_process_tree(self.pid, signal.SIGKILL)
+        if self.transport is not None:
+            self.transport.close()
+        if not self.finished.done():
+            self.finished.set_result(None)
+
+    def finish(self):
+        """
+        Executes the test (using the recorded output of its command)
+
+        :return: the final test state
+        :rtype: dict
+        """
+        instance = self.instance
+        if self.output is not None:
+            if self.transport is not None:
+                self.output.exit_status = self.transport.get_returncode()
+                self.transport.close()
+            self.output.duration = time.time() - self.output.time_start
+            instance._command_output = self.output
+        with isolated():
+            if self._log_warning is not None:
+                LOG_JOB.warn = LOG_JOB.warning = self._log_warning
+            runtime.CURRENT_TEST = instance
+            instance.run_avocado()
+            # The test really started together with its command
+            instance.time_start = self.time_started
+            instance.time_elapsed = instance.time_end - instance.time_start
+            # Measured in the runner process, which is not the command's
+            instance.resources = None
+            return instance.get_state()
+
+
+def wait_for_slots(loop, slots):
+    """
+    Run the event loop until any of the commands finishes, one of the
+    deadlines is reached or at most for a second (to keep the progress
+    updated)
+
+    :param loop: the event loop executing the commands
+    :param slots: running tests
+    :type slots: list of :class:`AsyncTestSlot`
+    """
+    now = time.time()
+    timeout = 1.0
+    futures = []
+    for slot in slots:
+        if slot.finished.done():
+            return
+        futures.append(slot.finished)
+        if slot.finish_deadline is None:
+            timeout = min(timeout, slot.deadline - now)
+        else:
+            timeout = min(timeout, slot.finish_deadline - now)
+    if futures:
+        loop.run_until_complete(asyncio.wait(
+            futures, timeout=max(timeout, 0),
+            return_when=asyncio.FIRST_COMPLETED))
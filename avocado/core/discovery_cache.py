@@ -0,0 +1,270 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Persistent cache of the tests discovered in Python modules
+
+The discovery of the Python tests (see :mod:`safeloader`) parses the
+modules and the modules defining their parent classes.  Its results are
+stored in the avocado data dir, along with the modification time, size
+and content digest of each of the parsed modules, so the following
+discoveries only parse the modules which (or whose parents) changed.
+The modules are only read (and hashed) when their modification time or
+size changed.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import sys
+
+from . import data_dir
+from . import safeloader
+from .output import LOG_JOB
+from .settings import settings
+from .version import VERSION
+
+
+#: Name of the discovery cache file (in the avocado data dir)
+CACHE_FILENAME = 'discovery_cache.json'
+
+#: Results produced by other versions are not used
+SALT = "%s-py%s.%s" % (VERSION, sys.version_info[0], sys.version_info[1])
+
+
+def is_enabled():
+    """
+    Whether the discovery cache is enabled in the settings
+    """
+    return settings.get_value('loader', 'discovery_cache', key_type=bool,
+                              default=True)
+
+
+def get_signature(path, previous=None):
+    """
+    Signature of a file, which changes when the file does
+
+    :param previous: signature of the file known to be valid when it had
+                     the same modification time and size, so the content
+                     is only read (and hashed) when they differ
+    :return: list(modification time, size, content digest) or None when
+             the file can't be read
+    """
+    try:
+        stat = os.stat(path)
+        if previous is not None and previous[:2] == [stat.st_mtime,
+                                                     stat.st_size]:
+            return previous
+        with open(path, 'rb') as source_file:
+            digest = hashlib.sha1(source_file.read()).hexdigest()
+    except (IOError, OSError):
+        return None
+    return [stat.st_mtime, stat.st_size, digest]
+
+
+def _avocado_tests_to_json(result):
+    tests, disabled = result
+    classes = []
+    for klass, info in tests.items():
+        methods = []
+        for method, tags in info:
+            tags = collections.OrderedDict(
+                (key, None if value is None else sorted(value))
+                for key, value in tags.items())
+            methods.append([method, tags])
+        classes.append([klass, methods])
+    return {'classes': classes, 'disabled': sorted(disabled)}
+
+
+def _avocado_tests_from_json(content):
+    tests = collections.OrderedDict()
+    for klass, methods in content['classes']:
+        info = []
+        for method, tags in methods:
+            tags = {key: None if value is None else set(value)
+                    for key, value in tags.items()}
+            info.append((method, tags))
+        tests[klass] = info
+    return tests, set(content['disabled'])
+
+
+def _python_unittests_to_json(result):
+    return [[klass, list(methods)] for klass, methods in result.items()]
+
+
+def _python_unittests_from_json(content):
+    return collections.OrderedDict((klass, methods)
+                                   for klass, methods in content)
+
+
+class DiscoveryCache:
+
+    """
+    Tests discovered in Python modules by previous discoveries
+
+    Each entry is valid as long as all the modules parsed to produce it
+    have the same signature (see :func:`get_signature`).
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: path of the cache file (defaults to
+                     :data:`CACHE_FILENAME` in the avocado data dir)
+        """
+        if path is None:
+            path = data_dir.get_datafile_path(CACHE_FILENAME)
+        self.path = path
+        self._entries = None
+        #: Whether there are entries not stored yet
+        self.modified = False
+        # Keys of the entries added since :meth:`pop_new_entries`
+        self._new = set()
+        # Signatures of the modules already checked, the modules defining
+        # the parent classes are usually shared by many others
+        self._signatures = {}
+
+    @property
+    def entries(self):
+        """
+        "kind:module path" -> {"deps": {path: signature}, "result": ...},
+        loaded when first needed
+        """
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, 'r') as cache_file:
+                    content = json.load(cache_file)
+            except (IOError, OSError, ValueError):
+                return self._entries
+            if isinstance(content, dict) and content.get('salt') == SALT:
+                self._entries = content.get('entries', {})
+        return self._entries
+
+    def save(self):
+        """
+        Stores the cache when modified (errors are only logged, the cache
+        is just an optimization)
+        """
+        if not self.modified:
+            return
+        # Entries of removed modules are dropped
+        for key in list(self.entries):
+            if not os.path.exists(key.split(':', 1)[1]):
+                del self.entries[key]
+        tmp_path = "%s.%s.tmp" % (self.path, os.getpid())
+        try:
+            content = json.dumps({'salt': SALT, 'entries': self.entries})
+            with open(tmp_path, 'w') as cache_file:
+                cache_file.write(content)
+            os.rename(tmp_path, self.path)
+            self.modified = False
+        except (IOError, OSError) as details:
+            LOG_JOB.debug("Unable to store the discovery cache in %s: %s",
+                          self.path, details)
+
+    def _get_signature(self, path, previous=None):
+        if path not in self._signatures:
+            self._signatures[path] = get_signature(path, previous)
+        return self._signatures[path]
+
+    def _lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        for path, signature in entry['deps'].items():
+            current = self._get_signature(path, signature)
+            if current is None or current[2] != signature[2]:
+                return None
+            if current != signature:
+                # Same content (eg. touched), stored so it's not hashed by
+                # the following discoveries
+                entry['deps'][path] = current
+                self.modified = True
+        return entry['result']
+
+    def _discover(self, kind, function, path, to_json, from_json):
+        key = "%s:%s" % (kind, os.path.abspath(path))
+        content = self._lookup(key)
+        if content is not None:
+            return from_json(content)
+        with safeloader.record_parsed_paths() as parsed:
+            result = function(path)
+        self._store(key, parsed, to_json(result))
+        return result
+
+    def _store(self, key, paths, content):
+        """
+        Adds the entry, unless any of the files it depends on can't be read
+        """
+        deps = {}
+        for dep in paths:
+            signature = self._get_signature(dep)
+            if signature is None:
+                return
+            deps[dep] = signature
+        self.entries[key] = {'deps': deps, 'result': content}
+        self.modified = True
+        self._new.add(key)
+
+    def pop_new_entries(self):
+        """
+        Returns the entries added since the last call, so the ones added
+        by other processes can be merged by :meth:`update`
+        """
+        new = {key: self.entries[key] for key in self._new}
+        self._new = set()
+        return new
+
+    def update(self, entries):
+        """
+        Adds the entries (see :meth:`pop_new_entries`)
+        """
+        if entries:
+            self.entries.update(entries)
+            self.modified = True
+
+    def find_avocado_tests(self, path):
+        """
+        Cached :func:`avocado.core.safeloader.find_avocado_tests`
+        """
+        return self._discover('avocado', safeloader.find_avocado_tests, path,
+                              _avocado_tests_to_json, _avocado_tests_from_json)
+
+    def find_python_unittests(self, path):
+        """
+        Cached :func:`avocado.core.safeloader.find_python_unittests`
+        """
+        return self._discover('unittest', safeloader.find_python_unittests,
+                              path, _python_unittests_to_json,
+                              _python_unittests_from_json)
+
+    def find_file_tests(self, kind, function, path):
+        """
+        Cached ``function(path)``, for the discoveries whose results only
+        depend on the content of the file, such as the ones of the loader
+        plugins
+
+        :param kind: kind of discovery (different for each function)
+        :param function: function returning the JSON serializable tests
+                         of the file
+        :param path: path of the file
+        """
+        abs_path = os.path.abspath(path)
+        key = "%s:%s" % (kind, abs_path)
+        content = self._lookup(key)
+        if content is not None:
+            return content
+        result = function(path)
+        self._store(key, [abs_path], result)
+        return result
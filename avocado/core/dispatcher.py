@@ -21,12 +21,17 @@ dispatcher that these depend upon:
 """
 
 import copy
+import os
+import queue
 import sys
+import threading
+import time
 
 from stevedore import EnabledExtensionManager
 
 from .settings import settings
 from .settings import SettingsError
+from .output import LOG_JOB
 from .output import LOG_UI
 from ..utils import stacktrace
 
@@ -224,12 +229,175 @@ class ResultDispatcher(Dispatcher):
         super(ResultDispatcher, self).__init__('avocado.plugins.result')
 
 
+class _BackgroundEvents:
+
+    """
+    Delivers the events of one result events plugin from a worker thread
+
+    Events are queued (in order) on a bounded queue.  While the queue is
+    full, "test_progress" events are dropped and the other events make
+    the runner wait (they are reported as late).  A "test_progress"
+    event is not queued while another one is still waiting to be
+    delivered, as the plugin would only report the same progress twice.
+    """
+
+    def __init__(self, ext, queue_size):
+        """
+        :param ext: the plugin extension
+        :type ext: :class:`stevedore.extension.Extension`
+        :param queue_size: maximum number of queued events
+        """
+        self.ext = ext
+        self.queue = queue.Queue(queue_size)
+        self.thread = None
+        self._progress_pending = False
+        #: Number of "test_progress" events dropped on a full queue
+        self.dropped = 0
+        #: Number of events which had to wait for room in the queue
+        self.late = 0
+        #: Number of "test_progress" events merged into a pending one
+        self.coalesced = 0
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            method_name, args = event
+            if method_name == 'test_progress':
+                self._progress_pending = False
+            try:
+                getattr(self.ext.obj, method_name)(*args)
+            except:     # catch any exception pylint: disable=W0702
+                stacktrace.log_exc_info(sys.exc_info(),
+                                        logger='avocado.app.debug')
+                LOG_UI.error('Error running method "%s" of plugin "%s": %s',
+                             method_name, self.ext.name, sys.exc_info()[1])
+
+    def put(self, method_name, args):
+        """
+        Queues an event, starting the worker thread when needed
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run,
+                                           name="result-events-%s"
+                                           % self.ext.name)
+            self.thread.daemon = True
+            self.thread.start()
+        if method_name == 'test_progress':
+            if self._progress_pending:
+                self.coalesced += 1
+                return
+            try:
+                self._progress_pending = True
+                self.queue.put_nowait((method_name, args))
+            except queue.Full:
+                self._progress_pending = False
+                self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait((method_name, args))
+        except queue.Full:
+            self.late += 1
+            self.queue.put((method_name, args))
+
+    def flush(self):
+        """
+        Waits until all the queued events are delivered
+
+        :return: seconds spent waiting for the plugin
+        """
+        if self.thread is None:
+            return 0
+        start = time.time()
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        return time.time() - start
+
+
 class ResultEventsDispatcher(Dispatcher):
 
+    """
+    Delivers the test result events to the result events plugins
+
+    Plugins listed in the ``background`` key of the
+    ``plugins.result_events`` section get the events from their own
+    thread, so slow plugins (eg. ones sending results over the network)
+    don't delay the execution of the tests.  Those plugins are flushed
+    when the "post_tests" event is delivered.
+    """
+
     def __init__(self, args):
         super(ResultEventsDispatcher, self).__init__(
             'avocado.plugins.result_events',
             invoke_kwds={'args': args})
+        background = settings.get_value(self.settings_section(),
+                                        'background', key_type=list,
+                                        default=[])
+        queue_size = settings.get_value(self.settings_section(),
+                                        'queue_size', key_type=int,
+                                        default=1000)
+        #: Plugins executed in the background (by name)
+        self.background = {ext.name: _BackgroundEvents(ext, queue_size)
+                            for ext in self.extensions
+                            if ext.name in background}
+        self._pid = os.getpid()
+
+    def map_method(self, method_name, *args):
+        """
+        Maps method_name on each extension in case the extension has the attr
+
+        Extensions executed in the background get the event queued, the
+        "post_tests" event also waits for them to handle all the events.
+
+        :param method_name: Name of the method to be called on each ext
+        :param args: Arguments to be passed to all called functions
+        """
+        # The worker threads don't exist in the test processes (forked
+        # from the runner), which deliver the events right away
+        if not self.background or os.getpid() != self._pid:
+            return super(ResultEventsDispatcher, self).map_method(method_name,
+                                                                  *args)
+        # The test states are updated by the runner after the events
+        queued_args = tuple(dict(arg) if isinstance(arg, dict) else arg
+                            for arg in args)
+        for ext in self.extensions:
+            if not hasattr(ext.obj, method_name):
+                continue
+            background = self.background.get(ext.name)
+            if background is not None:
+                background.put(method_name, queued_args)
+                continue
+            try:
+                getattr(ext.obj, method_name)(*args)
+            except SystemExit:
+                raise
+            except KeyboardInterrupt:
+                raise
+            except:     # catch any exception pylint: disable=W0702
+                stacktrace.log_exc_info(sys.exc_info(),
+                                        logger='avocado.app.debug')
+                LOG_UI.error('Error running method "%s" of plugin "%s": %s',
+                             method_name, ext.name, sys.exc_info()[1])
+        if method_name == 'post_tests':
+            self.flush()
+
+    def flush(self):
+        """
+        Waits for the background plugins to handle all the queued events
+        and logs the events that were dropped or delayed the runner
+        """
+        for name, background in self.background.items():
+            waited = background.flush()
+            LOG_JOB.debug('Result events plugin "%s": %s progress events '
+                          'coalesced, waited %.2fs for it to finish',
+                          name, background.coalesced, waited)
+            if background.dropped or background.late:
+                LOG_JOB.warning('Result events plugin "%s" could not keep '
+                                'up with the tests: %s progress events '
+                                'dropped, %s events delayed the runner',
+                                name, background.dropped, background.late)
 
 
 class VarianterDispatcher(Dispatcher):
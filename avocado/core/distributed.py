@@ -0,0 +1,544 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Distributed execution of tests by a coordinator and worker agents
+
+The job (the coordinator) listens on a TCP or Unix socket and hands out
+the tests, one by one, to the ``avocado worker`` processes which ask for
+them once they are ready to execute another test.  Workers execute the
+tests as part of their own (worker) job and stream the test states back,
+so the coordinator reports them as if they were executed locally.
+
+Messages are pickled :class:`multiprocessing.connection.Connection`
+objects exchanged between authenticated peers (see :func:`get_authkey`).
+The test files have to be available under the same paths on all the
+machines.
+"""
+
+import binascii
+import collections
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import socket
+import threading
+import time
+
+from queue import Empty, Queue
+
+from . import exceptions
+from . import job
+from . import runner
+from .output import LOG_JOB
+from .settings import settings
+
+
+#: The coordinator sends the job unique id and the remaining job time
+#: (or None) to each worker once it connects
+MSG_JOB = 'job'
+#: Worker asks for another test
+MSG_NEXT = 'next'
+#: The coordinator hands out a test factory
+MSG_TEST = 'test'
+#: There are no more tests to be executed
+MSG_FINISH = 'finish'
+#: Worker reports the early state of a started test
+MSG_START = 'start'
+#: Worker reports the final state of a test
+MSG_END = 'end'
+
+
+def parse_address(value):
+    """
+    Parses the address of the coordinator
+
+    :param value: "unix:PATH", "tcp:HOST:PORT" or "HOST:PORT"
+    :return: tuple(address, family) suitable for
+             :class:`multiprocessing.connection.Listener`
+    :raise ValueError: when the address is not valid
+    """
+    if value.startswith('unix:'):
+        path = value[len('unix:'):]
+        if path:
+            return path, 'AF_UNIX'
+    else:
+        if value.startswith('tcp:'):
+            value = value[len('tcp:'):]
+        host, sep, port = value.rpartition(':')
+        if sep and port.isdigit():
+            return (host or 'localhost', int(port)), 'AF_INET'
+    raise ValueError('Invalid address "%s", it must be given as '
+                     '"unix:PATH" or "tcp:HOST:PORT"' % value)
+
+
+def format_address(address):
+    """
+    Formats the address of a listener (see :func:`parse_address`)
+    """
+    if isinstance(address, tuple):
+        return 'tcp:%s:%s' % address
+    return 'unix:%s' % address
+
+
+def get_authkey(authkey=None):
+    """
+    Returns the key used to authenticate the coordinator and workers
+
+    :param authkey: key given on the command line, otherwise the
+                    "authkey" key from the "runner.distributed" section
+                    of the settings is used
+    :return: the key (as bytes) or None when it's not configured
+    """
+    if not authkey:
+        authkey = settings.get_value('runner.distributed', 'authkey',
+                                     default='')
+    if not authkey:
+        return None
+    return authkey.encode('utf-8')
+
+
+class _WorkerAcceptor(threading.Thread):
+
+    """
+    Accepts the worker connections on the background
+
+    The connections are passed to the coordinator through :attr:`pending`
+    and :attr:`notifier` becomes ready whenever a new one is available.
+    """
+
+    def __init__(self, listener):
+        super(_WorkerAcceptor, self).__init__(name='WorkerAcceptor')
+        self.daemon = True
+        self.listener = listener
+        self.pending = Queue()
+        self.notifier, self._notify = multiprocessing.Pipe(False)
+        self._closed = False
+
+    def run(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (EOFError, OSError, multiprocessing.AuthenticationError) \
+                    as details:
+                if self._closed:
+                    return
+                LOG_JOB.warning("Rejected worker connection: %s", details)
+                continue
+            if self._closed:
+                conn.close()
+                return
+            self.pending.put(conn)
+            self._notify.send_bytes(b'\0')
+
+    def get_connections(self):
+        """
+        Returns the connections accepted since the last call
+        """
+        while self.notifier.poll():
+            self.notifier.recv_bytes()
+        connections = []
+        while True:
+            try:
+                connections.append(self.pending.get_nowait())
+            except Empty:
+                return connections
+
+    def close(self):
+        """
+        Stops accepting the connections and closes the listener
+        """
+        self._closed = True
+        # Wake up the blocked accept()
+        address = self.listener.address
+        if isinstance(address, tuple):
+            sock = socket.socket(socket.AF_INET)
+        else:
+            sock = socket.socket(socket.AF_UNIX)
+        try:
+            sock.settimeout(1)
+            sock.connect(address)
+        except (OSError, socket.error):
+            pass
+        finally:
+            sock.close()
+        self.join(1)
+        self.listener.close()
+
+
+class DistributedTestRunner(runner.TestRunner):
+
+    """
+    Test runner handing out the tests to ``avocado worker`` processes
+    """
+
+    def _log_ui(self, msg, *args):
+        """
+        Displays the information needed to start the workers (on stderr
+        when stdout is claimed by a result output)
+        """
+        LOG_JOB.info(msg, *args)
+        if getattr(self.job.args, 'stdout_claimed_by', None):
+            self.job.log.warning(msg, *args)
+        else:
+            self.job.log.info(msg, *args)
+
+    def _get_authkey(self):
+        authkey = get_authkey(getattr(self.job.args, 'distributed_authkey',
+                                      None))
+        if authkey is None:
+            authkey = binascii.hexlify(os.urandom(16))
+            self._log_ui("WORKER KEY : %s", authkey.decode('ascii'))
+        return authkey
+
+    @staticmethod
+    def _get_worker_factory(test_factory):
+        """
+        Returns the test factory without the job (specific) parameters
+        """
+        test_parameters = dict(test_factory[1])
+        test_parameters.pop('job', None)
+        test_parameters.pop('base_logdir', None)
+        return (test_factory[0], test_parameters)
+
+    def _check_options(self):
+        """
+        Rejects the options of the local execution of the tests, which the
+        workers don't use
+
+        :raise exceptions.OptionValidationError: When any of them is set
+        """
+        unsupported = []
+        if self._get_engine() == 'asyncio':
+            unsupported.append('the asyncio engine')
+        if self._get_prefork():
+            unsupported.append('pre-forked test processes')
+        if self._get_unittest_batch() > 1:
+            unsupported.append('Python unittest batches')
+        if self._is_cgroup_enabled():
+            unsupported.append('cgroup isolation')
+        if unsupported:
+            raise exceptions.OptionValidationError("The tests handed out to "
+                                                   "workers can't use %s"
+                                                   % ", ".join(unsupported))
+
+    def run_suite(self, test_suite, variants, timeout=0, replay_map=None,
+                  execution_order=None):
+        self._check_options()
+        return super(DistributedTestRunner, self).run_suite(test_suite,
+                                                            variants,
+                                                            timeout,
+                                                            replay_map,
+                                                            execution_order)
+
+    def _report_started(self, early_state):
+        self.result.start_test(early_state)
+        self.job._result_events_dispatcher.map_method('start_test',
+                                                      self.result,
+                                                      early_state)
+
+    def _run_test_factories(self, test_factories, parallel, queue, summary,
+                            deadline):
+        """
+        Hands out the test factories to the workers and reports the test
+        states they stream back (in the suite order)
+
+        Tests which were not handed out when the job timeout is reached
+        are reported as skipped, tests of workers which disconnect before
+        starting them are handed out again.  On ctrl+c, the tests started
+        by the workers are reported as interrupted (and left to them).
+        """
+        address, family = parse_address(self.job.args.distributed)
+        listener = multiprocessing.connection.Listener(
+            address, family, authkey=self._get_authkey())
+        self._log_ui("WORKERS    : waiting on %s",
+                     format_address(listener.address))
+        acceptor = _WorkerAcceptor(listener)
+        acceptor.start()
+        #: Tests handed out again (their workers disconnected)
+        pending = collections.deque()
+        #: Worker connection -> uids of the tests it executes
+        workers = {}
+        #: Test uid -> tuple(index, test_factory, worker connection)
+        in_flight = {}
+        started = {}
+        finished = {}
+        start_reported = set()
+        next_report = 0
+        schedule = True
+        exhausted = False
+        timed_out = False
+        last_progress = 0
+        result_dispatcher = self.job._result_events_dispatcher
+
+        def next_test():
+            if pending:
+                return pending.popleft()
+            if exhausted:
+                return None
+            return next(test_factories, None)
+
+        def worker_lost(conn):
+            LOG_JOB.info("Worker %s disconnected", conn.fileno())
+            for uid in workers.pop(conn):
+                index, test_factory, _ = in_flight.pop(uid)
+                if index in started:
+                    finished[index] = runner.add_runner_failure(
+                        dict(started[index]), "ERROR",
+                        "Worker disconnected while executing the test")
+                else:
+                    pending.appendleft((index, test_factory))
+            conn.close()
+
+        try:
+            while True:
+                for conn in acceptor.get_connections():
+                    remaining = None
+                    if deadline is not None:
+                        remaining = max(deadline - time.time(), 0)
+                    try:
+                        conn.send((MSG_JOB, self.job.unique_id, remaining))
+                    except (OSError, EOFError):
+                        conn.close()
+                        continue
+                    workers[conn] = set()
+                if (schedule and deadline is not None and
+                        time.time() > deadline):
+                    schedule = False
+                    timed_out = True
+                    summary.add('INTERRUPTED')
+                if not (in_flight or (schedule and (pending or
+                                                    not exhausted))):
+                    break
+
+                handles = list(workers) + [acceptor.notifier]
+                for conn in multiprocessing.connection.wait(handles, 1):
+                    if conn is acceptor.notifier:
+                        continue
+                    try:
+                        msg = conn.recv()
+                    except (OSError, EOFError):
+                        worker_lost(conn)
+                        continue
+                    if msg[0] == MSG_NEXT:
+                        item = next_test() if schedule else None
+                        if item is None:
+                            exhausted = exhausted or schedule
+                            msg = (MSG_FINISH,)
+                        else:
+                            index, test_factory = item
+                            uid = test_factory[1]['name'].uid
+                            in_flight[uid] = (index, test_factory, conn)
+                            workers[conn].add(uid)
+                            msg = (MSG_TEST,
+                                   self._get_worker_factory(test_factory))
+                        try:
+                            conn.send(msg)
+                        except (OSError, EOFError):
+                            worker_lost(conn)
+                    elif msg[0] in (MSG_START, MSG_END):
+                        uid = msg[1]['name'].uid
+                        if uid not in in_flight:
+                            continue
+                        index = in_flight[uid][0]
+                        if msg[0] == MSG_START:
+                            started[index] = msg[1]
+                        else:
+                            del in_flight[uid]
+                            workers[conn].discard(uid)
+                            finished[index] = msg[1]
+
+                # Report the results in order
+                while next_report in finished:
+                    if next_report not in start_reported:
+                        self._report_started(started.get(
+                            next_report, finished[next_report]))
+                    if not self._report_end_test(finished.pop(next_report),
+                                                 summary):
+                        schedule = False
+                    next_report += 1
+                if next_report in started:
+                    if next_report not in start_reported:
+                        self._report_started(started[next_report])
+                        start_reported.add(next_report)
+                    elif time.time() - last_progress >= 1:
+                        last_progress = time.time()
+                        result_dispatcher.map_method('test_progress', True)
+        except KeyboardInterrupt:
+            summary.add('INTERRUPTED')
+            self.job.log.debug("\nInterrupt requested, the tests already "
+                               "handed out are left to the workers")
+            for index, _, _ in in_flight.values():
+                if index in started:
+                    finished[index] = runner.add_runner_failure(
+                        dict(started[index]), "INTERRUPTED",
+                        "Interrupted by ctrl+c, the test was left to the "
+                        "worker")
+        finally:
+            for conn in list(workers):
+                try:
+                    conn.send((MSG_FINISH,))
+                except (OSError, EOFError):
+                    pass
+                conn.close()
+            acceptor.close()
+
+        # Tests which could not be reported in order and, after the job
+        # timeout, those which were not handed out at all
+        remaining = {}
+        if timed_out:
+            for index, test_factory in list(pending) + list(test_factories):
+                remaining[index] = test_factory
+        for index in sorted(set(finished).union(remaining)):
+            if index in finished:
+                if index not in start_reported:
+                    self._report_started(started.get(index, finished[index]))
+                self._report_end_test(finished[index], summary)
+            else:
+                self.run_test(self._timeout_skip_factory(remaining[index]),
+                              queue, summary)
+
+
+class WorkerTestRunner(runner.TestRunner):
+
+    """
+    Test runner executing the tests handed out by the coordinator
+    """
+
+    def __init__(self, job, result):
+        super(WorkerTestRunner, self).__init__(job, result)
+        self._coordinator = None
+
+    def _connect(self):
+        """
+        Connects to the coordinator (waiting for it to start listening)
+        """
+        value = self.job.args.coordinator
+        address, family = parse_address(value)
+        authkey = get_authkey(getattr(self.job.args, 'distributed_authkey',
+                                      None))
+        end = time.time() + getattr(self.job.args, 'connect_timeout', 60)
+        while True:
+            try:
+                return multiprocessing.connection.Client(address, family,
+                                                         authkey=authkey)
+            except (OSError, socket.error) as details:
+                if time.time() > end:
+                    self.job.log.error("Unable to connect to the coordinator "
+                                       "%s: %s", value, details)
+                    return None
+                time.sleep(0.2)
+
+    def _send(self, msg):
+        if self._coordinator is None:
+            return
+        try:
+            self._coordinator.send(msg)
+        except (OSError, EOFError) as details:
+            self.job.log.error("Connection to the coordinator lost: %s",
+                               details)
+            self._coordinator = None
+
+    def _iter_coordinator_tests(self):
+        """
+        Asks the coordinator for tests as long as there are any
+
+        :return: generator yielding tuple(index, test_factory)
+        """
+        index = 0
+        while self._coordinator is not None:
+            self._send((MSG_NEXT,))
+            if self._coordinator is None:
+                return
+            try:
+                msg = self._coordinator.recv()
+            except (OSError, EOFError):
+                self.job.log.error("Connection to the coordinator lost")
+                self._coordinator = None
+                return
+            if msg[0] != MSG_TEST:
+                return
+            test_factory = msg[1]
+            test_factory[1]['base_logdir'] = self.job.logdir
+            test_factory[1]['job'] = self.job
+            self.result.tests_total += 1
+            yield index, test_factory
+            index += 1
+
+    def _report_start_test(self, slot):
+        super(WorkerTestRunner, self)._report_start_test(slot)
+        self._send((MSG_START, slot.early_status))
+
+    def _report_end_test(self, test_state, summary):
+        ret = super(WorkerTestRunner, self)._report_end_test(test_state,
+                                                             summary)
+        self._send((MSG_END, test_state))
+        return ret
+
+    def run_suite(self, test_suite, variants, timeout=0, replay_map=None,
+                  execution_order=None):
+        """
+        Executes the tests handed out by the coordinator
+
+        The arguments are ignored, the coordinator decides what to run.
+
+        :return: a set with types of test failures or None when the
+                 coordinator is not available.
+        """
+        summary = set()
+        self._coordinator = self._connect()
+        if self._coordinator is None:
+            return None
+        try:
+            _, job_id, remaining = self._coordinator.recv()
+        except (OSError, EOFError) as details:
+            self.job.log.error("Connection to the coordinator lost: %s",
+                               details)
+            return None
+        self.job.log.info("COORDINATOR: %s (job %s)",
+                          self.job.args.coordinator, job_id)
+        deadline = None
+        if remaining is not None:
+            deadline = time.time() + remaining
+        if self.job.sysinfo is not None:
+            self.job.sysinfo.start_job_hook()
+        try:
+            self._run_suite_parallel(self._iter_coordinator_tests(),
+                                     self._get_parallel(), summary, deadline)
+        except KeyboardInterrupt:
+            LOG_JOB.error('Job interrupted by ctrl+c.')
+            summary.add('INTERRUPTED')
+        finally:
+            if self._coordinator is not None:
+                self._coordinator.close()
+                self._coordinator = None
+        if self.job.sysinfo is not None:
+            self.job.sysinfo.end_job_hook()
+        self.result.end_tests()
+        self.job.funcatexit.run()
+        signal.signal(signal.SIGTSTP, signal.SIG_IGN)
+        return summary
+
+
+class WorkerJob(job.Job):
+
+    """
+    Job executing the tests handed out by a coordinator (see
+    :class:`WorkerTestRunner`)
+    """
+
+    def create_test_suite(self):
+        # The tests are resolved by the coordinator
+        self.test_suite = []
+        self.result.tests_total = 0
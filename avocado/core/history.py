@@ -0,0 +1,224 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Local history of test results (durations and statuses)
+"""
+
+import glob
+import json
+import os
+
+from . import data_dir
+from .output import LOG_JOB
+
+
+#: Name of the history store file (in the avocado data dir)
+HISTORY_FILENAME = 'test_history.json'
+
+#: Statuses of tests which are considered failed
+FAILED_STATUSES = ('FAIL', 'ERROR', 'INTERRUPTED')
+
+#: Statuses of tests which did not really run (their duration is ignored)
+NOT_RUN_STATUSES = ('SKIP', 'CANCEL')
+
+
+def get_test_key(test_id):
+    """
+    Returns the test identifier without the job specific uid
+
+    :param test_id: test id (eg. "1-passtest.py:PassTest.test;variant")
+    :type test_id: str or :class:`avocado.core.test.TestID`
+    :return: test identifier (eg. "passtest.py:PassTest.test;variant")
+    :rtype: str
+    """
+    test_id = str(test_id)
+    uid, sep, rest = test_id.partition('-')
+    if sep and uid.isdigit():
+        return rest
+    return test_id
+
+
+class TestHistory:
+
+    """
+    Durations and statuses of tests executed by previous jobs
+
+    The history is built from the ``results.json`` files of the previous
+    job results directories and it's stored in the avocado data dir, so
+    results of each job are read only once.
+    """
+
+    def __init__(self, logs_dir=None, path=None, strict=False):
+        """
+        :param logs_dir: base directory of job results to be looked at
+                         (defaults to the avocado logs dir)
+        :param path: path of the history store file (defaults to
+                     :data:`HISTORY_FILENAME` in the avocado data dir)
+        :param strict: raise the errors reading the history store (eg. a
+                       snapshot given by the user), instead of starting
+                       with an empty history
+        :raise IOError, OSError, ValueError: when the history store can't
+                                             be read in the strict mode
+        """
+        if logs_dir is None:
+            logs_dir = data_dir.get_logs_dir()
+        if path is None:
+            path = data_dir.get_datafile_path(HISTORY_FILENAME)
+        self.logs_dir = os.path.abspath(logs_dir)
+        self.path = path
+        #: Job results directories already processed
+        self.jobs = set()
+        #: Test key -> {"time": average duration, "runs": number of
+        #: measured runs, "status": last status}
+        self.tests = {}
+        if strict:
+            self._load()
+        else:
+            try:
+                self._load()
+            except (IOError, OSError, ValueError):
+                self.jobs = set()
+                self.tests = {}
+
+    def _load(self):
+        with open(self.path, 'r') as history_file:
+            content = json.load(history_file)
+        try:
+            jobs = set(content.get('jobs', []))
+            tests = dict(content.get('tests', {}))
+        except (AttributeError, TypeError):
+            raise ValueError("Invalid test history content")
+        self.jobs = jobs
+        self.tests = tests
+
+    def save(self):
+        """
+        Stores the history (errors are only logged, the history is
+        just an optimization)
+        """
+        tmp_path = "%s.%s.tmp" % (self.path, os.getpid())
+        try:
+            with open(tmp_path, 'w') as history_file:
+                json.dump({'jobs': sorted(self.jobs), 'tests': self.tests},
+                          history_file)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError) as details:
+            LOG_JOB.debug("Unable to store the test history in %s: %s",
+                          self.path, details)
+
+    def add_results(self, results):
+        """
+        Updates the history with the test results of a job
+
+        :param results: content of the job's ``results.json``
+        :type results: dict
+        """
+        for result in results.get('tests', []):
+            key = get_test_key(result.get('id', ''))
+            status = result.get('status')
+            entry = self.tests.setdefault(key, {'time': None, 'runs': 0,
+                                                'status': None})
+            entry['status'] = status
+            duration = result.get('time', -1)
+            if status in NOT_RUN_STATUSES or duration is None or duration < 0:
+                continue
+            runs = entry['runs']
+            if entry['time'] is None:
+                entry['time'] = duration
+            else:
+                entry['time'] = (entry['time'] * runs + duration) / (runs + 1)
+            entry['runs'] = runs + 1
+
+    def update(self, exclude=None):
+        """
+        Reads the results of the jobs which were not processed yet
+
+        :param exclude: job results directory to be ignored (eg. the
+                        current job)
+        :return: whether the history was changed
+        """
+        changed = False
+        if exclude is not None:
+            exclude = os.path.abspath(exclude)
+        for job_dir in sorted(glob.glob(os.path.join(self.logs_dir,
+                                                     'job-*'))):
+            if job_dir in self.jobs or job_dir == exclude:
+                continue
+            if os.path.islink(job_dir):     # eg. 'latest'
+                continue
+            json_path = os.path.join(job_dir, 'results.json')
+            try:
+                with open(json_path, 'r') as json_file:
+                    results = json.load(json_file)
+            except (IOError, OSError, ValueError):
+                continue    # Not finished, or without JSON results
+            self.add_results(results)
+            self.jobs.add(job_dir)
+            changed = True
+        return changed
+
+    def get_time(self, key):
+        """
+        Expected duration of the test (None when unknown)
+        """
+        return self.tests.get(key, {}).get('time')
+
+    def get_status(self, key):
+        """
+        Last status of the test (None when unknown)
+        """
+        return self.tests.get(key, {}).get('status')
+
+
+def order_longest_first(keys, history):
+    """
+    Returns the order of tests sorted by their expected durations
+
+    Tests without known durations go first (they might be long), the
+    original order is kept among tests with equal durations.
+
+    :param keys: list of test keys (see :func:`get_test_key`)
+    :param history: test history
+    :type history: :class:`TestHistory`
+    :return: list of indexes into `keys`
+    """
+    def sort_key(index):
+        duration = history.get_time(keys[index])
+        if duration is None:
+            return (0, 0, index)
+        return (1, -duration, index)
+    return sorted(range(len(keys)), key=sort_key)
+
+
+def order_failed_first(keys, history):
+    """
+    Returns the order of tests with the previously failed ones first
+
+    The original order is kept otherwise.
+
+    :param keys: list of test keys (see :func:`get_test_key`)
+    :param history: test history
+    :type history: :class:`TestHistory`
+    :return: list of indexes into `keys`
+    """
+    def sort_key(index):
+        if history.get_status(keys[index]) in FAILED_STATUSES:
+            return (0, index)
+        return (1, index)
+    return sorted(range(len(keys)), key=sort_key)
+
+
+#: Execution orders based on the test history
+HISTORY_ORDERS = {'longest-first': order_longest_first,
+                  'failed-first': order_failed_first}
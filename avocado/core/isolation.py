@@ -0,0 +1,169 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Isolation of the test processes in cgroups (v2)
+
+Each test process moves itself into its own (leaf) cgroup, named after
+its PID, under a cgroup created for the job.  All the processes started
+by the test stay in that cgroup, so the runner can kill them all at
+once (timeouts, interruptions and when the test finishes) and their
+resources can be limited.
+
+The limits are written to the cgroup interface files listed in
+:data:`LIMITS`.  They are taken from the test params, from the test
+tags (``:avocado: tags=cgroup_memory_max:512M``) or from the
+``runner.cgroup`` section of the settings, in this order.  A ``/`` in
+the value is replaced by a space, so ``cgroup_cpu_max:50000/100000``
+can be used as a tag.
+"""
+
+import os
+
+from .output import LOG_JOB
+from .settings import settings
+from ..utils import cgroup
+
+
+#: Limits which can be set per test: tuple(cgroup interface file, name
+#: of the test param, test tag and setting)
+LIMITS = (('cpu.max', 'cgroup_cpu_max'),
+          ('memory.max', 'cgroup_memory_max'),
+          ('pids.max', 'cgroup_pids_max'))
+
+
+class TestCgroups:
+
+    """
+    The cgroups of the tests of a job
+    """
+
+    def __init__(self, job_id, base=None):
+        """
+        Creates the cgroup of the job
+
+        :param job_id: unique ID of the job
+        :param base: path (in the cgroup v2 hierarchy) of the cgroup
+                     where the job cgroup is created, by default the one
+                     of the runner process
+        :raise cgroup.CgroupError: when the cgroup can't be created
+        """
+        mountpoint = cgroup.get_mountpoint()
+        if mountpoint is None:
+            raise cgroup.CgroupError("The cgroup v2 hierarchy is not mounted")
+        if not base:
+            base = cgroup.get_cgroup_path()
+            if base is None:
+                raise cgroup.CgroupError("The runner process is not in the "
+                                         "cgroup v2 hierarchy")
+        parent = cgroup.Cgroup(os.path.join(mountpoint, base.lstrip('/')))
+        try:
+            parent.enable_controllers()
+        except (IOError, OSError) as details:
+            raise cgroup.CgroupError("Unable to use cgroup %s: %s"
+                                     % (parent.path, details))
+        self.cgroup = parent.child('avocado-job-%s' % job_id[:7])
+        self.cgroup.create()
+        #: Controllers available to limit the tests resources
+        self.controllers = self.cgroup.enable_controllers()
+        self.defaults = {name: settings.get_value('runner.cgroup', name,
+                                                  default=None)
+                         for _, name in LIMITS}
+
+    def get(self, pid):
+        """
+        The cgroup of the test process
+
+        :param pid: PID of the test process
+        :rtype: :class:`avocado.utils.cgroup.Cgroup`
+        """
+        return self.cgroup.child('test-%s' % pid)
+
+    def enter(self):
+        """
+        Moves the current (test) process into its own cgroup
+        """
+        test_cgroup = self.get(os.getpid())
+        test_cgroup.create()
+        test_cgroup.add_process()
+
+    def get_limits(self, test):
+        """
+        The cgroup limits requested by the test
+
+        :param test: the test instance
+        :return: list of tuple(cgroup interface file, value)
+        """
+        tags = getattr(test, 'tags', None) or {}
+        limits = []
+        for filename, name in LIMITS:
+            value = test.params.get(name)
+            if value is None and tags.get(name):
+                value = sorted(tags[name])[0]
+            if value is None:
+                value = self.defaults[name]
+            if value not in (None, ''):
+                limits.append((filename, str(value).replace('/', ' ')))
+        return limits
+
+    def set_limits(self, test):
+        """
+        Limits the resources of the current (test) process
+
+        :param test: the test instance, which requests the limits
+        :raise cgroup.CgroupError: when a limit can't be set
+        """
+        test_cgroup = self.get(os.getpid())
+        for filename, value in self.get_limits(test):
+            controller = filename.split('.', 1)[0]
+            if controller not in self.controllers:
+                raise cgroup.CgroupError("Unable to set %s=%s, the %s "
+                                         "controller is not available in "
+                                         "cgroup %s" % (filename, value,
+                                                        controller,
+                                                        self.cgroup.path))
+            test_cgroup.set_limit(filename, value)
+
+    def kill(self, pid, sig):
+        """
+        Sends a signal to all the processes of the test
+
+        :param pid: PID of the test process
+        :param sig: the signal
+        :return: False when the test process is not in its own cgroup
+        """
+        test_cgroup = self.get(pid)
+        if not test_cgroup.exists():
+            return False
+        test_cgroup.kill(sig)
+        return True
+
+    def remove(self, pid):
+        """
+        Kills the processes left behind by the test and removes its cgroup
+
+        :param pid: PID of the test process
+        """
+        try:
+            self.get(pid).remove()
+        except cgroup.CgroupError as details:
+            LOG_JOB.warning(details)
+
+    def close(self):
+        """
+        Removes the cgroup of the job (killing the remaining processes)
+        """
+        try:
+            self.cgroup.remove()
+        except cgroup.CgroupError as details:
+            LOG_JOB.warning(details)
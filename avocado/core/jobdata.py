@@ -34,6 +34,7 @@ VARIANTS_FILENAME = 'variants.json'
 PWD_FILENAME = 'pwd'
 ARGS_FILENAME = 'args.json'
 CMDLINE_FILENAME = 'cmdline'
+EXECUTION_ORDER_FILENAME = 'execution_order.json'
 
 
 def record(args, logdir, variants, references=None, cmdline=None):
@@ -84,6 +85,24 @@ def record(args, logdir, variants, references=None, cmdline=None):
         os.fsync(cmdline_file)
 
 
+def record_execution_order(logdir, execution_order, order):
+    """
+    Records the order in which the tests were executed.
+
+    :param logdir: job results directory
+    :param execution_order: name of the execution order
+    :param order: indexes of the tests (in the "variants-per-test" order)
+                  in the order they were executed
+    """
+    base_dir = init_dir(logdir, JOB_DATA_DIR)
+    path_order = os.path.join(base_dir, EXECUTION_ORDER_FILENAME)
+    with open(path_order, 'w') as order_file:
+        json.dump({'execution_order': execution_order, 'order': order},
+                  order_file)
+        order_file.flush()
+        os.fsync(order_file)
+
+
 def _retrieve(resultsdir, resource):
     path = os.path.join(resultsdir, JOB_DATA_DIR, resource)
     if not os.path.exists(path):
@@ -143,6 +162,19 @@ def retrieve_config(resultsdir):
     return recorded_config
 
 
+def retrieve_execution_order(resultsdir):
+    """
+    Retrieves the recorded test execution order from the results directory.
+
+    :return: dict with the "execution_order" name and the "order" of tests
+             or None when not recorded
+    """
+    recorded_order = _retrieve(resultsdir, EXECUTION_ORDER_FILENAME)
+    if recorded_order:
+        with open(recorded_order, 'r') as order_file:
+            return json.load(order_file)
+
+
 def retrieve_cmdline(resultsdir):
     """
     Retrieves the job command line from the results directory.
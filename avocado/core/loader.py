@@ -17,8 +17,10 @@
 Test loader module.
 """
 
+import concurrent.futures
 import imp
 import inspect
+import multiprocessing
 import os
 import re
 import shlex
@@ -27,6 +29,7 @@ import sys
 from enum import Enum
 
 from . import data_dir
+from . import discovery_cache
 from . import output
 from . import test
 from . import safeloader
@@ -118,6 +121,151 @@ def must_key_val_matches(must_key_vals, test_tags, include_empty_key):
     return True
 
 
+class TagIndex:
+
+    """
+    Inverted index of the tags of the tests of a test suite
+
+    It maps each tag (and each key:val tag) to the positions of the tests
+    which have it, so the tests with given tags are found by set
+    operations (see :class:`TagFilter`).
+    """
+
+    def __init__(self, test_suite=()):
+        """
+        :param test_suite: the tests to be indexed
+        :type test_suite: list of test factories
+        """
+        #: Number of indexed tests
+        self.size = 0
+        #: Positions of the tests without tags
+        self.untagged = set()
+        #: Positions of the tests with tags
+        self.tagged = set()
+        #: Tag (or key of key:val tags) -> positions of the tests
+        self.keys = {}
+        #: (key, val) -> positions of the tests
+        self.key_vals = {}
+        for test_factory in test_suite:
+            self.add(test_factory)
+
+    def add(self, test_factory):
+        """
+        Indexes the next test of the suite
+        """
+        position = self.size
+        self.size += 1
+        test_tags = test_factory[1].get('tags', {})
+        if not test_tags:
+            self.untagged.add(position)
+            return
+        self.tagged.add(position)
+        for key, vals in test_tags.items():
+            self.keys.setdefault(key, set()).add(position)
+            for val in vals or ():
+                self.key_vals.setdefault((key, val), set()).add(position)
+
+
+class TagFilter:
+
+    """
+    Filter of tests by tags, compiled from the "--filter-by-tags" format
+
+    A test passes the filter when it passes any of the given tag sets,
+    see :func:`filter_test_tags`.
+    """
+
+    def __init__(self, filter_by_tags, include_empty=False,
+                 include_empty_key=False):
+        """
+        :param filter_by_tags: the list of tag sets to use as filters
+        :type filter_by_tags: list of comma separated tags
+        :param include_empty: if true tests without tags will not be
+                              filtered out
+        :param include_empty_key: if true tests "keys" on key:val tags will
+                                  be included in the filtered results
+        """
+        self.include_empty = include_empty
+        self.include_empty_key = include_empty_key
+        #: list of tuple(flat tags, key:val tags, tags which must not be
+        #: present) per tag set
+        self.clauses = []
+        for must, must_not in parse_filter_by_tags(filter_by_tags):
+            must_flat, must_key_val = must_split_flat_key_val(must)
+            self.clauses.append((must_flat, must_key_val, must_not))
+
+    def matches(self, test_tags):
+        """
+        Checks if a test with the given tags passes the filter
+
+        :type test_tags: dict
+        :rtype: bool
+        """
+        if not test_tags:
+            return self.include_empty
+        for must_flat, must_key_val, must_not in self.clauses:
+            if must_not.intersection(test_tags):
+                continue
+            if must_key_val:
+                if not must_key_val_matches(must_key_val, test_tags,
+                                            self.include_empty_key):
+                    continue
+            if must_flat:
+                if not must_flat.issubset(test_tags):
+                    continue
+            return True
+        return False
+
+    def _select(self, index, must_flat, must_key_val, must_not):
+        no_tests = set()
+        candidates = [index.keys.get(tag, no_tests) for tag in must_flat]
+        for key, val in must_key_val.items():
+            with_key_val = index.key_vals.get((key, val), no_tests)
+            if self.include_empty_key:
+                with_key_val = with_key_val.union(
+                    index.tagged.difference(index.keys.get(key, no_tests)))
+            candidates.append(with_key_val)
+        if candidates:
+            candidates.sort(key=len)
+            selected = candidates[0].intersection(*candidates[1:])
+        else:
+            selected = set(index.tagged)
+        for tag in must_not:
+            selected.difference_update(index.keys.get(tag, no_tests))
+        return selected
+
+    def select(self, index):
+        """
+        Returns the positions of the tests which pass the filter
+
+        :param index: index of the tags of the tests
+        :type index: :class:`TagIndex`
+        :rtype: set
+        """
+        if self.include_empty:
+            selected = set(index.untagged)
+        else:
+            selected = set()
+        for must_flat, must_key_val, must_not in self.clauses:
+            selected.update(self._select(index, must_flat, must_key_val,
+                                         must_not))
+        return selected
+
+    def filter(self, test_suite, index=None):
+        """
+        Returns the tests which pass the filter, in the original order
+
+        :param test_suite: the unfiltered test suite
+        :param index: index of the tags of the test suite, built when not
+                      given
+        :type index: :class:`TagIndex`
+        """
+        if index is None:
+            index = TagIndex(test_suite)
+        return [test_suite[position]
+                for position in sorted(self.select(index))]
+
+
 def filter_test_tags(test_suite, filter_by_tags, include_empty=False,
                      include_empty_key=False):
     """
@@ -138,35 +286,8 @@ def filter_test_tags(test_suite, filter_by_tags, include_empty=False,
                               included in the filtered results
     :type include_empty_key: bool
     """
-    filtered = []
-    must_must_nots = parse_filter_by_tags(filter_by_tags)
-
-    for klass, info in test_suite:
-        test_tags = info.get('tags', {})
-        if not test_tags:
-            if include_empty:
-                filtered.append((klass, info))
-            continue
-
-        for must, must_not in must_must_nots:
-            if must_not.intersection(test_tags):
-                continue
-
-            must_flat, must_key_val = must_split_flat_key_val(must)
-            if must_key_val:
-                if not must_key_val_matches(must_key_val,
-                                            test_tags,
-                                            include_empty_key):
-                    continue
-
-            if must_flat:
-                if not must_flat.issubset(test_tags):
-                    continue
-
-            filtered.append((klass, info))
-            break
-
-    return filtered
+    return TagFilter(filter_by_tags, include_empty,
+                     include_empty_key).filter(test_suite)
 
 
 class LoaderError(Exception):
@@ -328,6 +449,20 @@ class TestLoaderProxy:
                       are not resolved to tests.
         :return: A list of test factories (tuples (TestClass, test_params))
         """
+        return list(self.iter_discover(references, which_tests, force))
+
+    def iter_discover(self, references, which_tests=DiscoverMode.DEFAULT,
+                      force=None):
+        """
+        Discover (possible) tests from test references, yielding them as
+        soon as the loaders find them (see :meth:`TestLoader.iter_discover`)
+
+        The unhandled references are reported (see :meth:`discover`) once
+        all the references were inspected.  The mappings are updated
+        before yielding each batch of tests.
+
+        :return: iterator of test factories (tuples (TestClass, test_params))
+        """
         def handle_exception(plugin, details):
             # FIXME: Introduce avocado.exceptions logger and use here
             stacktrace.log_message("Test discovery plugin %s failed: "
@@ -335,33 +470,53 @@ class TestLoaderProxy:
                                    LOG_UI.getChild("exceptions"))
             # FIXME: Introduce avocado.traceback logger and use here
             stacktrace.log_exc_info(sys.exc_info(), LOG_UI.getChild("debug"))
-        tests = []
         unhandled_references = []
-        if not references:
-            for loader_plugin in self._initialized_plugins:
-                try:
-                    tests.extend(loader_plugin.discover(None, which_tests))
-                except Exception as details:
-                    handle_exception(loader_plugin, details)
-        else:
-            for reference in references:
-                handled = False
+        # The modules parsed by the loaders are shared by all of them
+        with safeloader.module_index():
+            if not references:
                 for loader_plugin in self._initialized_plugins:
                     try:
-                        _test = loader_plugin.discover(reference, which_tests)
-                        if _test:
-                            tests.extend(_test)
-                            handled = True
-                            if which_tests != DiscoverMode.ALL:
-                                break  # Don't process other plugins
+                        for tests in loader_plugin.iter_discover(None,
+                                                                 which_tests):
+                            self._update_mappings()
+                            for test_factory in tests:
+                                yield test_factory
                     except Exception as details:
                         handle_exception(loader_plugin, details)
-                if not handled:
-                    unhandled_references.append(reference)
+            else:
+                # Only the first loader inspects all the references, unless
+                # all the loaders are used
+                for position, loader_plugin in enumerate(
+                        self._initialized_plugins):
+                    if position > 0 and which_tests != DiscoverMode.ALL:
+                        break
+                    try:
+                        loader_plugin.prefetch(references, which_tests)
+                    except Exception as details:
+                        handle_exception(loader_plugin, details)
+                for reference in references:
+                    handled = False
+                    for loader_plugin in self._initialized_plugins:
+                        try:
+                            for tests in loader_plugin.iter_discover(
+                                    reference, which_tests):
+                                if not tests:
+                                    continue
+                                handled = True
+                                self._update_mappings()
+                                for test_factory in tests:
+                                    yield test_factory
+                        except Exception as details:
+                            handle_exception(loader_plugin, details)
+                        if handled and which_tests != DiscoverMode.ALL:
+                            break  # Don't process other plugins
+                    if not handled:
+                        unhandled_references.append(reference)
+        self._update_mappings()
         if unhandled_references:
             if which_tests == DiscoverMode.ALL:
-                tests.extend([(MissingTest, {'name': reference})
-                              for reference in unhandled_references])
+                for reference in unhandled_references:
+                    yield (MissingTest, {'name': reference})
             else:
                 if force == 'on':
                     LOG_UI.error(LoaderUnhandledReferenceError(unhandled_references,
@@ -369,8 +524,6 @@ class TestLoaderProxy:
                 else:
                     raise LoaderUnhandledReferenceError(unhandled_references,
                                                         self._initialized_plugins)
-        self._update_mappings()
-        return tests
 
     def load_test(self, test_factory):
         """
@@ -497,6 +650,39 @@ class TestLoader:
         """
         raise NotImplementedError
 
+    def iter_discover(self, reference, which_tests=DiscoverMode.DEFAULT):
+        """
+        Discover (possible) tests from an reference, yielding them in
+        batches as soon as they are found.
+
+        Loaders able to find the tests gradually override it, by default
+        all the tests found by :meth:`discover` are yielded at once.
+
+        :param reference: the reference to be inspected.
+        :type reference: str
+        :param which_tests: Limit tests to be displayed
+        :type which_tests: :class:`DiscoverMode`
+        :return: iterator of lists of tests matching the reference as params.
+        """
+        tests = self.discover(reference, which_tests)
+        if tests:
+            yield tests
+
+    def prefetch(self, references, which_tests=DiscoverMode.DEFAULT):
+        """
+        Starts the discovery of all the references ahead of time
+
+        Only called (before the references are discovered one by one)
+        when all of them are going to be inspected by this loader, so
+        loaders whose discovery is slow can inspect them concurrently.
+        By default, nothing is done.
+
+        :param references: the references to be inspected.
+        :type references: list
+        :param which_tests: Limit tests to be displayed
+        :type which_tests: :class:`DiscoverMode`
+        """
+
 
 class BrokenSymlink:
     """ Dummy object to represent reference pointing to a BrokenSymlink path """
@@ -551,6 +737,180 @@ class NotATest:
     """
 
 
+#: Minimum number of files for their discovery to be spread across
+#: processes, the pool is not worth it for fewer files
+PARALLEL_DISCOVERY_MIN_FILES = 64
+
+#: Number of chunks of files given to each of the discovery processes
+DISCOVERY_CHUNKS_PER_PROCESS = 4
+
+# FileLoader whose discovery is spread across the processes of the pool,
+# which inherit it when they are forked
+_DISCOVERY_LOADER = None
+
+# Discovery cache used by the processes of the pool of
+# :func:`iter_file_discovery`, which inherit it when they are forked
+_DISCOVERY_CACHE = None
+
+
+def get_discovery_processes():
+    """
+    Number of processes the discovery of the files of a directory is
+    spread across, given by the "discovery_processes" key of the "loader"
+    section of the settings (0 means the number of CPUs)
+    """
+    processes = settings.get_value('loader', 'discovery_processes',
+                                   key_type=int, default=0)
+    if processes <= 0:
+        processes = os.cpu_count() or 1
+    return processes
+
+
+def _make_files_tests(files, list_non_tests):
+    """
+    Discovers the tests of the files in a process of the pool
+
+    :return: tuple(list of the lists of tests of each file, entries added
+             to the discovery cache)
+    """
+    # pylint: disable=W0212
+    tests = [_DISCOVERY_LOADER._make_tests(path, list_non_tests,
+                                           subtests_filter)
+             for path, subtests_filter in files]
+    if _DISCOVERY_LOADER._discovery_cache is None:
+        return tests, {}
+    return tests, _DISCOVERY_LOADER._discovery_cache.pop_new_entries()
+
+
+def _find_file_tests(kind, function, path, cache):
+    """
+    Tests of the file (see :func:`iter_file_discovery`), or the exception
+    raised by their discovery
+    """
+    try:
+        if cache is None:
+            return function(path)
+        return cache.find_file_tests(kind, function, path)
+    except Exception as details:  # pylint: disable=W0703
+        return details
+
+
+def _find_files_tests(paths, kind, function):
+    """
+    Discovers the tests of the files in a process of the pool (see
+    :func:`iter_file_discovery`)
+
+    :return: tuple(list of the tests of each file, entries added to the
+             discovery cache)
+    """
+    tests = [_find_file_tests(kind, function, path, _DISCOVERY_CACHE)
+             for path in paths]
+    if _DISCOVERY_CACHE is None:
+        return tests, {}
+    return tests, _DISCOVERY_CACHE.pop_new_entries()
+
+
+def _get_discovery_executor(count, min_files=PARALLEL_DISCOVERY_MIN_FILES):
+    """
+    Pool of processes the discovery of `count` files is spread across
+
+    :param min_files: minimum number of files per process
+    :return: tuple(executor, number of processes) or tuple(None, 1) when
+             the pool is not worth it (or not available)
+    """
+    processes = min(get_discovery_processes(), count // min_files)
+    if processes <= 1:
+        return None, 1
+    try:
+        # The processes rely on the state they inherit when forked
+        # (such as :data:`_DISCOVERY_LOADER` and :data:`_DISCOVERY_CACHE`)
+        context = multiprocessing.get_context('fork')
+    except ValueError:
+        return None, 1
+    try:
+        try:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                processes, mp_context=context)
+        except TypeError:   # Python < 3.7, which forks them on POSIX
+            executor = concurrent.futures.ProcessPoolExecutor(processes)
+        return executor, processes
+    except (ImportError, OSError, NotImplementedError) as details:
+        LOG_UI.debug("Unable to spread the test discovery across "
+                     "processes: %s", details)
+        return None, 1
+
+
+def _iter_pool_results(executor, processes, function, items, args, cache):
+    """
+    Spreads the items across the processes of the pool in chunks
+
+    :param function: executed by the processes as
+                     ``function(chunk of items, *args)``, returning
+                     tuple(list of the results of each item, entries added
+                     to the discovery cache)
+    :param cache: discovery cache the entries are added to (or None)
+    :type cache: :class:`avocado.core.discovery_cache.DiscoveryCache`
+    :return: iterator of the results, in the order of the items
+    """
+    size = -(-len(items) // (processes * DISCOVERY_CHUNKS_PER_PROCESS))
+    if cache is not None:
+        # The processes only send back the entries they add
+        cache.pop_new_entries()
+    with executor:
+        futures = [executor.submit(function, items[start:start + size],
+                                   *args)
+                   for start in range(0, len(items), size)]
+        try:
+            for future in futures:
+                results, entries = future.result()
+                if cache is not None:
+                    cache.update(entries)
+                for result in results:
+                    yield result
+        finally:
+            # Don't wait for the results no longer needed
+            for future in futures:
+                future.cancel()
+
+
+def iter_file_discovery(kind, function, paths, cache=None,
+                        min_files=PARALLEL_DISCOVERY_MIN_FILES):
+    """
+    Discovers the tests of each of the files, spreading the work across a
+    pool of processes (see :func:`get_discovery_processes`) when there are
+    many of them
+
+    Meant for the loader plugins, whose discovery of the tests of a file
+    only depends on its content.
+
+    :param kind: kind of discovery (different for each function)
+    :param function: module level function returning the JSON serializable
+                     tests of the file given by its path
+    :param paths: list of the paths of the files
+    :param cache: cache of the tests of the files (or None)
+    :type cache: :class:`avocado.core.discovery_cache.DiscoveryCache`
+    :param min_files: minimum number of files per process (smaller for
+                      the discoveries executing the files)
+    :return: iterator of the tests of each file, in the order of the paths,
+             or of the exception raised by the function for that file
+             (which is not cached)
+    """
+    global _DISCOVERY_CACHE  # pylint: disable=W0603
+    executor, processes = _get_discovery_executor(len(paths), min_files)
+    if executor is None:
+        for path in paths:
+            yield _find_file_tests(kind, function, path, cache)
+        return
+    _DISCOVERY_CACHE = cache
+    try:
+        for tests in _iter_pool_results(executor, processes,
+                                        _find_files_tests, paths,
+                                        (kind, function), cache):
+            yield tests
+    finally:
+        _DISCOVERY_CACHE = None
+
+
 class FileLoader(TestLoader):
 
     """
@@ -565,6 +925,12 @@ class FileLoader(TestLoader):
         test_type = extra_params.pop('allowed_test_types', None)
         super(FileLoader, self).__init__(args, extra_params)
         self.test_type = test_type
+        if discovery_cache.is_enabled():
+            self._discovery_cache = discovery_cache.DiscoveryCache()
+            self._discovery = self._discovery_cache
+        else:
+            self._discovery_cache = None
+            self._discovery = safeloader
 
     @staticmethod
     def get_type_label_mapping():
@@ -602,7 +968,12 @@ class FileLoader(TestLoader):
         :type which_tests: :class:`DiscoverMode`
         :return: list of matching tests
         """
-        tests = self._discover(reference, which_tests)
+        try:
+            with safeloader.module_index():
+                tests = self._discover(reference, which_tests)
+        finally:
+            if self._discovery_cache is not None:
+                self._discovery_cache.save()
         if self.test_type:
             mapping = self.get_type_label_mapping()
             if self.test_type == 'INSTRUMENTED':
@@ -620,6 +991,33 @@ class FileLoader(TestLoader):
                         return None
         return tests
 
+    def iter_discover(self, reference, which_tests=DiscoverMode.DEFAULT):
+        """
+        Discover (possible) tests from a directory, yielding the tests of
+        each file as soon as they are found (see :meth:`discover`).
+
+        When "allowed_test_types" is supplied, all the tests have to be
+        found first to verify their types.
+
+        :param reference: the directory path to inspect.
+        :param which_tests: Limit tests to be displayed
+        :type which_tests: :class:`DiscoverMode`
+        :return: iterator of lists of matching tests
+        """
+        if self.test_type:
+            for tests in super(FileLoader, self).iter_discover(reference,
+                                                               which_tests):
+                yield tests
+            return
+        try:
+            with safeloader.module_index():
+                for tests in self._iter_discover(reference, which_tests):
+                    if tests:
+                        yield tests
+        finally:
+            if self._discovery_cache is not None:
+                self._discovery_cache.save()
+
     def _discover(self, reference, which_tests=DiscoverMode.DEFAULT):
         """
         Recursively walk in a directory and find tests params.
@@ -630,9 +1028,24 @@ class FileLoader(TestLoader):
         :type which_tests: :class:`DiscoverMode`
         :return: list of matching tests
         """
+        tests = []
+        for file_tests in self._iter_discover(reference, which_tests):
+            tests.extend(file_tests)
+        return tests
+
+    def _iter_discover(self, reference, which_tests=DiscoverMode.DEFAULT):
+        """
+        Recursively walk in a directory and find tests params, yielding
+        the tests of each file in alphabetic order of the files.
+
+        :param reference: the directory path to inspect.
+        :param which_tests: Limit tests to be displayed
+        :type which_tests: :class:`DiscoverMode`
+        :return: iterator of lists of matching tests
+        """
         if reference is None:
             if which_tests == DiscoverMode.DEFAULT:
-                return []  # Return empty set when not listing details
+                return  # Return empty set when not listing details
             else:
                 reference = data_dir.get_test_dir()
         ignore_suffix = ('.data', '.pyc', '.pyo', '__init__.py',
@@ -647,15 +1060,16 @@ class FileLoader(TestLoader):
                 subtests_filter = re.compile(_subtests_filter)
 
         if not os.path.isdir(reference):  # Single file
-            return self._make_tests(reference, which_tests == DiscoverMode.ALL,
-                                    subtests_filter)
+            yield self._make_tests(reference, which_tests == DiscoverMode.ALL,
+                                   subtests_filter)
+            return
 
-        tests = []
+        # Paths and subtests filters of the files to be inspected, in order
+        files = []
 
         def add_test_from_exception(exception):
             """ If the exc.filename is valid test it's added to tests """
-            tests.extend(self._make_tests(exception.filename,
-                                          which_tests == DiscoverMode.ALL))
+            files.append((exception.filename, None))
 
         def skip_non_test(exception):  # pylint: disable=W0613
             """ Always return None """
@@ -672,15 +1086,42 @@ class FileLoader(TestLoader):
                 if file_name.startswith('.') or file_name.endswith(ignore_suffix):
                     continue
 
-                pth = os.path.join(dirpath, file_name)
-                tests.extend(self._make_tests(pth,
-                                              which_tests == DiscoverMode.ALL,
-                                              subtests_filter))
-        return tests
+                files.append((os.path.join(dirpath, file_name),
+                              subtests_filter))
+        for tests in self._iter_files_tests(files,
+                                            which_tests == DiscoverMode.ALL):
+            yield tests
+
+    def _iter_files_tests(self, files, list_non_tests):
+        """
+        Create test templates from given files, spreading the work across
+        a pool of processes (see :func:`get_discovery_processes`) when
+        there are many of them
+
+        :param files: list of tuple(file system path, subtests filter)
+        :param list_non_tests: include bad tests (NotATest, BrokenSymlink,...)
+        :return: iterator of the lists of tests of each file, in the order
+                 of the files
+        """
+        global _DISCOVERY_LOADER  # pylint: disable=W0603
+        executor, processes = _get_discovery_executor(len(files))
+        if executor is None:
+            for path, subtests_filter in files:
+                yield self._make_tests(path, list_non_tests, subtests_filter)
+            return
+        _DISCOVERY_LOADER = self
+        try:
+            for tests in _iter_pool_results(executor, processes,
+                                            _make_files_tests, files,
+                                            (list_non_tests,),
+                                            self._discovery_cache):
+                yield tests
+        finally:
+            _DISCOVERY_LOADER = None
 
     def _find_python_unittests(self, test_path, disabled, subtests_filter):
         result = []
-        class_methods = safeloader.find_python_unittests(test_path)
+        class_methods = self._discovery.find_python_unittests(test_path)
         for klass, methods in class_methods.items():
             if klass in disabled:
                 continue
@@ -715,7 +1156,8 @@ class FileLoader(TestLoader):
             test_name = test_path
         try:
             # Avocado tests
-            avocado_tests, disabled = safeloader.find_avocado_tests(test_path)
+            avocado_tests, disabled = self._discovery.find_avocado_tests(
+                test_path)
             if avocado_tests:
                 test_factories = []
                 for test_class, info in avocado_tests.items():
@@ -15,6 +15,7 @@
 Module related to test parameters
 """
 
+import functools
 import logging
 import re
 
@@ -23,6 +24,68 @@ class NoMatchError(KeyError):
     pass
 
 
+class LeavesIndex:
+
+    """
+    Index of the leaves of a variant (or of a slice of it), built by the
+    params using them
+
+    It remembers the leaves matching each of the paths queried so far and
+    the leaves defining each of the keys (indexed at the first lookup of a
+    key), so a lookup doesn't need to match all the leaves against the
+    path again.
+    """
+
+    def __init__(self, leaves):
+        """
+        :param leaves: list of TreeNode leaves
+        """
+        self.leaves = list(leaves)
+        # names cache (leaf.path is quite expensive)
+        self.names = [leaf.path + '/' for leaf in self.leaves]
+        self._matches = {}
+        self._keys = None
+
+    def match(self, path):
+        """
+        Positions of the leaves matching the path
+
+        :param path: compiled path regex (see
+                     :meth:`AvocadoParams._greedy_path_to_re`)
+        :rtype: frozenset
+        """
+        matches = self._matches.get(path.pattern)
+        if matches is None:
+            matches = frozenset(i for i, name in enumerate(self.names)
+                                if path.search(name))
+            self._matches[path.pattern] = matches
+        return matches
+
+    def get_key_positions(self, key):
+        """
+        Positions of the leaves defining the key, in the order of the leaves
+        """
+        if self._keys is None:
+            self._keys = {}
+            for i, leaf in enumerate(self.leaves):
+                for leaf_key in leaf.environment:
+                    self._keys.setdefault(leaf_key, []).append(i)
+        return self._keys.get(key, ())
+
+    def get_leaves(self, path, key=None):
+        """
+        Leaves matching the path (and defining the key, when given), in the
+        order of the leaves
+        """
+        matches = self.match(path)
+        if key is None:
+            positions = sorted(matches)
+        else:
+            positions = [i for i in self.get_key_positions(key)
+                         if i in matches]
+        return [self.leaves[i] for i in positions]
+
+
 class AvocadoParams:
 
     """
@@ -47,21 +110,26 @@ class AvocadoParams:
         :type logger_name: str
         """
         self._rel_paths = []
-        leaves = list(leaves)
+        index = LeavesIndex(leaves)
+        # Positions of the leaves not matched by the previous paths
+        leaves = set(range(len(index.leaves)))
         for i, path in enumerate(paths):
-            path_leaves = self._get_matching_leaves(path, leaves)
+            path_leaves = self._get_matching_leaves(path, index, leaves)
             self._rel_paths.append(AvocadoParam(path_leaves,
                                                 '%d: %s' % (i, path)))
         # Don't use non-mux-path params for relative paths
-        path_leaves = self._get_matching_leaves('/*', leaves)
+        path_leaves = self._get_matching_leaves('/*', index, leaves)
         self._abs_path = AvocadoParam(path_leaves, '*: *')
         self._cache = {}     # TODO: Implement something more efficient
+        self._flattened = None
         self._logger_name = logger_name
 
     def __eq__(self, other):
         if set(self.__dict__) != set(other.__dict__):
             return False
         for attr in self.__dict__:
+            if attr == '_flattened':    # only depends on the other attrs
+                continue
             if (getattr(self, attr) != getattr(other, attr)):
                 return False
         return True
@@ -82,19 +150,21 @@ class AvocadoParams:
         else:
             return self._abs_path.str_leaves_variant
 
-    def _get_matching_leaves(self, path, leaves):
+    def _get_matching_leaves(self, path, index, leaves):
         """
         Pops and returns list of matching nodes
         :param path: Path (str)
-        :param leaves: list of TreeNode leaves
+        :param index: index of all the leaves
+        :type index: :class:`LeavesIndex`
+        :param leaves: set of the positions of the leaves (in the index)
+                       not popped yet
         """
-        path_re = self._greedy_path_to_re(path)
-        path_leaves = [leaf for leaf in leaves if path_re.search(leaf.path + '/')]
-        for leaf in path_leaves:
-            leaves.remove(leaf)
-        return path_leaves
+        matches = index.match(self._greedy_path_to_re(path)) & leaves
+        leaves -= matches
+        return [index.leaves[i] for i in sorted(matches)]
 
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def _greedy_path_to_re(path):
         """
         Converts user-friendly path with asterisk to a regex and compiles it
@@ -182,16 +252,28 @@ class AvocadoParams:
         Iterate through all available params and yield origin, key and value
         of each unique value.
         """
-        env = []
-        for param in self._rel_paths:
-            for path, key, value in param.iteritems():
-                if (path, key) not in env:
-                    env.append((path, key))
-                    yield (path, key, value)
-        for path, key, value in self._abs_path.iteritems():
-            if (path, key) not in env:
-                env.append((path, key))
-                yield (path, key, value)
+        return iter(self.get_flattened())
+
+    def get_flattened(self):
+        """
+        Origin, key and value of each unique value, in the order of
+        :meth:`iteritems`
+
+        It's computed once, then reused by all the consumers of these params
+        (such as the environment of the simple tests and the test state).
+
+        :rtype: tuple
+        """
+        if self._flattened is None:
+            seen = set()
+            items = []
+            for param in self._rel_paths + [self._abs_path]:
+                for path, key, value in param.iteritems():
+                    if (path, key) not in seen:
+                        seen.add((path, key))
+                        items.append((path, key, value))
+            self._flattened = tuple(items)
+        return self._flattened
 
 
 class AvocadoParam:
@@ -208,15 +290,15 @@ class AvocadoParam:
         """
         # Basic initialization
         self._leaves = leaves
-        # names cache (leaf.path is quite expensive)
-        self._leaf_names = [leaf.path + '/' for leaf in leaves]
+        self._index = LeavesIndex(leaves)
+        self._leaf_names = self._index.names
         self.name = name
 
     def __eq__(self, other):
-        if self.__dict__ == other.__dict__:
-            return True
-        else:
-            return False
+        # The index only depends on the leaves
+        return (self._leaves == other._leaves and
+                self._leaf_names == other._leaf_names and
+                self.name == other.name)
 
     def __ne__(self, other):
         return not (self == other)
@@ -230,9 +312,7 @@ class AvocadoParam:
         """
         Get all leaves matching the path
         """
-        return [self._leaves[i]
-                for i in range(len(self._leaf_names))
-                if path.search(self._leaf_names[i])]
+        return self._index.get_leaves(path)
 
     def get_or_die(self, path, key):
         """
@@ -240,10 +320,8 @@ class AvocadoParam:
         :raise NoMatchError: When no matches
         :raise KeyError: When value is not certain (multiple matches)
         """
-        leaves = self._get_leaves(path)
         ret = [(leaf.environment[key], leaf.environment.origin[key])
-               for leaf in leaves
-               if key in leaf.environment]
+               for leaf in self._index.get_leaves(path, key)]
         if not ret:
             raise NoMatchError("No matches to %s => %s in %s"
                                % (path.pattern, key, self.str_leaves_variant))
@@ -0,0 +1,94 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Accounting of the resources (CPU time, memory, I/O) used by tests
+
+The usage is measured by the test process itself, so it includes the
+resources of all the processes it waited for (such as the commands
+executed by :func:`avocado.utils.process.run`).  It's recorded in the
+``resources`` key of the test state, a dict with:
+
+* ``cpu_user``: user CPU time (seconds)
+* ``cpu_system``: system CPU time (seconds)
+* ``max_rss``: peak resident set size of the largest process (KiB)
+* ``io_read``: bytes read from block devices
+* ``io_write``: bytes written to block devices
+* ``ctx_voluntary``: voluntary context switches
+* ``ctx_involuntary``: involuntary context switches
+"""
+
+import resource
+
+
+#: Resource usage keys, in the order they are reported
+KEYS = ('cpu_user', 'cpu_system', 'max_rss', 'io_read', 'io_write',
+        'ctx_voluntary', 'ctx_involuntary')
+
+#: Size of the blocks counted by :func:`resource.getrusage`
+BLOCK_SIZE = 512
+
+
+def snapshot():
+    """
+    Resources used so far by this process and its (waited for) children
+
+    :rtype: dict
+    """
+    usage = [resource.getrusage(resource.RUSAGE_SELF),
+             resource.getrusage(resource.RUSAGE_CHILDREN)]
+    return {'cpu_user': sum(_.ru_utime for _ in usage),
+            'cpu_system': sum(_.ru_stime for _ in usage),
+            'max_rss': max(_.ru_maxrss for _ in usage),
+            'io_read': sum(_.ru_inblock for _ in usage) * BLOCK_SIZE,
+            'io_write': sum(_.ru_oublock for _ in usage) * BLOCK_SIZE,
+            'ctx_voluntary': sum(_.ru_nvcsw for _ in usage),
+            'ctx_involuntary': sum(_.ru_nivcsw for _ in usage)}
+
+
+def usage_since(start):
+    """
+    Resources used since a snapshot was taken
+
+    The peak memory usage can't be reset, so ``max_rss`` is the one of
+    the whole process (and children) life.
+
+    :param start: the earlier snapshot
+    :type start: dict (see :func:`snapshot`)
+    :rtype: dict
+    """
+    usage = snapshot()
+    for key in KEYS:
+        if key != 'max_rss':
+            usage[key] -= start[key]
+    # getrusage() has a microsecond resolution
+    for key in ('cpu_user', 'cpu_system'):
+        usage[key] = round(usage[key], 6)
+    return usage
+
+
+def format_usage(usage):
+    """
+    Human readable representation of the resource usage
+
+    :param usage: resource usage (see :func:`usage_since`)
+    :type usage: dict
+    :rtype: str
+    """
+    return ("cpu %.2fs user, %.2fs system; max rss %.1f MiB; "
+            "io %d B read, %d B written; ctx switches %d voluntary, "
+            "%d involuntary" % (usage['cpu_user'], usage['cpu_system'],
+                                usage['max_rss'] / 1024.0,
+                                usage['io_read'], usage['io_write'],
+                                usage['ctx_voluntary'],
+                                usage['ctx_involuntary']))
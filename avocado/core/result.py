@@ -43,6 +43,8 @@ class Result:
         self.interrupted = 0
         self.cancelled = 0
         self.tests = []
+        #: Shard of the test suite executed by the job, tuple(index, total)
+        self.shard = None
 
     def _reconcile(self):
         """
@@ -0,0 +1,183 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Cache of passing test results, used to skip tests whose inputs did not
+change since they passed.
+
+The inputs of a test are hashed into a key, which consists of:
+
+* the avocado version
+* the test name (including the variant id), class and method
+* the content of the test file (module or executable)
+* the content of the test data directory (``$FILE.data``, which holds
+  all the test :attr:`avocado.core.test.TestData.DATA_SOURCES`)
+* the test params (the variant)
+* the avocado configuration
+"""
+
+import hashlib
+import json
+import os
+
+from . import data_dir
+from . import history
+from . import test
+from .output import LOG_JOB
+from .settings import settings
+from .version import VERSION
+from ..utils import astring
+
+
+#: Name of the result cache directory (in the avocado data dir)
+CACHE_DIRNAME = 'result_cache'
+
+
+def _hash_file(digest, path):
+    with open(path, 'rb') as file_obj:
+        for chunk in iter(lambda: file_obj.read(65536), b''):
+            digest.update(chunk)
+
+
+def _hash_tree(digest, path):
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode(
+                astring.ENCODING))
+            if os.path.isfile(file_path):
+                _hash_file(digest, file_path)
+
+
+def _get_test_file(test_factory):
+    """
+    Returns the file holding the test, None for non-cacheable tests
+    """
+    test_class, test_parameters = test_factory
+    if isinstance(test_class, str):     # INSTRUMENTED tests
+        return test_parameters.get('modulePath')
+    if test_class is test.SimpleTest:
+        return test_parameters.get('executable')
+    return None
+
+
+class ResultCache:
+
+    """
+    Cache of passing test results stored in the avocado data dir
+
+    Each entry is a small JSON file named after the key of the test
+    inputs and pointing to the original test result.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: cache directory (defaults to :data:`CACHE_DIRNAME`
+                     in the avocado data dir)
+        """
+        if path is None:
+            path = data_dir.get_datafile_path(CACHE_DIRNAME)
+        self.path = path
+        self._config_fingerprint = None
+        #: Keys of the tests to be recorded when they pass (by test uid)
+        self._pending = {}
+
+    def _get_config_fingerprint(self):
+        if self._config_fingerprint is None:
+            config = settings.config
+            self._config_fingerprint = repr(
+                [(section, sorted(config.items(section)))
+                 for section in sorted(config.sections())])
+        return self._config_fingerprint
+
+    def get_key(self, test_factory):
+        """
+        Computes the key of the test inputs
+
+        :param test_factory: named test factory (test class and parameters)
+        :return: the key or None when the test is not cacheable
+        """
+        test_file = _get_test_file(test_factory)
+        if test_file is None or not os.path.isfile(test_file):
+            return None
+        test_class, test_parameters = test_factory
+        digest = hashlib.sha1()
+        for item in (VERSION,
+                     history.get_test_key(test_parameters.get('name')),
+                     getattr(test_class, '__name__', test_class),
+                     test_parameters.get('methodName', ''),
+                     self._get_config_fingerprint()):
+            digest.update(astring.to_text(item).encode(astring.ENCODING))
+            digest.update(b'\0')
+        try:
+            _hash_file(digest, test_file)
+            data_path = test_file + '.data'
+            if os.path.isdir(data_path):
+                _hash_tree(digest, data_path)
+        except (IOError, OSError):
+            return None
+        variant, paths = test_parameters.get('params', (None, None))
+        for node in sorted(variant or [], key=lambda node: node.path):
+            digest.update(node.fingerprint().encode(astring.ENCODING))
+        digest.update(repr(paths).encode(astring.ENCODING))
+        return digest.hexdigest()
+
+    def lookup(self, key):
+        """
+        Returns the recorded result of passing test with this key
+
+        :return: dict with "name", "job_id" and "logdir" of the original
+                 result or None
+        """
+        try:
+            with open(os.path.join(self.path, key), 'r') as entry:
+                return json.load(entry)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def expect(self, test_id, key):
+        """
+        Remembers the key of a test to be recorded once it passes
+
+        :param test_id: test id
+        :type test_id: :class:`avocado.core.test.TestID`
+        :param key: key of the test inputs (see :meth:`get_key`)
+        """
+        self._pending[test_id.uid] = key
+
+    def record(self, test_state, job_id):
+        """
+        Records the result of a finished test (only PASS is cached)
+
+        :param test_state: final test state
+        :param job_id: unique id of the job the test was executed by
+        """
+        test_id = test_state.get('name')
+        key = self._pending.pop(getattr(test_id, 'uid', None), None)
+        if key is None or test_state.get('status') != 'PASS':
+            return
+        entry = {'name': str(test_id),
+                 'job_id': job_id,
+                 'logdir': test_state.get('logdir'),
+                 'time': test_state.get('time_end')}
+        tmp_path = os.path.join(self.path, "%s.%s.tmp" % (key, os.getpid()))
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            with open(tmp_path, 'w') as entry_file:
+                json.dump(entry, entry_file)
+            os.rename(tmp_path, os.path.join(self.path, key))
+        except (IOError, OSError) as details:
+            LOG_JOB.debug("Unable to record the result of %s in the result "
+                          "cache: %s", test_id, details)
@@ -17,22 +17,37 @@
 Test runner module.
 """
 
+import asyncio
+import collections
+import importlib
+import itertools
 import multiprocessing
+import multiprocessing.connection
 import os
 import signal
 import sys
 import time
 
+from . import asyncrunner
 from . import defaults
 from . import exceptions
+from . import history
+from . import isolation
+from . import jobdata
 from . import output
+from . import result_cache
+from . import shard
 from . import status
 from . import test
+from . import teststate
+from . import timebox
 from . import tree
+from . import unittestbatch
 from . import varianter
 from .loader import loader
 from .status import mapping
 from .settings import settings
+from ..utils import cgroup
 from ..utils import wait
 from ..utils import runtime
 from ..utils import process
@@ -61,8 +76,13 @@ def add_runner_failure(test_state, new_status, message):
     else:
         test_state["text_output"] = message + "\n"
     if test_log:
-        with open(test_log, "a") as log_file:
-            log_file.write('\n' + message + '\n')
+        try:
+            with open(test_log, "a") as log_file:
+                log_file.write('\n' + message + '\n')
+        except (IOError, OSError) as details:
+            # Such as the log of a test executed by a (lost) remote worker
+            TEST_LOG.debug("Unable to append the runner failure to the "
+                           "test log %s: %s", test_log, details)
     # Update the results
     if test_state.get("fail_reason"):
         test_state["fail_reason"] = "%s\n%s" % (test_state["fail_reason"],
@@ -90,6 +110,10 @@ class TestStatus:
         """
         self.job = job
         self.queue = queue
+        # Underlying pipe, used to sleep until a message arrives
+        self._reader = getattr(queue, '_reader', None)
+        # Messages read while looking for the early_status
+        self._unprocessed = []
         self._early_status = None
         self.status = {}
         self.interrupt = None
@@ -103,7 +127,7 @@ class TestStatus:
         :rtype: dict
         """
         try:
-            return self.queue.get()
+            return teststate.unpack(self.queue.get())
         # Let's catch all exceptions, since errors here mean a
         # crash in avocado.
         except Exception as details:
@@ -119,24 +143,62 @@ class TestStatus:
         if self._early_status:
             return self._early_status
         else:
-            queue = []
             while not self.queue.empty():
                 msg = self._get_msg_from_queue()
                 if msg is None:
                     break
                 if "early_status" in msg:
                     self._early_status = msg
-                    for _ in queue:     # Return all unprocessed messages back
-                        self.queue.put(_)
                     return msg
-                else:   # Not an early_status message
-                    queue.append(msg)
+                else:   # Not an early_status message, process it later
+                    self._unprocessed.append(msg)
+
+    def wait(self, proc, timeout):
+        """
+        Wait for a new message or for the test process to finish and
+        process all available messages.
+
+        The current thread sleeps until the queue's pipe becomes readable
+        or until the process' sentinel is signaled, there is no polling
+        involved.
+
+        :param proc: test process (None to wait only for messages)
+        :param timeout: maximum time to wait (in seconds)
+        """
+        if proc is not None and not proc.is_alive():
+            timeout = 0     # Already finished, there is nothing to wait for
+        if timeout > 0 and not self._unprocessed:
+            handles = self.get_wait_handles(proc)
+            if handles:
+                multiprocessing.connection.wait(handles, timeout)
+            else:
+                wait.wait_for(lambda: (not self.queue.empty() or
+                                       (proc is not None and
+                                        not proc.is_alive())),
+                              timeout, 0, 0.01)
+        self._tick()
 
-    def __getattribute__(self, name):
-        # Update state before returning the value
-        if name in ("status", "interrupt"):
-            self._tick()
-        return super(TestStatus, self).__getattribute__(name)
+    def get_wait_handles(self, proc):
+        """
+        Get objects signaling new messages or the test process termination
+
+        :param proc: test process (None to ignore the process)
+        :return: list of objects suitable for
+                 :func:`multiprocessing.connection.wait` (empty when it's
+                 not possible to sleep and one has to poll instead)
+        """
+        if self._reader is None:
+            return []
+        if self._unprocessed:   # Messages are ready, do not sleep
+            return []
+        handles = [self._reader]
+        if proc is not None and proc.is_alive():
+            if multiprocessing.connection.wait([proc.sentinel], 0):
+                # The process is exiting but it was not reaped yet, the
+                # sentinel would wake us up immediately
+                return []
+            handles.append(proc.sentinel)
+        return handles
 
     def wait_for_early_status(self, proc, timeout):
         """
@@ -145,31 +207,53 @@ class TestStatus:
         :param timeout: timeout for early_state
         :raise exceptions.TestError: On timeout/error
         """
-        step = 0.01
         end = time.time() + timeout
-        while not self.early_status:
-            if not proc.is_alive():
-                if not self.early_status:
-                    raise exceptions.TestError("Process died before it pushed "
-                                               "early test_status.")
-            if time.time() > end and not self.early_status:
-                os.kill(proc.pid, signal.SIGTERM)
-                if not wait.wait_for(lambda: not proc.is_alive(), 1, 0, 0.01):
-                    os.kill(proc.pid, signal.SIGKILL)
-                msg = ("Unable to receive test's early-status in %ss, "
-                       "something wrong happened probably in the "
-                       "avocado framework." % timeout)
-                raise exceptions.TestError(msg)
-            time.sleep(step)
+        while not self.check_early_status(proc, end, timeout):
+            handles = self.get_wait_handles(proc)
+            if handles:
+                multiprocessing.connection.wait(handles,
+                                                max(end - time.time(), 0))
+            else:
+                time.sleep(0.01)
+
+    def check_early_status(self, proc, end, timeout):
+        """
+        Non-blocking check whether the early_status was obtained
+        :param proc: test process
+        :param end: time when to give up waiting for the early_status
+        :param timeout: timeout for early_state (used in the error message)
+        :return: True when early_status is available, False otherwise
+        :raise exceptions.TestError: On timeout/error
+        """
+        if self.early_status:
+            return True
+        if not proc.is_alive():
+            if not self.early_status:
+                raise exceptions.TestError("Process died before it pushed "
+                                           "early test_status.")
+            return True
+        if time.time() > end and not self.early_status:
+            os.kill(proc.pid, signal.SIGTERM)
+            proc.join(1)
+            if proc.is_alive():
+                os.kill(proc.pid, signal.SIGKILL)
+            msg = ("Unable to receive test's early-status in %ss, "
+                   "something wrong happened probably in the "
+                   "avocado framework." % timeout)
+            raise exceptions.TestError(msg)
+        return False
 
     def _tick(self):
         """
         Process the queue and update current status
         """
-        while not self.queue.empty():
-            msg = self._get_msg_from_queue()
-            if msg is None:
-                break
+        while self._unprocessed or not self.queue.empty():
+            if self._unprocessed:
+                msg = self._unprocessed.pop(0)
+            else:
+                msg = self._get_msg_from_queue()
+                if msg is None:
+                    break
             if "func_at_exit" in msg:
                 self.job.funcatexit.register(msg["func_at_exit"],
                                              msg.get("args", tuple()),
@@ -204,14 +288,17 @@ class TestStatus:
 
         :param proc: The test's process
         :param started: Time when the test started
-        :param first: Delay before first check
-        :param step: Step between checks for the status
+        :param step: Unused, the status is no longer polled (kept for
+                     backward compatibility)
         :param deadline: Test execution deadline
         :param result_dispatcher: Result dispatcher (for test_progress
                notifications)
         """
         # Wait for either process termination or test status
-        wait.wait_for(lambda: not proc.is_alive() or self.status, 1, 0, step)
+        end = time.time() + 1
+        self._tick()
+        while proc.is_alive() and not self.status and time.time() < end:
+            self.wait(proc, end - time.time())
         if self.status:     # status exists, wait for process to finish
             timeout_process_alive = settings.get_value(
                 'runner.timeout',
@@ -221,7 +308,13 @@ class TestStatus:
             deadline = min(deadline, time.time() + timeout_process_alive)
             while time.time() < deadline:
                 result_dispatcher.map_method('test_progress', False)
-                if wait.wait_for(lambda: not proc.is_alive(), 1, 0, step):
+                # Keep reading the queue, the process might be blocked
+                # writing into it
+                end = min(deadline, time.time() + 1)
+                while proc.is_alive() and time.time() < end:
+                    self.wait(proc, end - time.time())
+                if not proc.is_alive():
+                    self._tick()
                     return self._add_status_failures(self.status)
             err = "Test reported status but did not finish"
         else:   # proc finished, wait for late status delivery
@@ -233,7 +326,10 @@ class TestStatus:
             deadline = min(deadline, time.time() + timeout_process_died)
             while time.time() < deadline:
                 result_dispatcher.map_method('test_progress', False)
-                if wait.wait_for(lambda: self.status, 1, 0, step):
+                end = min(deadline, time.time() + 1)
+                while not self.status and time.time() < end:
+                    self.wait(None, end - time.time())
+                if self.status:
                     # Status delivered after the test process finished, pass
                     return self._add_status_failures(self.status)
             err = "Test died without reporting the status."
@@ -256,19 +352,197 @@ class TestStatus:
         if proc.is_alive():
             TEST_LOG.warning("Killing hanged test process %s" % proc.pid)
             os.kill(proc.pid, signal.SIGTERM)
-            if not wait.wait_for(lambda: not proc.is_alive(), 1, 0, 0.01):
+            proc.join(1)
+            if proc.is_alive():
                 os.kill(proc.pid, signal.SIGKILL)
-                end_time = time.time() + 60
-                while time.time() < end_time:
-                    if not proc.is_alive():
-                        break
-                    time.sleep(0.1)
-                else:
+                proc.join(60)
+                if proc.is_alive():
                     raise exceptions.TestError("Unable to destroy test's "
                                                "process (%s)" % proc.pid)
         return self._add_status_failures(test_state)
 
 
+class TestSlot:
+
+    """
+    Book-keeping of a test executed by the parallel runner
+    """
+
+    def __init__(self, index, proc, test_status, job_deadline=None,
+                 kill=process.kill_process_tree):
+        """
+        :param index: Position of the test in the job (0 based)
+        :param proc: The test's process
+        :param test_status: Test status handler of this test
+        :type test_status: :class:`TestStatus`
+        :param job_deadline: Maximum time to execute (or None)
+        :param kill: function sending a signal to the test process tree,
+                     called with the PID and the signal
+        """
+        self.index = index
+        self.kill = kill
+        self.proc = proc
+        self.test_status = test_status
+        self.job_deadline = job_deadline
+        self.time_started = time.time()
+        #: Until when to wait for the early status
+        self.early_deadline = self.time_started + 60
+        #: Test execution deadline (known after early status is received)
+        self.deadline = None
+        #: Deadline to finish the test (set once the test stops running)
+        self.finish_deadline = None
+        #: When the test status and test process got out of sync
+        self.time_settled = None
+        self.abort_reason = None
+        self.start_reported = False
+        #: The final test state
+        self.test_state = None
+
+    @property
+    def early_status(self):
+        """
+        The test state reported once the test was initialized
+        """
+        return self.test_status.early_status
+
+    def abort(self, reason, sig):
+        """
+        Interrupt the test
+
+        :param reason: Reason recorded in the test results
+        :param sig: Signal to be sent to the test process (tree)
+        """
+        self.abort_reason = reason
+        if sig == signal.SIGTERM:
+            try:
+                os.kill(self.proc.pid, sig)
+            except OSError:
+                pass
+        else:
+            self.kill(self.proc.pid, sig)
+        self.finish_deadline = time.time() + settings.get_value(
+            'runner.timeout',
+            'after_interrupted',
+            key_type=int,
+            default=defaults.TIMEOUT_AFTER_INTERRUPTED)
+
+
+class TestProcessPool:
+
+    """
+    Test processes forked ahead of time
+
+    The processes are forked from the runner process, which already has
+    avocado (and the preloaded modules) imported, before they are needed.
+    Each of them waits for the index of the test it should execute and
+    executes exactly one test, so every test still gets a clean process.
+    """
+
+    def __init__(self, target, args, size):
+        """
+        :param target: function executed in the test process, it's called
+                       with `args` followed by the connection to receive
+                       the test index from and by the test queue
+        :param args: initial arguments of `target`
+        :type args: tuple
+        :param size: number of idle processes to be kept around
+        """
+        self.target = target
+        self.args = args
+        self.size = size
+        self._idle = collections.deque()
+
+    def fill(self):
+        """
+        Fork the missing idle processes
+        """
+        while len(self._idle) < self.size:
+            queue = multiprocessing.SimpleQueue()
+            reader, writer = multiprocessing.Pipe(duplex=False)
+            proc = multiprocessing.Process(target=self.target,
+                                           args=self.args + (reader, queue))
+            # ctrl+z is handled by the runner (see `TestRunner.run_test`)
+            handler = signal.signal(signal.SIGTSTP, signal.SIG_IGN)
+            try:
+                proc.start()
+            finally:
+                signal.signal(signal.SIGTSTP, handler)
+            reader.close()
+            self._idle.append((proc, queue, writer))
+
+    def start(self, index):
+        """
+        Start the test using one of the idle processes
+
+        :param index: index of the test (in the list of test factories)
+        :return: tuple(test process, test queue)
+        """
+        if not self._idle:
+            self.fill()
+        proc, queue, writer = self._idle.popleft()
+        writer.send(index)
+        writer.close()
+        # Prepare the next one while this test is running
+        self.fill()
+        return proc, queue
+
+    def close(self):
+        """
+        Terminate all the idle processes
+        """
+        while self._idle:
+            proc, _, writer = self._idle.popleft()
+            try:
+                writer.send(None)
+            except (IOError, OSError):
+                pass
+            writer.close()
+            proc.join(1)
+            if proc.is_alive():
+                os.kill(proc.pid, signal.SIGKILL)
+                proc.join()
+
+
+class CtrlCPresses:
+
+    """
+    Tracks the ctrl+c presses while the tests are executed
+
+    The first one interrupts the tests, the following ones (out of the
+    ignore window started by the last interruption) kill them.
+    """
+
+    #: Returned by :meth:`press` when the tests should be interrupted
+    INTERRUPT = 'interrupt'
+    #: Returned by :meth:`press` when the tests should be killed
+    KILL = 'kill'
+
+    def __init__(self, ignore_window=2.0):
+        """
+        :param ignore_window: time (in seconds) after the interruption
+                              during which new presses are ignored
+        """
+        self.ignore_window = ignore_window
+        #: Number of presses so far
+        self.count = 0
+        self._time_started = time.time()
+
+    def press(self):
+        """
+        Registers a ctrl+c press
+
+        :return: :data:`INTERRUPT`, :data:`KILL` or None when ignored
+        """
+        time_elapsed = time.time() - self._time_started
+        self.count += 1
+        if self.count == 1:
+            self._time_started = time.time()
+            return self.INTERRUPT
+        if time_elapsed > self.ignore_window:
+            return self.KILL
+        return None
+
+
 class TestRunner:
 
     """
@@ -290,8 +564,13 @@ class TestRunner:
         self.job = job
         self.result = result
         self.sigstopped = False
+        self._process_pool = None
+        self._result_cache = None
+        self._cgroups = None
+        #: Indexes of the tests left out by the job timeout plan
+        self._planned_out = set()
 
-    def _run_test(self, test_factory, queue):
+    def _run_test(self, test_factory, queue, report_start=True):
         """
         Run a test instance.
 
@@ -304,6 +583,11 @@ class TestRunner:
         :type test_factory: tuple of :class:`avocado.core.test.Test` and dict.
         :param queue: Multiprocess queue.
         :type queue: :class:`multiprocessing.Queue` instance.
+        :param report_start: Whether to notify the result (events) about the
+                             test start from the test process (the parallel
+                             runner does that from the runner process in
+                             order to keep the reports ordered).
+        :type report_start: bool
         """
         sys.stdout = output.LoggingFile(["[stdout] "], loggers=[TEST_LOG])
         sys.stderr = output.LoggingFile(["[stderr] "], loggers=[TEST_LOG])
@@ -323,6 +607,8 @@ class TestRunner:
         # `multiprocessing.Process()`
         os.dup2(sys.stdin.fileno(), 0)
 
+        if self._cgroups is not None:
+            self._cgroups.enter()
         instance = loader.load_test(test_factory)
         if instance.runner_queue is None:
             instance.set_runner_queue(queue)
@@ -330,14 +616,15 @@ class TestRunner:
         early_state = instance.get_state()
         early_state['early_status'] = True
         try:
-            queue.put(early_state)
+            queue.put(teststate.pack(early_state))
         except Exception:
             instance.error(stacktrace.str_unpickable_object(early_state))
 
-        self.result.start_test(early_state)
-        self.job._result_events_dispatcher.map_method('start_test',
-                                                      self.result,
-                                                      early_state)
+        if report_start:
+            self.result.start_test(early_state)
+            self.job._result_events_dispatcher.map_method('start_test',
+                                                          self.result,
+                                                          early_state)
         if getattr(self.job.args, 'log_test_data_directories', False):
             data_sources = getattr(instance, "DATA_SOURCES", [])
             if data_sources:
@@ -350,16 +637,70 @@ class TestRunner:
                     if location is not None:
                         TEST_LOG.info('  %s: %s', source, location)
                 TEST_LOG.info('')
+        if self._cgroups is not None:
+            try:
+                self._cgroups.set_limits(instance)
+            except cgroup.CgroupError as details:
+                # Fail the test instead of executing it without the limits
+                error = exceptions.TestError(details)
+
+                def cgroup_error():
+                    raise error
+                instance._run_avocado = cgroup_error
         try:
             instance.run_avocado()
         finally:
             try:
                 state = instance.get_state()
-                queue.put(state)
+                queue.put(teststate.pack(state))
             except Exception:
                 instance.error(stacktrace.str_unpickable_object(state))
 
-    def run_test(self, test_factory, queue, summary, job_deadline=0):
+    def _run_preforked_test(self, test_factories, report_start, conn, queue):
+        """
+        Wait for the test index and run the test (see :class:`TestProcessPool`)
+
+        :param test_factories: list of all test factories of this job
+        :param report_start: see :meth:`_run_test`
+        :param conn: connection to receive the test index from
+        :param queue: Multiprocess queue.
+        :type queue: :class:`multiprocessing.SimpleQueue` instance.
+        """
+        # ctrl+c is handled by the runner, which terminates idle processes
+        handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            index = conn.recv()
+        except EOFError:
+            index = None
+        finally:
+            conn.close()
+        if index is None:   # Not needed anymore
+            return
+        signal.signal(signal.SIGINT, handler)
+        self._run_test(test_factories[index], queue, report_start)
+
+    def _start_test_process(self, test_factory, queue, index=None,
+                            report_start=True):
+        """
+        Start the test process
+
+        :param test_factory: Test factory (test class and parameters).
+        :param queue: Multiprocess queue (not used by pre-forked processes)
+        :param index: index of the test in the job, pre-forked processes
+                      are only used when it's set
+        :param report_start: see :meth:`_run_test`
+        :return: tuple(test process, test queue)
+        """
+        if index is not None and self._process_pool is not None:
+            return self._process_pool.start(index)
+        proc = multiprocessing.Process(target=self._run_test,
+                                       args=(test_factory, queue,
+                                             report_start))
+        proc.start()
+        return proc, queue
+
+    def run_test(self, test_factory, queue, summary, job_deadline=0,
+                 index=None):
         """
         Run a test instance inside a subprocess.
 
@@ -371,38 +712,23 @@ class TestRunner:
         :type summary: set.
         :param job_deadline: Maximum time to execute.
         :type job_deadline: int.
+        :param index: Index of the test in the job (allows to use
+                      pre-forked test processes).
+        :type index: int.
         """
-        proc = None
-        sigtstp = multiprocessing.Lock()
-
-        def sigtstp_handler(signum, frame):     # pylint: disable=W0613
-            """ SIGSTOP all test processes on SIGTSTP """
-            if not proc:    # Ignore ctrl+z when proc not yet started
-                return
-            with sigtstp:
-                msg = "ctrl+z pressed, %%s test (%s)" % proc.pid
-                app_log_msg = '\n%s' % msg
-                if self.sigstopped:
-                    APP_LOG.info(app_log_msg, "resumming")
-                    TEST_LOG.info(msg, "resumming")
-                    process.kill_process_tree(proc.pid, signal.SIGCONT, False)
-                    self.sigstopped = False
-                else:
-                    APP_LOG.info(app_log_msg, "stopping")
-                    TEST_LOG.info(msg, "stopping")
-                    process.kill_process_tree(proc.pid, signal.SIGSTOP, False)
-                    self.sigstopped = True
-
-        proc = multiprocessing.Process(target=self._run_test,
-                                       args=(test_factory, queue,))
-        test_status = TestStatus(self.job, queue)
-
         cycle_timeout = 1
         time_started = time.time()
         signal.signal(signal.SIGTSTP, signal.SIG_IGN)
-        proc.start()
-        signal.signal(signal.SIGTSTP, sigtstp_handler)
+        report_start = self._report_start_from_test_process()
+        proc, queue = self._start_test_process(test_factory, queue, index,
+                                               report_start)
+        self._install_sigtstp_handler(lambda: [proc.pid])
+        test_status = TestStatus(self.job, queue)
         test_status.wait_for_early_status(proc, 60)
+        if not report_start:
+            self.result.start_test(test_status.early_status)
+            self.job._result_events_dispatcher.map_method(
+                'start_test', self.result, test_status.early_status)
 
         # At this point, the test is already initialized and we know
         # for sure if there's a timeout set.
@@ -415,12 +741,8 @@ class TestRunner:
         else:
             deadline = test_deadline
 
-        ctrl_c_count = 0
-        ignore_window = 2.0
-        ignore_time_started = time.time()
-        stage_1_msg_displayed = False
+        ctrl_c = CtrlCPresses()
         stage_2_msg_displayed = False
-        first = 0.01
         step = 0.01
         abort_reason = None
         result_dispatcher = self.job._result_events_dispatcher
@@ -434,12 +756,12 @@ class TestRunner:
                     except OSError:
                         pass
                     break
-                wait.wait_for(lambda: not queue.empty() or not proc.is_alive(),
-                              cycle_timeout, first, step)
+                test_status.wait(proc, min(cycle_timeout,
+                                           deadline - time.time()))
                 if test_status.interrupt:
                     break
                 if proc.is_alive():
-                    if ctrl_c_count == 0:
+                    if ctrl_c.count == 0:
                         if (test_status.status.get('running') or
                                 self.sigstopped):
                             result_dispatcher.map_method('test_progress',
@@ -449,25 +771,21 @@ class TestRunner:
                 else:
                     break
             except KeyboardInterrupt:
-                time_elapsed = time.time() - ignore_time_started
-                ctrl_c_count += 1
-                if ctrl_c_count == 1:
-                    if not stage_1_msg_displayed:
-                        abort_reason = "Interrupted by ctrl+c"
-                        self.job.log.debug("\nInterrupt requested. Waiting %d "
-                                           "seconds for test to finish "
-                                           "(ignoring new Ctrl+C until then)",
-                                           ignore_window)
-                        stage_1_msg_displayed = True
-                    ignore_time_started = time.time()
-                    process.kill_process_tree(proc.pid, signal.SIGINT)
-                if (ctrl_c_count > 1) and (time_elapsed > ignore_window):
+                action = ctrl_c.press()
+                if action == CtrlCPresses.INTERRUPT:
+                    abort_reason = "Interrupted by ctrl+c"
+                    self.job.log.debug("\nInterrupt requested. Waiting %d "
+                                       "seconds for test to finish "
+                                       "(ignoring new Ctrl+C until then)",
+                                       ctrl_c.ignore_window)
+                    self._kill_test_process(proc.pid, signal.SIGINT)
+                elif action == CtrlCPresses.KILL:
                     if not stage_2_msg_displayed:
                         abort_reason = "Interrupted by ctrl+c (multiple-times)"
                         self.job.log.debug("Killing test subprocess %s",
                                            proc.pid)
                         stage_2_msg_displayed = True
-                    process.kill_process_tree(proc.pid, signal.SIGKILL)
+                    self._kill_test_process(proc.pid, signal.SIGKILL)
 
         # Get/update the test status (decrease timeout on abort)
         if abort_reason:
@@ -481,6 +799,8 @@ class TestRunner:
         test_state = test_status.finish(proc, time_started, step,
                                         finish_deadline,
                                         result_dispatcher)
+        if self._cgroups is not None:
+            self._cgroups.remove(proc.pid)
 
         # Try to log the timeout reason to test's results and update test_state
         if abort_reason:
@@ -488,16 +808,36 @@ class TestRunner:
                                             abort_reason)
 
         # don't process other tests from the list
-        if ctrl_c_count > 0:
+        if ctrl_c.count > 0:
             self.job.log.debug('')
 
+        if not self._report_end_test(test_state, summary):
+            return False
+
+        if ctrl_c.count > 0:
+            return False
+        return True
+
+    def _report_end_test(self, test_state, summary):
+        """
+        Validates the final test state and reports it to the results
+
+        :param test_state: Final test state (dict)
+        :param summary: Contains types of test failures.
+        :type summary: set.
+        :return: False when the job should be interrupted (failfast)
+        :rtype: bool
+        """
         # Make sure the test status is correct
         if test_state.get('status') not in status.user_facing_status:
             test_state = add_runner_failure(test_state, "ERROR", "Test reports"
                                             " unsupported test status.")
 
         self.result.check_test(test_state)
-        result_dispatcher.map_method('end_test', self.result, test_state)
+        self.job._result_events_dispatcher.map_method('end_test', self.result,
+                                                      test_state)
+        if self._result_cache is not None:
+            self._result_cache.record(test_state, self.job.unique_id)
         if test_state['status'] == "INTERRUPTED":
             summary.add("INTERRUPTED")
         elif not mapping[test_state['status']]:
@@ -507,9 +847,221 @@ class TestRunner:
                 summary.add("INTERRUPTED")
                 self.job.log.debug("Interrupting job (failfast).")
                 return False
+        return True
+
+    def _get_parallel(self):
+        """
+        Number of tests to be executed at the same time
+
+        Uses the "--parallel" option when set, otherwise the "parallel"
+        key from the "runner" section of the settings.
+        """
+        parallel = getattr(self.job.args, 'parallel', None)
+        if parallel is None:
+            parallel = settings.get_value('runner', 'parallel', key_type=int,
+                                          default=1)
+        if parallel < 1:
+            raise exceptions.OptionValidationError("The number of parallel "
+                                                   "tests has to be positive, "
+                                                   "got %s" % parallel)
+        return parallel
+
+    def _get_prefork(self):
+        """
+        Whether to fork the test processes ahead of time
+
+        Uses the "--prefork" option when set, otherwise the "prefork"
+        key from the "runner" section of the settings.
+        """
+        prefork = getattr(self.job.args, 'prefork', None)
+        if prefork is None:
+            return settings.get_value('runner', 'prefork', key_type=bool,
+                                      default=False)
+        return prefork == 'on'
+
+    def _get_engine(self):
+        """
+        Engine executing the tests (see :data:`asyncrunner.ENGINES`)
+
+        Uses the "--engine" option when set, otherwise the "engine" key
+        from the "runner" section of the settings.
+        """
+        engine = getattr(self.job.args, 'engine', None)
+        if engine is None:
+            engine = settings.get_value('runner', 'engine',
+                                        default='process')
+        if engine not in asyncrunner.ENGINES:
+            engines = ", ".join(asyncrunner.ENGINES)
+            raise exceptions.OptionValidationError("Unknown test execution "
+                                                   "engine '%s', use one of: "
+                                                   "%s" % (engine, engines))
+        return engine
+
+    def _get_unittest_batch(self):
+        """
+        Maximum number of Python unittests executed by a single
+        interpreter (see :mod:`unittestbatch`)
+
+        Uses the "--unittest-batch" option when set, otherwise the
+        "unittest_batch" key from the "runner" section of the settings.
+
+        :return: the batch size, 0 or 1 when the batches are disabled
+        """
+        size = getattr(self.job.args, 'unittest_batch', None)
+        if size is None:
+            size = settings.get_value('runner', 'unittest_batch',
+                                      key_type=int, default=0)
+        if size < 0:
+            raise exceptions.OptionValidationError("The size of the Python "
+                                                   "unittest batches can't "
+                                                   "be negative, got %s"
+                                                   % size)
+        return size
 
-        if ctrl_c_count > 0:
+    @staticmethod
+    def _is_unittest_batchable(test_factory):
+        """
+        Whether the test is a Python unittest with no params, which can be
+        executed by a batch
+        """
+        if test_factory[0] is not test.PythonUnittest:
             return False
+        var, _ = test_factory[1].get("params", (None, None))
+        return varianter.is_empty_variant(var)
+
+    def _get_job_timeout_plan(self):
+        """
+        Way of choosing the tests executed within the job timeout (see
+        :data:`timebox.PLAN_MODES`)
+
+        Uses the "--job-timeout-plan" option when set, otherwise the
+        "job_timeout_plan" key from the "runner" section of the settings.
+
+        :return: the plan mode or None when the tests are not planned
+        """
+        mode = getattr(self.job.args, 'job_timeout_plan', None)
+        if mode is None:
+            mode = settings.get_value('runner', 'job_timeout_plan',
+                                      default='off')
+        if mode == 'off':
+            return None
+        if mode not in timebox.PLAN_MODES:
+            modes = ", ".join(timebox.PLAN_MODES + ('off',))
+            raise exceptions.OptionValidationError("Unknown job timeout "
+                                                   "plan '%s', use one of: "
+                                                   "%s" % (mode, modes))
+        return mode
+
+    def _get_async_parallel(self):
+        """
+        Number of test commands executed at the same time by the asyncio
+        engine
+
+        Uses the "--async-parallel" option when set, otherwise the
+        "async_parallel" key from the "runner" section of the settings.
+        """
+        parallel = getattr(self.job.args, 'async_parallel', None)
+        if parallel is None:
+            parallel = settings.get_value('runner', 'async_parallel',
+                                          key_type=int, default=100)
+        if parallel < 1:
+            raise exceptions.OptionValidationError("The number of parallel "
+                                                   "tests has to be positive, "
+                                                   "got %s" % parallel)
+        return parallel
+
+    def _preload_modules(self):
+        """
+        Imports the modules to be shared by all test processes
+
+        The test processes are forked from the runner process, so modules
+        imported here are already available to the tests (and they don't
+        need to be imported by each of them).  Uses the "--preload-module"
+        option when set, otherwise the "preload" key from the "runner"
+        section of the settings.
+        """
+        modules = getattr(self.job.args, 'preload_modules', None)
+        if not modules:
+            modules = settings.get_value('runner', 'preload', key_type=list,
+                                         default=[])
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as details:  # pylint: disable=W0703
+                self.job.log.warning("Unable to preload module '%s': %s",
+                                     name, details)
+
+    def _poll_test_slot(self, slot):
+        """
+        Non-blocking update of a test executed by the parallel runner
+
+        This mimics what :meth:`run_test` and :meth:`TestStatus.finish` do,
+        but it never waits for the test process.
+
+        :param slot: The running test
+        :type slot: :class:`TestSlot`
+        :return: True when the test finished and the final state is
+                 available in :attr:`TestSlot.test_state`
+        :raise exceptions.TestError: When the test does not report the
+                                     early status
+        """
+        test_status = slot.test_status
+        proc = slot.proc
+        now = time.time()
+        if slot.deadline is None:
+            if not test_status.check_early_status(proc, slot.early_deadline,
+                                                  60):
+                return False
+            timeout = test_status.early_status.get('timeout')
+            timeout = float(timeout or self.DEFAULT_TIMEOUT)
+            slot.deadline = slot.time_started + timeout
+            if slot.job_deadline is not None and slot.job_deadline > 0:
+                slot.deadline = min(slot.deadline, slot.job_deadline)
+        test_status.wait(proc, 0)
+        if slot.finish_deadline is None:
+            if now >= slot.deadline:
+                slot.abort("Timeout reached", signal.SIGTERM)
+            elif test_status.interrupt or not proc.is_alive():
+                slot.finish_deadline = slot.deadline
+            else:
+                return False
+        if now < slot.finish_deadline:
+            # Give the test a chance to finish or to deliver the late status
+            if test_status.status:
+                if proc.is_alive():
+                    if slot.time_settled is None:
+                        slot.time_settled = now
+                    timeout_process_alive = settings.get_value(
+                        'runner.timeout', 'process_alive', key_type=int,
+                        default=defaults.TIMEOUT_PROCESS_ALIVE)
+                    if now < slot.time_settled + timeout_process_alive:
+                        return False
+            else:
+                if not proc.is_alive():
+                    if slot.time_settled is None:
+                        slot.time_settled = now
+                    timeout_process_died = settings.get_value(
+                        'runner.timeout', 'process_died', key_type=int,
+                        default=defaults.TIMEOUT_PROCESS_DIED)
+                    if now < slot.time_settled + timeout_process_died:
+                        return False
+                else:
+                    return False
+        # The test is either finished or we are out of time, in which
+        # case the deadline forces `finish` to not wait anymore
+        if proc.is_alive() or not test_status.status:
+            finish_deadline = now
+        else:
+            finish_deadline = max(slot.finish_deadline, now + 1)
+        test_state = test_status.finish(proc, slot.time_started, 0.01,
+                                        finish_deadline,
+                                        self.job._result_events_dispatcher)
+        if self._cgroups is not None:
+            self._cgroups.remove(proc.pid)
+        if slot.abort_reason:
+            test_state = add_runner_failure(test_state, "INTERRUPTED",
+                                            slot.abort_reason)
+        slot.test_state = test_state
         return True
 
     def _template_to_factory(self, template, variant):
@@ -531,6 +1083,8 @@ class TestRunner:
         if "params" not in template[1]:
             factory = [template[0], template[1].copy()]
             if self.job.test_parameters and empty_variants:
+                # The variants are shared by all the tests, don't modify them
+                var = list(var)
                 var[0] = tree.TreeNode().get_node("/", True)
                 var[0].value = self.job.test_parameters
                 paths = ["/"]
@@ -560,17 +1114,773 @@ class TestRunner:
         :return: generator yielding tuple(test_factory, variant)
         """
         if execution_order == "variants-per-test":
+            # Produce the variants once, not once per test
+            all_variants = tuple(variants.itertests())
             return (self._template_to_factory(template, variant)
                     for template in test_suite
-                    for variant in variants.itertests())
+                    for variant in all_variants)
         elif execution_order == "tests-per-variant":
             return (self._template_to_factory(template, variant)
                     for variant in variants.itertests()
                     for template in test_suite)
+        elif execution_order in history.HISTORY_ORDERS:
+            factories = list(self._iter_suite(test_suite, variants,
+                                              "variants-per-test"))
+            order = self._get_history_order(factories, execution_order)
+            return (factories[index] for index in order)
         else:
             raise NotImplementedError("Suite_order %s is not supported"
                                       % execution_order)
 
+    def _get_history_order(self, factories, execution_order):
+        """
+        Computes (and records) the order of tests based on previous jobs
+
+        The order recorded by the replayed job is used when available,
+        so the replay executes the tests in the same order.
+
+        :param factories: list of tuple(test_factory, variant) in the
+                          "variants-per-test" order
+        :param execution_order: one of :data:`history.HISTORY_ORDERS`
+        :return: list of indexes into `factories`
+        """
+        order = getattr(self.job.args, 'replay_execution_order', None)
+        if order is not None and sorted(order) != list(range(len(factories))):
+            self.job.log.warning("The execution order recorded by the "
+                                 "replayed job does not match the current "
+                                 "tests, using the test history instead.")
+            order = None
+        if order is None:
+            order = history.HISTORY_ORDERS[execution_order](
+                self._get_test_keys(factories), self._get_test_history())
+        jobdata.record_execution_order(self.job.logdir, execution_order,
+                                       order)
+        return order
+
+    @staticmethod
+    def _get_test_keys(factories):
+        """
+        Returns the job independent keys of tests (see
+        :func:`history.get_test_key`)
+
+        :param factories: list of tuple(test_factory, variant)
+        """
+        return [history.get_test_key(test.TestID(0, factory[1].get("name"),
+                                                 variant))
+                for factory, variant in factories]
+
+    def _get_test_history(self):
+        """
+        Returns the history of tests executed by the previous jobs
+        """
+        test_history = history.TestHistory(os.path.dirname(self.job.logdir))
+        if test_history.update(exclude=self.job.logdir):
+            test_history.save()
+        return test_history
+
+    def _get_shard_history(self):
+        """
+        Returns the snapshot of the test history given by "--shard-history"
+
+        The local history is not used, as it changes with the results of
+        the shards executed before (so the tests would be executed by
+        several shards, or by none).
+
+        :raise exceptions.OptionValidationError: When the snapshot is not
+                                                 given or can't be read
+        """
+        path = getattr(self.job.args, 'shard_history', None)
+        if path is None:
+            raise exceptions.OptionValidationError("The \"duration\" shard "
+                                                   "mode requires a snapshot "
+                                                   "of the test history "
+                                                   "(--shard-history)")
+        try:
+            return history.TestHistory(path=path, strict=True)
+        except (IOError, OSError, ValueError) as details:
+            raise exceptions.OptionValidationError("Unable to read the test "
+                                                   "history snapshot %s: %s"
+                                                   % (path, details))
+
+    def _get_shard_tests(self, factories, index, total):
+        """
+        Selects the tests of the shard executed by this job
+
+        Uses the "--shard-mode" option to choose the way the tests are
+        split (see :mod:`shard`).
+
+        :param factories: list of tuple(test_factory, variant)
+        :param index: shard index (starting at 1)
+        :param total: number of shards
+        :return: list of tuple(test_factory, variant) of this shard
+        """
+        keys = self._get_test_keys(factories)
+        if getattr(self.job.args, 'shard_mode', None) == 'duration':
+            positions = shard.split_by_duration(keys, index, total,
+                                                self._get_shard_history())
+        else:
+            positions = shard.split_by_hash(keys, index, total)
+        TEST_LOG.info("Executing %s of %s tests as shard %s/%s",
+                      len(positions), len(factories), index, total)
+        return [factories[position] for position in positions]
+
+    def _plan_tests(self, tests, mode, budget, slots):
+        """
+        Chooses the tests executed within the job timeout
+
+        The tests left out are recorded to be skipped (see
+        :meth:`_iter_test_factories`).
+
+        :param tests: list of tuple(test_factory, variant)
+        :param mode: one of :data:`timebox.PLAN_MODES`
+        :param budget: time (in seconds) left until the job timeout
+        :param slots: number of tests executed at the same time
+        :return: list of tuple(test_factory, variant), the chosen tests
+                 (in the planned order) followed by the ones left out
+        """
+        priorities = [timebox.get_priority(factory[1].get('tags'))
+                      for factory, _ in tests]
+        planned = timebox.plan(self._get_test_keys(tests),
+                               self._get_test_history(), budget, slots,
+                               priorities, mode)
+        if planned is None:
+            msg = ("Not planning the tests within the job timeout, none of "
+                   "their durations is known yet")
+            TEST_LOG.info(msg)
+            APP_LOG.info(msg)
+            return tests
+        chosen, left_out, projected = planned
+        self._planned_out = set(range(len(chosen), len(tests)))
+        finish = time.strftime("%Y-%m-%d %H:%M:%S",
+                               time.localtime(time.time() + projected))
+        msg = ("Planned %s of %s tests within the job timeout (%.0fs left), "
+               "projected to finish at %s (in %.0fs)"
+               % (len(chosen), len(tests), budget, finish, projected))
+        TEST_LOG.info(msg)
+        APP_LOG.info(msg)
+        return [tests[index] for index in chosen + left_out]
+
+    def _iter_test_factories(self, tests, replay_map, no_digits):
+        """
+        Iterates through the final (named) test factories
+
+        :param tests: iterable of tuple(test_factory, variant) (see
+                      :meth:`_iter_suite`)
+        :param replay_map: optional list to override test class based on test
+                           index.
+        :param no_digits: number of digits of the test uid
+        :return: generator yielding tuple(index, test_factory)
+        """
+        for index, (test_factory, variant) in enumerate(tests):
+            test_parameters = test_factory[1]
+            name = test_parameters.get("name")
+            test_parameters["name"] = test.TestID(index + 1, name,
+                                                  variant,
+                                                  no_digits)
+            if replay_map is not None and replay_map[index] is not None:
+                test_parameters["methodName"] = "test"
+                test_factory = (replay_map[index], test_parameters)
+            elif index in self._planned_out:
+                test_factory = self._timeout_skip_factory(test_factory)
+            elif self._result_cache is not None:
+                test_factory = self._apply_result_cache(test_factory)
+            yield index, test_factory
+
+    def _apply_result_cache(self, test_factory):
+        """
+        Replaces tests with unchanged inputs since they passed by skip tests
+
+        Other (cacheable) tests are remembered to be recorded in the
+        result cache once they pass.
+        """
+        key = self._result_cache.get_key(test_factory)
+        if key is None:
+            return test_factory
+        cached_result = self._result_cache.lookup(key)
+        test_parameters = test_factory[1]
+        if cached_result is None:
+            self._result_cache.expect(test_parameters["name"], key)
+            return test_factory
+        test_parameters = test_parameters.copy()
+        test_parameters["cached_result"] = cached_result
+        return (test.CachedResultSkipTest, test_parameters)
+
+    def _get_result_cache(self):
+        """
+        Result cache to be used by this job (see :mod:`result_cache`)
+
+        Uses the "--result-cache" option when set, otherwise the
+        "result_cache" key from the "runner" section of the settings.
+
+        :return: :class:`result_cache.ResultCache` or None when disabled
+        """
+        enabled = getattr(self.job.args, 'result_cache', None)
+        if enabled is None:
+            enabled = settings.get_value('runner', 'result_cache',
+                                         key_type=bool, default=False)
+        else:
+            enabled = enabled == 'on'
+        if enabled:
+            return result_cache.ResultCache()
+        return None
+
+    def _is_cgroup_enabled(self):
+        """
+        Whether the test processes are isolated in cgroups
+
+        Uses the "--cgroup" option when set, otherwise the "cgroup" key
+        from the "runner" section of the settings.
+        """
+        enabled = getattr(self.job.args, 'cgroup', None)
+        if enabled is None:
+            return settings.get_value('runner', 'cgroup', key_type=bool,
+                                      default=False)
+        return enabled == 'on'
+
+    def _get_cgroups(self):
+        """
+        Cgroups isolating the test processes (see :mod:`isolation`)
+
+        Uses the "--cgroup" option when set, otherwise the "cgroup" key
+        from the "runner" section of the settings.
+
+        :return: :class:`isolation.TestCgroups` or None when disabled
+        :raise exceptions.OptionValidationError: When the cgroups can't
+                                                 be created (or the asyncio
+                                                 engine is used)
+        """
+        if not self._is_cgroup_enabled():
+            return None
+        if self._get_engine() == 'asyncio':
+            # Its commands are executed by the runner process, outside of
+            # the cgroups of the tests
+            raise exceptions.OptionValidationError("The tests can't be "
+                                                   "isolated in cgroups by "
+                                                   "the asyncio engine")
+        base = settings.get_value('runner.cgroup', 'base', default=None)
+        try:
+            return isolation.TestCgroups(self.job.unique_id, base)
+        except cgroup.CgroupError as details:
+            raise exceptions.OptionValidationError("Unable to isolate the "
+                                                   "tests in cgroups: %s"
+                                                   % details)
+
+    def _kill_test_process(self, pid, sig, send_sigcont=True):
+        """
+        Sends a signal to the test process and all its children
+
+        When the tests are isolated in cgroups, all the processes in the
+        cgroup of the test get it at once.
+
+        :param pid: PID of the test process
+        :param sig: the signal
+        :param send_sigcont: see :func:`process.kill_process_tree`
+        """
+        if self._cgroups is not None and self._cgroups.kill(pid, sig):
+            return
+        process.kill_process_tree(pid, sig, send_sigcont, pidfd=True)
+
+    def _install_sigtstp_handler(self, get_pids):
+        """
+        Installs the SIGTSTP (ctrl+z) handler, which stops all the running
+        tests, or resumes them when they were stopped
+
+        :param get_pids: function returning the PIDs of the running test
+                         processes (or commands)
+        :return: the handler, to install it again
+        """
+        lock = multiprocessing.Lock()
+
+        def sigtstp_handler(signum, frame):     # pylint: disable=W0613
+            """ SIGSTOP all test processes on SIGTSTP """
+            pids = get_pids()
+            if not pids:    # Ignore ctrl+z when no test is running
+                return
+            with lock:
+                msg = ("ctrl+z pressed, %%s %s (%s)"
+                       % ("test" if len(pids) == 1 else "tests",
+                          ", ".join(str(pid) for pid in pids)))
+                app_log_msg = '\n%s' % msg
+                if self.sigstopped:
+                    APP_LOG.info(app_log_msg, "resumming")
+                    TEST_LOG.info(msg, "resumming")
+                    sig = signal.SIGCONT
+                    self.sigstopped = False
+                else:
+                    APP_LOG.info(app_log_msg, "stopping")
+                    TEST_LOG.info(msg, "stopping")
+                    sig = signal.SIGSTOP
+                    self.sigstopped = True
+                table = process.ProcessTable() if len(pids) > 1 else None
+                for pid in pids:
+                    process.kill_process_tree(pid, sig, False, table=table,
+                                              pidfd=True)
+
+        signal.signal(signal.SIGTSTP, sigtstp_handler)
+        return sigtstp_handler
+
+    @staticmethod
+    def _timeout_skip_factory(test_factory):
+        """
+        Replaces the test by a test skipped due to the job timeout
+        """
+        test_parameters = test_factory[1]
+        if 'methodName' in test_parameters:
+            del test_parameters['methodName']
+        return (test.TimeOutSkipTest, test_parameters)
+
+    def _next_test_factory(self, test_factories, summary, deadline):
+        """
+        Takes the next test to be started by the parallel runner (or by
+        the asyncio engine), which is skipped once the job deadline is
+        reached
+
+        :param test_factories: iterator of (index, test_factory)
+        :param summary: Contains types of test failures.
+        :type summary: set.
+        :param deadline: Job deadline (or None)
+        :return: tuple(index, test_factory, job deadline of the test) or
+                 None when there are no more tests
+        """
+        try:
+            index, test_factory = next(test_factories)
+        except StopIteration:
+            return None
+        if deadline is not None and time.time() > deadline:
+            summary.add('INTERRUPTED')
+            return index, self._timeout_skip_factory(test_factory), None
+        return index, test_factory, deadline
+
+    def _report_remaining_tests(self, finished, summary):
+        """
+        Reports the tests which could not be reported in order (after an
+        interruption)
+
+        :param finished: slots of the finished tests, by their index
+        :param summary: Contains types of test failures.
+        :type summary: set.
+        """
+        for index in sorted(finished):
+            slot = finished[index]
+            if not slot.start_reported:
+                self._report_start_test(slot)
+            self._report_end_test(slot.test_state, summary)
+
+    def _run_suite_parallel(self, test_factories, parallel, summary,
+                            deadline):
+        """
+        Run tests keeping up to `parallel` test processes in flight
+
+        Tests are started in the suite order and the results are reported
+        in the same order, no matter which test finishes first.
+
+        :param test_factories: iterator of (index, test_factory)
+        :param parallel: maximum number of tests to be executed at once
+        :param summary: Contains types of test failures.
+        :type summary: set.
+        :param deadline: Job deadline (or None)
+        :return: False when the execution was interrupted (ctrl+c,
+                 failfast), True otherwise
+        """
+        running = {}
+        finished = {}
+        next_report = 0
+        schedule = True
+        completed = True
+        ctrl_c = CtrlCPresses()
+        last_progress = 0
+        result_dispatcher = self.job._result_events_dispatcher
+        sigtstp_handler = self._install_sigtstp_handler(
+            lambda: [slot.proc.pid for slot in running.values()])
+
+        try:
+            while True:
+                try:
+                    # Keep the slots full
+                    while schedule and len(running) < parallel:
+                        next_test = self._next_test_factory(test_factories,
+                                                            summary, deadline)
+                        if next_test is None:
+                            schedule = False
+                            break
+                        index, test_factory, job_deadline = next_test
+                        # The skipped tests are not pre-forked
+                        factory_index = index
+                        if job_deadline is None and deadline is not None:
+                            factory_index = None
+                        signal.signal(signal.SIGTSTP, signal.SIG_IGN)
+                        proc, queue = self._start_test_process(
+                            test_factory, multiprocessing.SimpleQueue(),
+                            factory_index, False)
+                        signal.signal(signal.SIGTSTP, sigtstp_handler)
+                        running[index] = TestSlot(index, proc,
+                                                  TestStatus(self.job, queue),
+                                                  job_deadline,
+                                                  self._kill_test_process)
+                    if not running:
+                        break
+
+                    # Update the running tests
+                    for index, slot in list(running.items()):
+                        if self._poll_test_slot(slot):
+                            finished[index] = running.pop(index)
+
+                    # Report the results in order
+                    while next_report in finished:
+                        slot = finished.pop(next_report)
+                        if not slot.start_reported:
+                            self._report_start_test(slot)
+                        if not self._report_end_test(slot.test_state,
+                                                     summary):
+                            schedule = completed = False
+                        next_report += 1
+                    slot = running.get(next_report)
+                    if slot is not None and slot.deadline is not None:
+                        if not slot.start_reported:
+                            self._report_start_test(slot)
+                        elif (ctrl_c.count == 0 and
+                              time.time() - last_progress >= 1):
+                            last_progress = time.time()
+                            if (slot.test_status.status.get('running') or
+                                    self.sigstopped):
+                                result_dispatcher.map_method('test_progress',
+                                                             False)
+                            else:
+                                result_dispatcher.map_method('test_progress',
+                                                             True)
+                    self._wait_for_test_slots(running.values())
+                except KeyboardInterrupt:
+                    schedule = completed = False
+                    action = ctrl_c.press()
+                    if action == CtrlCPresses.INTERRUPT:
+                        self.job.log.debug("\nInterrupt requested. Waiting %d "
+                                           "seconds for tests to finish "
+                                           "(ignoring new Ctrl+C until then)",
+                                           ctrl_c.ignore_window)
+                        for index, slot in list(running.items()):
+                            if slot.deadline is None:
+                                # Not yet initialized, there is nothing
+                                # to be reported
+                                self._kill_test_process(slot.proc.pid,
+                                                        signal.SIGKILL)
+                                del running[index]
+                            else:
+                                slot.abort("Interrupted by ctrl+c",
+                                           signal.SIGINT)
+                    elif action == CtrlCPresses.KILL:
+                        for slot in running.values():
+                            self.job.log.debug("Killing test subprocess %s",
+                                               slot.proc.pid)
+                            slot.abort("Interrupted by ctrl+c "
+                                       "(multiple-times)", signal.SIGKILL)
+        finally:
+            # Do not leave anything behind (eg. on runner failures)
+            for slot in running.values():
+                if slot.proc.is_alive():
+                    self._kill_test_process(slot.proc.pid, signal.SIGKILL)
+        self._report_remaining_tests(finished, summary)
+        if ctrl_c.count > 0:
+            self.job.log.debug('')
+        return completed
+
+    @staticmethod
+    def _wait_for_test_slots(slots):
+        """
+        Sleep until any of the running tests needs attention
+
+        That is until a message arrives, a test process finishes, one of
+        the deadlines is reached or at most for a second (to keep the
+        progress updated).
+
+        :param slots: running tests
+        :type slots: list of :class:`TestSlot`
+        """
+        if not slots:
+            return
+        now = time.time()
+        timeout = 1.0
+        handles = []
+        for slot in slots:
+            slot_handles = slot.test_status.get_wait_handles(slot.proc)
+            if not slot_handles:    # Unable to sleep on this one
+                timeout = min(timeout, 0.01)
+            handles.extend(slot_handles)
+            if (not slot.proc.is_alive() and
+                    (slot.test_status.status or slot.time_settled is None)):
+                timeout = 0     # Finished since the last check
+            elif slot.deadline is None:
+                timeout = min(timeout, slot.early_deadline - now)
+            elif slot.finish_deadline is None:
+                timeout = min(timeout, slot.deadline - now)
+            else:
+                timeout = min(timeout, slot.finish_deadline - now)
+        timeout = max(timeout, 0)
+        if handles:
+            multiprocessing.connection.wait(handles, timeout)
+        else:
+            time.sleep(timeout)
+
+    def _run_suite_serial(self, test_factories, queue, summary, deadline):
+        """
+        Run tests one by one
+
+        :param test_factories: iterator of (index, test_factory)
+        :param queue: Multiprocess queue.
+        :type queue: :class`multiprocessing.Queue` instance.
+        :param summary: Contains types of test failures.
+        :type summary: set.
+        :param deadline: Job deadline (or None)
+        :return: False when the execution was interrupted (ctrl+c,
+                 failfast), True otherwise
+        """
+        for index, test_factory in test_factories:
+            if deadline is not None and time.time() > deadline:
+                summary.add('INTERRUPTED')
+                test_factory = self._timeout_skip_factory(test_factory)
+                if not self.run_test(test_factory, queue, summary):
+                    return False
+            else:
+                if not self.run_test(test_factory, queue, summary,
+                                     deadline, index):
+                    return False
+            runtime.CURRENT_TEST = None
+        return True
+
+    def _run_suite_async(self, test_factories, parallel, summary, deadline):
+        """
+        Run the test commands from an asyncio event loop
+
+        Up to `parallel` commands are executed at the same time, each of
+        the tests is executed in the runner process once its command
+        finishes (see :mod:`asyncrunner`).  Results are reported in the
+        test suite order.
+
+        :param test_factories: iterator of (index, test_factory) of tests
+                               accepted by :func:`asyncrunner.is_async_capable`
+        :param parallel: maximum number of commands executed at once
+        :param summary: Contains types of test failures.
+        :type summary: set.
+        :param deadline: Job deadline (or None)
+        :return: False when the execution was interrupted (ctrl+c,
+                 failfast), True otherwise
+        """
+        loop = asyncio.new_event_loop()
+        # Required by the child watcher on older Python versions
+        asyncio.set_event_loop(loop)
+        running = {}
+        finished = {}
+        pending = collections.deque()
+        schedule = True
+        completed = True
+        ctrl_c = CtrlCPresses()
+        last_progress = 0
+        result_dispatcher = self.job._result_events_dispatcher
+        self._install_sigtstp_handler(
+            lambda: [slot.pid for slot in running.values()
+                     if slot.pid is not None])
+        try:
+            while True:
+                try:
+                    # Keep the slots full
+                    while schedule and len(running) < parallel:
+                        next_test = self._next_test_factory(test_factories,
+                                                            summary, deadline)
+                        if next_test is None:
+                            schedule = False
+                            break
+                        index, test_factory, job_deadline = next_test
+                        slot = asyncrunner.AsyncTestSlot(index, test_factory,
+                                                         loop)
+                        timeout = slot.early_status.get('timeout')
+                        timeout = float(timeout or self.DEFAULT_TIMEOUT)
+                        slot.deadline = slot.time_started + timeout
+                        if job_deadline is not None and job_deadline > 0:
+                            slot.deadline = min(slot.deadline, job_deadline)
+                        slot.start()
+                        running[index] = slot
+                        pending.append(index)
+
+                    # Update the running tests
+                    for index, slot in list(running.items()):
+                        if self._poll_async_test_slot(slot):
+                            finished[index] = running.pop(index)
+
+                    # Report the results in order
+                    while pending and pending[0] in finished:
+                        slot = finished.pop(pending.popleft())
+                        if not slot.start_reported:
+                            self._report_start_test(slot)
+                        if not self._report_end_test(slot.test_state,
+                                                     summary):
+                            schedule = completed = False
+                    if not running and not schedule:
+                        break
+                    slot = running.get(pending[0]) if pending else None
+                    if slot is not None:
+                        if not slot.start_reported:
+                            self._report_start_test(slot)
+                        elif (ctrl_c.count == 0 and
+                              time.time() - last_progress >= 1):
+                            last_progress = time.time()
+                            result_dispatcher.map_method('test_progress',
+                                                         False)
+                    asyncrunner.wait_for_slots(loop, running.values())
+                except KeyboardInterrupt:
+                    schedule = completed = False
+                    action = ctrl_c.press()
+                    if action == CtrlCPresses.INTERRUPT:
+                        self.job.log.debug("\nInterrupt requested. Waiting %d "
+                                           "seconds for tests to finish "
+                                           "(ignoring new Ctrl+C until then)",
+                                           ctrl_c.ignore_window)
+                        for slot in running.values():
+                            slot.abort("Interrupted by ctrl+c", signal.SIGINT)
+                    elif action == CtrlCPresses.KILL:
+                        for slot in running.values():
+                            self.job.log.debug("Killing test command %s",
+                                               slot.pid)
+                            slot.abort("Interrupted by ctrl+c "
+                                       "(multiple-times)", signal.SIGKILL)
+        finally:
+            signal.signal(signal.SIGTSTP, signal.SIG_IGN)
+            # Do not leave anything behind (eg. on runner failures)
+            for slot in running.values():
+                slot.give_up()
+            asyncio.set_event_loop(None)
+            loop.close()
+        self._report_remaining_tests(finished, summary)
+        if ctrl_c.count > 0:
+            self.job.log.debug('')
+        return completed
+
+    @staticmethod
+    def _poll_async_test_slot(slot):
+        """
+        Non-blocking update of a test executed by the asyncio engine
+
+        :param slot: The running test
+        :type slot: :class:`asyncrunner.AsyncTestSlot`
+        :return: True when the test finished and the final state is
+                 available in :attr:`asyncrunner.AsyncTestSlot.test_state`
+        """
+        if not slot.finished.done():
+            now = time.time()
+            if slot.finish_deadline is None:
+                if now >= slot.deadline:
+                    slot.abort("Timeout reached", signal.SIGTERM)
+                return False
+            if now < slot.finish_deadline:
+                return False
+            TEST_LOG.warning("Killing hanged test command %s", slot.pid)
+            slot.give_up()
+        test_state = slot.finish()
+        if slot.abort_reason:
+            test_state = add_runner_failure(test_state, "INTERRUPTED",
+                                            slot.abort_reason)
+        slot.test_state = test_state
+        return True
+
+    def _run_suite_by_engine(self, test_factories, parallel, queue, summary,
+                             deadline):
+        """
+        Run the tests which only wrap a command with the asyncio engine
+        and the remaining tests in their own processes
+
+        :param test_factories: iterator of (index, test_factory)
+        :param parallel: maximum number of tests executed in their own
+                         processes at once
+        :param queue: Multiprocess queue (used by the serial execution)
+        :type queue: :class`multiprocessing.Queue` instance.
+        :param summary: Contains types of test failures.
+        :type summary: set.
+        :param deadline: Job deadline (or None)
+        """
+        async_parallel = self._get_async_parallel()
+        groups = itertools.groupby(test_factories,
+                                   lambda item: asyncrunner.is_async_capable(
+                                       item[1]))
+        for is_async, group in groups:
+            if is_async:
+                completed = self._run_suite_async(group, async_parallel,
+                                                  summary, deadline)
+            elif parallel > 1:
+                completed = self._run_suite_parallel(group, parallel, summary,
+                                                     deadline)
+            else:
+                completed = self._run_suite_serial(group, queue, summary,
+                                                   deadline)
+            if not completed:
+                break
+
+    def _run_test_factories(self, test_factories, parallel, queue, summary,
+                            deadline):
+        """
+        Executes the (named) test factories and reports their results
+
+        :param test_factories: iterator of (index, test_factory)
+        :param parallel: maximum number of tests to be executed at once
+        :param queue: Multiprocess queue (used by the serial execution)
+        :type queue: :class`multiprocessing.Queue` instance.
+        :param summary: Contains types of test failures.
+        :type summary: set.
+        :param deadline: Job deadline (or None)
+        """
+        self._preload_modules()
+        if self._get_prefork():
+            # The pre-forked processes need to know all the tests
+            test_factories = list(test_factories)
+            self._process_pool = TestProcessPool(
+                self._run_preforked_test,
+                ([test_factory for _, test_factory in test_factories],
+                 parallel == 1 and self._report_start_from_test_process()),
+                parallel)
+            self._process_pool.fill()
+            test_factories = iter(test_factories)
+        unittest_batch = self._get_unittest_batch()
+        batches = None
+        if unittest_batch > 1:
+            # Executed in the background, while the tests are monitored
+            batches = unittestbatch.Batches(
+                os.path.join(self.job.logdir, unittestbatch.RECORDS_DIR),
+                deadline)
+            test_factories = unittestbatch.iter_batched(
+                test_factories, unittest_batch, self._is_unittest_batchable,
+                batches)
+        try:
+            if self._get_engine() == 'asyncio':
+                self._run_suite_by_engine(test_factories, parallel, queue,
+                                          summary, deadline)
+            elif parallel > 1:
+                self._run_suite_parallel(test_factories, parallel, summary,
+                                         deadline)
+            else:
+                self._run_suite_serial(test_factories, queue, summary,
+                                       deadline)
+        finally:
+            if batches is not None:
+                batches.close()
+
+    def _report_start_from_test_process(self):
+        """
+        Whether the serial runner reports the test start from the test
+        process (result events plugins executed in the background only
+        get the events reported from the runner process)
+        """
+        return not getattr(self.job._result_events_dispatcher, 'background',
+                           None)
+
+    def _report_start_test(self, slot):
+        """
+        Reports the start of a test executed by the parallel runner (or
+        by the asyncio engine)
+        """
+        early_state = slot.early_status
+        self.result.start_test(early_state)
+        self.job._result_events_dispatcher.map_method('start_test',
+                                                      self.result,
+                                                      early_state)
+        slot.start_reported = True
+
     def run_suite(self, test_suite, variants, timeout=0, replay_map=None,
                   execution_order=None):
         """
@@ -587,6 +1897,9 @@ class TestRunner:
         :return: a set with types of test failures.
         """
         summary = set()
+        parallel = self._get_parallel()
+        self._result_cache = self._get_result_cache()
+        self._cgroups = self._get_cgroups()
         if self.job.sysinfo is not None:
             self.job.sysinfo.start_job_hook()
         queue = multiprocessing.SimpleQueue()
@@ -595,44 +1908,45 @@ class TestRunner:
         else:
             deadline = None
 
-        test_result_total = variants.get_number_of_tests(test_suite)
-        no_digits = len(str(test_result_total))
-        self.result.tests_total = test_result_total
-        index = -1
         try:
             for test_factory in test_suite:
                 test_factory[1]["base_logdir"] = self.job.logdir
                 test_factory[1]["job"] = self.job
             if execution_order is None:
                 execution_order = self.DEFAULT_EXECUTION_ORDER
-            for test_factory, variant in self._iter_suite(test_suite, variants,
-                                                          execution_order):
-                index += 1
-                test_parameters = test_factory[1]
-                name = test_parameters.get("name")
-                test_parameters["name"] = test.TestID(index + 1, name,
-                                                      variant,
-                                                      no_digits)
-                if deadline is not None and time.time() > deadline:
+            tests = self._iter_suite(test_suite, variants, execution_order)
+            shard_spec = getattr(self.job.args, 'shard', None)
+            if shard_spec:
+                tests = self._get_shard_tests(list(tests), *shard_spec)
+                test_result_total = len(tests)
+                self.result.shard = tuple(shard_spec)
+            else:
+                test_result_total = variants.get_number_of_tests(test_suite)
+            plan_mode = self._get_job_timeout_plan()
+            self._planned_out = set()
+            if plan_mode is not None and deadline is not None:
+                tests = self._plan_tests(list(tests), plan_mode,
+                                         deadline - time.time(), parallel)
+                if self._planned_out:
+                    # Skipped because of the job timeout, as the tests
+                    # not started before it (see _next_test_factory)
                     summary.add('INTERRUPTED')
-                    if 'methodName' in test_parameters:
-                        del test_parameters['methodName']
-                    test_factory = (test.TimeOutSkipTest, test_parameters)
-                    if not self.run_test(test_factory, queue, summary):
-                        break
-                else:
-                    if (replay_map is not None and
-                            replay_map[index] is not None):
-                        test_parameters["methodName"] = "test"
-                        test_factory = (replay_map[index], test_parameters)
-
-                    if not self.run_test(test_factory, queue, summary,
-                                         deadline):
-                        break
-                runtime.CURRENT_TEST = None
+            no_digits = len(str(test_result_total))
+            self.result.tests_total = test_result_total
+            test_factories = self._iter_test_factories(tests, replay_map,
+                                                       no_digits)
+            self._run_test_factories(test_factories, parallel, queue,
+                                     summary, deadline)
         except KeyboardInterrupt:
             TEST_LOG.error('Job interrupted by ctrl+c.')
             summary.add('INTERRUPTED')
+        finally:
+            if self._process_pool is not None:
+                self._process_pool.close()
+                self._process_pool = None
+            if self._cgroups is not None:
+                self._cgroups.close()
+                self._cgroups = None
 
         if self.job.sysinfo is not None:
             self.job.sysinfo.end_job_hook()
@@ -19,6 +19,8 @@ Safe (AST based) test loader module utilities
 
 import ast
 import collections
+import contextlib
+import copy
 import imp
 import os
 import re
@@ -27,6 +29,172 @@ import sys
 from ..utils import data_structures
 
 
+#: Paths of the modules parsed within :func:`record_parsed_paths`
+_PARSED_PATHS = []
+
+
+@contextlib.contextmanager
+def record_parsed_paths():
+    """
+    Records the paths of the modules parsed by :class:`PythonModule`
+
+    The test discovery of a module depends on all of them, as the parent
+    classes might be defined in other modules.
+
+    :return: a set filled with the absolute paths of the parsed modules
+             while in the context
+    """
+    paths = set()
+    _PARSED_PATHS.append(paths)
+    try:
+        yield paths
+    finally:
+        _PARSED_PATHS.pop()
+
+
+def _add_parsed_paths(paths):
+    for parsed in _PARSED_PATHS:
+        parsed.update(paths)
+
+
+#: Indexes shared within :func:`module_index`
+_MODULE_INDEXES = []
+
+
+class ModuleIndex:
+    """
+    Modules parsed during a test discovery
+
+    Each module is parsed once, and the classes it defines, the modules
+    found by :func:`imp.find_module` and the results of the examination
+    of the (parent) classes (see :func:`_examine_class`) are kept, so the
+    parent classes shared by many tests are resolved by lookups.  The
+    modules whose tests are discovered are dropped afterwards (see
+    :meth:`test_module`), so only the modules of the parent classes are
+    kept.
+    """
+
+    def __init__(self):
+        # Absolute path -> parsed module
+        self._modules = {}
+        # Absolute path -> {class name: list of class definitions}
+        self._classes = {}
+        # (module name, search paths) -> path of the module
+        self._found = {}
+        # Arguments of _examine_class -> (result, paths of the parsed
+        # modules)
+        self._examined = {}
+
+    @staticmethod
+    def _get_path(path):
+        if os.path.isdir(path):
+            path = os.path.join(path, "__init__.py")
+        return os.path.abspath(path)
+
+    def parse(self, path):
+        """
+        Returns the parsed module (see :func:`ast.parse`)
+
+        :param path: path to a Python source code file or package
+        """
+        path = self._get_path(path)
+        _add_parsed_paths((path,))
+        mod = self._modules.get(path)
+        if mod is None:
+            with open(path) as source_file:
+                mod = ast.parse(source_file.read(), path)
+            self._modules[path] = mod
+        return mod
+
+    def get_classes(self, path):
+        """
+        Returns the classes defined (at the top level) by a module
+
+        :returns: a mapping of names {<class name>: [<class definitions>]}
+        :rtype: dict
+        """
+        mod = self.parse(path)
+        path = self._get_path(path)
+        classes = self._classes.get(path)
+        if classes is None:
+            classes = {}
+            for statement in mod.body:
+                if isinstance(statement, ast.ClassDef):
+                    classes.setdefault(statement.name, []).append(statement)
+            self._classes[path] = classes
+        return classes
+
+    @contextlib.contextmanager
+    def test_module(self, path):
+        """
+        Drops the module whose tests are discovered within the context,
+        unless it was parsed before (as the module of a parent class)
+        """
+        path = self._get_path(path)
+        kept = path in self._modules
+        try:
+            yield
+        finally:
+            if not kept:
+                self._modules.pop(path, None)
+                self._classes.pop(path, None)
+
+    def find_module(self, name, paths):
+        """
+        Returns the path of a module (see :func:`imp.find_module`)
+        """
+        key = (name, tuple(paths))
+        path = self._found.get(key)
+        if path is None:
+            module_file, path, _ = imp.find_module(name, paths)
+            if module_file is not None:
+                module_file.close()
+            self._found[key] = path
+        return path
+
+    def examine_class(self, function, *args):
+        """
+        Returns the result of the examination of a class, examining it
+        by calling the function with the arguments only the first time
+
+        The result is copied, as the callers extend it.
+        """
+        key = (os.path.abspath(args[0]),) + args[1:]
+        if key in self._examined:
+            result, paths = self._examined[key]
+            _add_parsed_paths(paths)
+        else:
+            with record_parsed_paths() as paths:
+                result = function(*args)
+            self._examined[key] = (result, paths)
+        return copy.deepcopy(result)
+
+
+@contextlib.contextmanager
+def module_index():
+    """
+    Shares a :class:`ModuleIndex` by the test discoveries within the
+    context (the one of the outer context, when nested)
+    """
+    if _MODULE_INDEXES:
+        yield _MODULE_INDEXES[-1]
+        return
+    index = ModuleIndex()
+    _MODULE_INDEXES.append(index)
+    try:
+        yield index
+    finally:
+        _MODULE_INDEXES.pop()
+
+
+def _get_module_index(index=None):
+    if index is not None:
+        return index
+    if _MODULE_INDEXES:
+        return _MODULE_INDEXES[-1]
+    return ModuleIndex()
+
+
 class PythonModule:
     """
     Representation of a Python module that might contain interesting classes
@@ -38,7 +206,7 @@ class PythonModule:
     __slots__ = ('path', 'klass_imports', 'mod_imports', 'mod', 'imported_objects',
                  'module', 'klass')
 
-    def __init__(self, path, module='avocado', klass='Test'):
+    def __init__(self, path, module='avocado', klass='Test', index=None):
         """
         Instantiates a new PythonModule representation
 
@@ -50,6 +218,9 @@ class PythonModule:
         :type module: str
         :param klass: the possibly interesting class original name
         :type klass: str
+        :param index: index of the parsed modules (see
+                      :func:`module_index`)
+        :type index: :class:`ModuleIndex`
         """
         self.klass_imports = set()
         self.mod_imports = set()
@@ -64,8 +235,7 @@ class PythonModule:
         #            Basically a $path/$module/$variable string, but depending
         #            on the type of import, it can be also be $path/$module.
         self.imported_objects = {}
-        with open(self.path) as source_file:
-            self.mod = ast.parse(source_file.read(), self.path)
+        self.mod = _get_module_index(index).parse(self.path)
 
     def is_matching_klass(self, klass):
         """
@@ -356,7 +526,7 @@ def _determine_match_avocado(module, klass, docstring):
 
 
 def _examine_class(path, class_name, match, target_module, target_class,
-                   determine_match):
+                   determine_match, index=None):
     """
     Examine a class from a given path
 
@@ -375,12 +545,27 @@ def _examine_class(path, class_name, match, target_module, target_class,
     :param determine_match: a callable that will determine if a match has
                             occurred or not
     :type determine_match: function
+    :param index: index of the parsed modules (see :func:`module_index`)
+    :type index: :class:`ModuleIndex`
     :returns: tuple where first item is a list of test methods detected
               for given class; second item is set of class names which
               look like avocado tests but are force-disabled.
     :rtype: tuple
     """
-    module = PythonModule(path, target_module, target_class)
+    index = _get_module_index(index)
+    return index.examine_class(_examine_module_class, path, class_name, match,
+                               target_module, target_class, determine_match,
+                               index)
+
+
+def _examine_module_class(path, class_name, match, target_module,
+                          target_class, determine_match, index):
+    """
+    Examine a class from a given path (see :func:`_examine_class`)
+    """
+    if class_name not in index.get_classes(path):
+        return [], set(), match
+    module = PythonModule(path, target_module, target_class, index)
     info = []
     disabled = set()
 
@@ -397,7 +582,7 @@ def _examine_class(path, class_name, match, target_module, target_class,
                                 get_docstring_directives_tags(docstring))
 
         # Getting the list of parents of the current class
-        parents = klass.bases
+        parents = list(klass.bases)
 
         # From this point we use `_$variable` to name temporary returns
         # from method calls that are to-be-assigned/combined with the
@@ -414,7 +599,8 @@ def _examine_class(path, class_name, match, target_module, target_class,
             _info, _disabled, _match = _examine_class(module.path, parent_class,
                                                       match, target_module,
                                                       target_class,
-                                                      _determine_match_avocado)
+                                                      _determine_match_avocado,
+                                                      index)
             if _info:
                 parents.remove(parent)
                 info.extend(_info)
@@ -454,14 +640,14 @@ def _examine_class(path, class_name, match, target_module, target_class,
 
             modules_paths = [parent_path,
                              os.path.dirname(module.path)] + sys.path
-            _, found_ppath, _ = imp.find_module(parent_module,
-                                                modules_paths)
+            found_ppath = index.find_module(parent_module, modules_paths)
             _info, _disabled, _match = _examine_class(found_ppath,
                                                       parent_class,
                                                       match,
                                                       target_module,
                                                       target_class,
-                                                      _determine_match_avocado)
+                                                      _determine_match_avocado,
+                                                      index)
             if _info:
                 info.extend(_info)
                 disabled.update(_disabled)
@@ -471,22 +657,30 @@ def _examine_class(path, class_name, match, target_module, target_class,
     return info, disabled, match
 
 
-def find_avocado_tests(path):
+def find_avocado_tests(path, index=None):
     """
     Attempts to find Avocado instrumented tests from Python source files
 
     :param path: path to a Python source code file
     :type path: str
+    :param index: index of the parsed modules (see :func:`module_index`)
+    :type index: :class:`ModuleIndex`
     :returns: tuple where first item is dict with class name and additional
               info such as method names and tags; the second item is
               set of class names which look like avocado tests but are
               force-disabled.
     :rtype: tuple
     """
+    index = _get_module_index(index)
+    with index.test_module(path):
+        return _find_avocado_tests(path, index)
+
+
+def _find_avocado_tests(path, index):
     module_name = 'avocado'
     class_name = 'Test'
 
-    module = PythonModule(path, module_name, class_name)
+    module = PythonModule(path, module_name, class_name, index)
     # The resulting test classes
     result = collections.OrderedDict()
     disabled = set()
@@ -519,7 +713,7 @@ def find_avocado_tests(path):
         _disabled = set()
 
         # Getting the list of parents of the current class
-        parents = klass.bases
+        parents = list(klass.bases)
 
         # Searching the parents in the same module
         for parent in parents[:]:
@@ -532,7 +726,8 @@ def find_avocado_tests(path):
             _info, _dis, _avocado = _examine_class(module.path, parent_class,
                                                    is_avocado, module_name,
                                                    class_name,
-                                                   _determine_match_avocado)
+                                                   _determine_match_avocado,
+                                                   index)
             if _info:
                 parents.remove(parent)
                 info.extend(_info)
@@ -572,13 +767,14 @@ def find_avocado_tests(path):
 
             modules_paths = [parent_path,
                              os.path.dirname(module.path)] + sys.path
-            _, found_ppath, _ = imp.find_module(parent_module, modules_paths)
+            found_ppath = index.find_module(parent_module, modules_paths)
             _info, _dis, _avocado = _examine_class(found_ppath,
                                                    parent_class,
                                                    is_avocado,
                                                    module_name,
                                                    class_name,
-                                                   _determine_match_avocado)
+                                                   _determine_match_avocado,
+                                                   index)
             if _info:
                 info.extend(_info)
                 _disabled.update(_dis)
@@ -601,7 +797,7 @@ def _determine_match_unittest(module, klass,
     return module.is_matching_klass(klass)
 
 
-def find_python_unittests(path):
+def find_python_unittests(path, index=None):
     """
     Attempts to find methods names from a given Python source file
 
@@ -611,18 +807,26 @@ def find_python_unittests(path):
 
     :param path: path to a Python source code file
     :type path: str
+    :param index: index of the parsed modules (see :func:`module_index`)
+    :type index: :class:`ModuleIndex`
     :returns: an ordered dictionary with classes as keys and methods as values
     :rtype: collections.OrderedDict
     """
+    index = _get_module_index(index)
+    with index.test_module(path):
+        return _find_python_unittests(path, index)
+
+
+def _find_python_unittests(path, index):
     module_name = 'unittest'
     class_name = 'TestCase'
 
-    module = PythonModule(path, module_name, class_name)
+    module = PythonModule(path, module_name, class_name, index)
     result = collections.OrderedDict()
 
     for klass in module.iter_classes():
 
-        parents = klass.bases
+        parents = list(klass.bases)
         is_unittest = module.is_matching_klass(klass)
 
         info = [st.name for st in klass.body if
@@ -640,7 +844,8 @@ def find_python_unittests(path):
             _info, _dis, _is_unittest = _examine_class(module.path, parent_class,
                                                        is_unittest, module_name,
                                                        class_name,
-                                                       _determine_match_unittest)
+                                                       _determine_match_unittest,
+                                                       index)
             methods = [i[0] for i in _info]
             if _info:
                 parents.remove(parent)
@@ -680,13 +885,14 @@ def find_python_unittests(path):
 
             modules_paths = [parent_path,
                              os.path.dirname(module.path)] + sys.path
-            _, found_ppath, _ = imp.find_module(parent_module, modules_paths)
+            found_ppath = index.find_module(parent_module, modules_paths)
             _info, _dis, _is_unittest = _examine_class(found_ppath,
                                                        parent_class,
                                                        is_unittest,
                                                        module_name,
                                                        class_name,
-                                                       _determine_match_unittest)
+                                                       _determine_match_unittest,
+                                                       index)
             methods = [i[0] for i in _info]
             if _info:
                 info.extend(methods)
@@ -0,0 +1,162 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Split of a test suite into shards, to be executed by independent jobs
+(usually on different machines), and merge of their results.
+
+Every job gets the whole test suite and executes only the tests of its
+own shard, so the partition must not depend on anything but the test
+identifiers (and, in the "duration" mode, on a snapshot of the test
+history given to all the jobs).
+"""
+
+import hashlib
+
+from . import history
+from ..utils import astring
+
+
+#: Ways to split the tests into shards
+SHARD_MODES = ('hash', 'duration')
+
+
+def parse(value):
+    """
+    Parses the "INDEX/TOTAL" shard specification
+
+    :param value: shard specification (eg. "2/4", INDEX starts at 1)
+    :return: tuple(index, total)
+    :raise ValueError: when the specification is not valid
+    """
+    index, sep, total = value.partition('/')
+    try:
+        index = int(index)
+        total = int(total)
+    except ValueError:
+        sep = None
+    if not sep or total < 1 or not 1 <= index <= total:
+        raise ValueError('Invalid shard "%s", it must be given as INDEX/TOTAL '
+                         'where 1 <= INDEX <= TOTAL' % value)
+    return index, total
+
+
+def _hash_shard(key, total):
+    digest = hashlib.sha1(astring.to_text(key).encode(astring.ENCODING))
+    return int(digest.hexdigest(), 16) % total + 1
+
+
+def split_by_hash(keys, index, total):
+    """
+    Returns the tests belonging to a shard based on their keys' hash
+
+    The shard of each test depends only on its key, so it's stable even
+    when other tests are added to or removed from the suite.
+
+    :param keys: list of test keys (see :func:`history.get_test_key`)
+    :param index: shard index (starting at 1)
+    :param total: number of shards
+    :return: list of indexes into `keys`
+    """
+    return [position for position, key in enumerate(keys)
+            if _hash_shard(key, total) == index]
+
+
+def split_by_duration(keys, index, total, test_history):
+    """
+    Returns the tests belonging to a shard balanced by their durations
+
+    Tests with known durations are assigned, the longest first, to the
+    shard with the least expected duration so far.  Tests without known
+    durations are split by their keys' hash.  All the jobs must be given
+    the same test history (a snapshot which is not updated by the results
+    of the shards) to get a consistent partition.
+
+    :param keys: list of test keys (see :func:`history.get_test_key`)
+    :param index: shard index (starting at 1)
+    :param total: number of shards
+    :param test_history: test history
+    :type test_history: :class:`avocado.core.history.TestHistory`
+    :return: list of indexes into `keys`
+    """
+    durations = {}
+    for key in keys:
+        duration = test_history.get_time(key)
+        if duration is not None:
+            durations[key] = duration
+    shards = {}
+    loads = [0.0] * total
+    for key in sorted(durations, key=lambda key: (-durations[key], key)):
+        shard = min(range(total), key=lambda shard: (loads[shard], shard))
+        loads[shard] += durations[key]
+        shards[key] = shard + 1
+    return [position for position, key in enumerate(keys)
+            if shards.get(key, None) == index or
+            (key not in shards and _hash_shard(key, total) == index)]
+
+
+#: Counters of results.json summed up by :func:`merge_results`
+_COUNTERS = ('total', 'pass', 'errors', 'failures', 'skip', 'cancel', 'time')
+
+
+def merge_results(results):
+    """
+    Merges the results of the jobs executing the shards of a test suite
+
+    :param results: list of the jobs' ``results.json`` content, each one
+                    with the "shard" information
+    :return: content of a ``results.json`` like dict, with the tests of
+             all shards (renumbered in the shards order), the list of
+             "shards" (job_id, debuglog, index) and the "missing" shards
+    :raise ValueError: when the results are not of shards of a single
+                       test suite
+    """
+    shards = {}
+    total = None
+    for content in results:
+        shard = content.get('shard')
+        if not shard:
+            raise ValueError('Job %s was not executed as a shard'
+                             % content.get('job_id'))
+        if total is None:
+            total = shard['total']
+        elif shard['total'] != total:
+            raise ValueError('Job %s executed shard %s/%s, but the other '
+                             'jobs split the tests into %s shards'
+                             % (content.get('job_id'), shard['index'],
+                                shard['total'], total))
+        if shard['index'] in shards:
+            raise ValueError('Shard %s/%s was executed by jobs %s and %s'
+                             % (shard['index'], total,
+                                shards[shard['index']].get('job_id'),
+                                content.get('job_id')))
+        shards[shard['index']] = content
+    merged = dict((counter, 0) for counter in _COUNTERS)
+    merged['tests'] = []
+    merged['shards'] = []
+    for index in sorted(shards):
+        content = shards[index]
+        for counter in _COUNTERS:
+            merged[counter] += content.get(counter, 0)
+        merged['shards'].append({'index': index,
+                                 'job_id': content.get('job_id'),
+                                 'debuglog': content.get('debuglog')})
+        for test in content.get('tests', []):
+            test = dict(test)
+            test['id'] = '%s-%s' % (len(merged['tests']) + 1,
+                                    history.get_test_key(test.get('id', '')))
+            test['shard'] = index
+            merged['tests'].append(test)
+    merged['missing'] = [index for index in range(1, (total or 0) + 1)
+                         if index not in shards]
+    return merged
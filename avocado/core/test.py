@@ -36,7 +36,10 @@ from . import defaults
 from . import exceptions
 from . import output
 from . import parameters
+from . import resources
 from . import sysinfo
+from . import teststate
+from . import unittestbatch
 from ..utils import asset
 from ..utils import astring
 from ..utils import data_structures
@@ -61,7 +64,7 @@ TEST_STATE_ATTRIBUTES = ('name', 'logdir', 'logfile',
                          'status', 'running', 'paused',
                          'time_start', 'time_elapsed', 'time_end',
                          'fail_reason', 'fail_class', 'traceback',
-                         'timeout', 'whiteboard', 'phase')
+                         'timeout', 'whiteboard', 'phase', 'resources')
 
 
 class RawFileHandler(logging.FileHandler):
@@ -315,6 +318,8 @@ class Test(unittest.TestCase, TestData):
     #: duration of the test execution (always recalculated from time_end -
     #: time_start
     time_elapsed = -1
+    #: Resources used by the test (see :mod:`avocado.core.resources`)
+    resources = None
     #: Test timeout (the timeout from params takes precedence)
     timeout = None
 
@@ -399,6 +404,7 @@ class Test(unittest.TestCase, TestData):
         self.__cache_dirs = None    # Is initialized lazily
 
         self.__running = False
+        self.__resources_start = None
         self.paused = False
         self.paused_msg = ''
 
@@ -609,12 +615,15 @@ class Test(unittest.TestCase, TestData):
         self.log.info('START %s', self.name)
         self.__running = True
         self.time_start = time.time()
+        self.__resources_start = resources.snapshot()
 
     def _tag_end(self):
         self.__running = False
         self.time_end = time.time()
         # for consistency sake, always use the same stupid method
         self._update_time_elapsed(self.time_end)
+        if self.__resources_start is not None:
+            self.resources = resources.usage_since(self.__resources_start)
 
     def _update_time_elapsed(self, current_time=None):
         if current_time is None:
@@ -626,7 +635,7 @@ class Test(unittest.TestCase, TestData):
         Send the current test state to the test runner process
         """
         if self.runner_queue is not None:
-            self.runner_queue.put(self.get_state())
+            self.runner_queue.put(teststate.pack(self.get_state()))
 
     def get_state(self):
         """
@@ -642,9 +651,7 @@ class Test(unittest.TestCase, TestData):
         state['job_logdir'] = self.job.logdir
         state['job_unique_id'] = self.job.unique_id
         try:
-            state['params'] = [(path, key, value)
-                               for path, key, value
-                               in self.__params.iteritems()]
+            state['params'] = list(self.__params.get_flattened())
         except Exception:
             state['params'] = None
         return state
@@ -713,12 +720,15 @@ class Test(unittest.TestCase, TestData):
         Stop the logging activity of the test by cleaning the logger handlers.
         """
         self.log.removeHandler(self.file_handler)
+        logging.root.removeHandler(self.file_handler)
+        self.file_handler.close()
         if isinstance(sys.stderr, output.LoggingFile):
             sys.stderr.rm_logger(LOG_JOB.getChild("stderr"))
         if isinstance(sys.stdout, output.LoggingFile):
             sys.stdout.rm_logger(LOG_JOB.getChild("stdout"))
         for name, handler in self._logging_handlers.items():
             logging.getLogger(name).removeHandler(handler)
+            handler.close()
 
     def _record_reference(self, produced_file_path, reference_file_name):
         '''
@@ -961,16 +971,25 @@ class Test(unittest.TestCase, TestData):
 
         self.__status = 'PASS'
 
-    def _setup_environment_variables(self):
-        os.environ['AVOCADO_VERSION'] = VERSION
+    def _get_environment_variables(self):
+        """
+        Environment variables describing the test to the test code
+
+        :rtype: dict
+        """
+        env = {'AVOCADO_VERSION': VERSION}
         if self.basedir is not None:
-            os.environ['AVOCADO_TEST_BASEDIR'] = self.basedir
-        os.environ['AVOCADO_TEST_WORKDIR'] = self.workdir
-        os.environ['AVOCADO_TEST_LOGDIR'] = self.logdir
-        os.environ['AVOCADO_TEST_LOGFILE'] = self.logfile
-        os.environ['AVOCADO_TEST_OUTPUTDIR'] = self.outputdir
+            env['AVOCADO_TEST_BASEDIR'] = self.basedir
+        env['AVOCADO_TEST_WORKDIR'] = self.workdir
+        env['AVOCADO_TEST_LOGDIR'] = self.logdir
+        env['AVOCADO_TEST_LOGFILE'] = self.logfile
+        env['AVOCADO_TEST_OUTPUTDIR'] = self.outputdir
         if self.__sysinfo_enabled:
-            os.environ['AVOCADO_TEST_SYSINFODIR'] = self.__sysinfodir
+            env['AVOCADO_TEST_SYSINFODIR'] = self.__sysinfodir
+        return env
+
+    def _setup_environment_variables(self):
+        os.environ.update(self._get_environment_variables())
 
     def run_avocado(self):
         """
@@ -1097,6 +1116,12 @@ class SimpleTest(Test):
 
     DATA_SOURCES = ["variant", "file"]
 
+    #: Whether the command of this test can be executed by the asyncio
+    #: engine (see :mod:`avocado.core.asyncrunner`).  Tests whose test
+    #: method does more than running the command given by
+    #: :meth:`_get_command` through :meth:`_run_cmd` have to disable it.
+    ASYNC_COMMAND = True
+
     def __init__(self, name, params=None, base_logdir=None, job=None,
                  executable=None):
         if executable is None:
@@ -1119,6 +1144,9 @@ class SimpleTest(Test):
             # turns it into a "bytes" array in Python 2
             if not astring.is_text(self._command):
                 self._command = astring.to_text(self._command, defaults.ENCODING)
+        #: Output of the command already executed by the asyncio engine
+        #: (or by a batch of Python unittests)
+        self._command_output = None
 
     @property
     def filename(self):
@@ -1136,16 +1164,64 @@ class SimpleTest(Test):
         self.log.info("Exit status: %s", result.exit_status)
         self.log.info("Duration: %s", result.duration)
 
+    def _get_command(self):
+        """
+        Describes the command executed by this test
+
+        :return: tuple(command, extra environment variables or None,
+                 working directory or None) or None when no command is
+                 going to be executed
+        """
+        test_params = dict([(str(key), str(val)) for _, key, val in
+                            self.params.iteritems()])
+        return self._command, test_params, None
+
+    def _pop_recorded_output(self, command, env, wait=True):
+        """
+        Output of the command executed on behalf of this test by the
+        runner (such as by a batch of Python unittests, see
+        :mod:`unittestbatch`)
+
+        :param command: command line
+        :param env: extra environment variables
+        :param wait: whether to wait for the output not recorded yet
+        :return: the recorded output, None when the test has to execute
+                 the command or :data:`unittestbatch.PENDING` (when not
+                 waiting)
+        """
+        return None
+
+    def _run_cmd(self, cmd, env=None, ignore_status=False):
+        """
+        Run the command, see :func:`avocado.utils.process.run`
+
+        When the command was already executed by the asyncio engine (or by
+        a batch of Python unittests, see :meth:`_pop_recorded_output`), its
+        recorded output is logged the same way and its result is used.
+
+        :param cmd: command line
+        :param env: extra environment variables
+        :param ignore_status: whether to not raise on non-zero exit status
+        :rtype: :class:`avocado.utils.process.CmdResult`
+        :raise process.CmdError: on non-zero exit status (unless ignored)
+        """
+        if self._command_output is None:
+            self._command_output = self._pop_recorded_output(cmd, env)
+        if self._command_output is None:
+            return process.run(cmd, verbose=True, ignore_status=ignore_status,
+                               env=env, encoding=defaults.ENCODING)
+        result = self._command_output.replay()
+        if result.exit_status != 0 and not ignore_status:
+            raise process.CmdError(cmd, result)
+        return result
+
     def _execute_cmd(self):
         """
         Run the executable, and log its detailed execution.
         """
         try:
-            test_params = dict([(str(key), str(val)) for _, key, val in
-                                self.params.iteritems()])
-
-            result = process.run(self._command, verbose=True,
-                                 env=test_params, encoding=defaults.ENCODING)
+            command, test_params, _ = self._get_command()
+            result = self._run_cmd(command, env=test_params)
 
             self._log_detailed_cmd_info(result)
         except process.CmdError as details:
@@ -1233,6 +1309,21 @@ class ExternalRunnerTest(SimpleTest):
     def filename(self):
         return None
 
+    def _get_cwd(self):
+        """
+        Work directory required by the external runner (or None)
+        """
+        if self.external_runner.chdir == 'runner':
+            return os.path.dirname(self.external_runner.runner)
+        elif self.external_runner.chdir == 'test':
+            return self.external_runner.test_dir
+        return None
+
+    def _get_command(self):
+        command, test_params, _ = super(ExternalRunnerTest,
+                                        self)._get_command()
+        return command, test_params, self._get_cwd()
+
     def test(self):
         pre_cwd = os.getcwd()
         new_cwd = None
@@ -1241,12 +1332,7 @@ class ExternalRunnerTest(SimpleTest):
                           self.external_runner.runner)
 
             # Change work directory if needed by the external runner
-            if self.external_runner.chdir == 'runner':
-                new_cwd = os.path.dirname(self.external_runner.runner)
-            elif self.external_runner.chdir == 'test':
-                new_cwd = self.external_runner.test_dir
-            else:
-                new_cwd = None
+            new_cwd = self._get_cwd()
             if new_cwd is not None:
                 self.log.debug('Changing working directory to "%s" '
                                'because of external runner requirements ',
@@ -1271,6 +1357,21 @@ class PythonUnittest(ExternalRunnerTest):
         super(PythonUnittest, self).__init__(name, params, base_logdir, job,
                                              external_runner=external_runner,
                                              external_runner_argument=python_unittest_module)
+        self._unittest_name = python_unittest_module or name.name
+
+    def _pop_recorded_output(self, command, env, wait=True):
+        # The method might have been executed by a batch of the runner,
+        # which does not export the test params
+        job_logdir = getattr(self.job, 'logdir', None)
+        if job_logdir is None or env:
+            return None
+        if wait:
+            pop_output = unittestbatch.wait_output
+        else:
+            pop_output = unittestbatch.pop_output
+        return pop_output(os.path.join(job_logdir, unittestbatch.RECORDS_DIR),
+                          self.external_runner.test_dir, self._unittest_name,
+                          command)
 
     def _find_result(self, status="OK"):
         status_line = "[stderr] %s" % status
@@ -1370,6 +1471,31 @@ class ReplaySkipTest(MockingTest):
         pass
 
 
+class CachedResultSkipTest(MockingTest):
+
+    """
+    Skip test due to an unchanged previously passing result.
+
+    The test inputs did not change since it passed (see
+    :mod:`avocado.core.result_cache`), the original result is pointed
+    to in the skip reason.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.cached_result = kwargs.pop('cached_result', {})
+        super(CachedResultSkipTest, self).__init__(*args, **kwargs)
+
+    def setUp(self):
+        raise exceptions.TestSkipError("Test inputs unchanged since it "
+                                       "passed as %s in job %s (%s)"
+                                       % (self.cached_result.get('name'),
+                                          self.cached_result.get('job_id'),
+                                          self.cached_result.get('logdir')))
+
+    def test(self):
+        pass
+
+
 class TestError(Test):
     """
     Generic test error.
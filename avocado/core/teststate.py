@@ -0,0 +1,277 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Transfer of the test states from the test processes to the runner
+
+The test state (see :meth:`avocado.core.test.Test.get_state`) is sent
+through a pipe, pickled, at least when the test starts and when it
+ends.  The fields which might be large (:data:`EXTERNAL_FIELDS`) are
+stored in files in the ``state`` directory of the test logdir instead,
+when their size exceeds the ``state_inline_max`` key of the ``runner``
+section of the settings, and only their paths are sent.  Like the other
+test results, the files are plain text (strings) or JSON, the fields
+which can't be stored as such are always sent through the pipe.
+
+The runner gets a :class:`TestState`, which behaves as the original
+dict, but reads those fields from their files each time they are
+accessed, so they are neither copied through the pipe nor kept in the
+runner's memory.
+"""
+
+import hashlib
+import json
+import os
+
+from .output import LOG_JOB
+from .settings import settings
+
+
+#: Fields of the test state which might be stored in files
+EXTERNAL_FIELDS = ('whiteboard', 'params', 'traceback', 'fail_reason',
+                   'text_output')
+
+#: Key of the packed state mapping the external fields to their files
+EXTERNAL_KEY = 'external_fields'
+
+#: Directory (in the test logdir) where the external fields are stored
+STATE_DIR = 'state'
+
+#: Default maximum size (in bytes) of the fields sent through the pipe
+DEFAULT_INLINE_MAX = 4096
+
+#: Conversions of the fields read from JSON (which has no tuples)
+_FROM_JSON = {'params': lambda params: [tuple(param) for param in params]}
+
+
+def get_inline_max():
+    """
+    Maximum size (in bytes) of the fields sent through the pipe, negative
+    values mean all the fields are sent through the pipe
+    """
+    return settings.get_value('runner', 'state_inline_max', key_type=int,
+                              default=DEFAULT_INLINE_MAX)
+
+
+def _from_json(name, value):
+    convert = _FROM_JSON.get(name)
+    if convert is None:
+        return value
+    return convert(value)
+
+
+def _encode(name, value):
+    """
+    Encodes the field as text (strings) or JSON
+
+    :return: tuple(data, file extension) or None when the value can't be
+             stored as such (without changing it)
+    """
+    if isinstance(value, str):
+        try:
+            return value.encode('utf-8'), 'txt'
+        except UnicodeError:
+            return None
+    try:
+        data = json.dumps(value)
+        if _from_json(name, json.loads(data)) != value:
+            return None
+    except (TypeError, ValueError):
+        return None
+    return data.encode('utf-8'), 'json'
+
+
+def _decode(name, path):
+    """
+    Reads the field stored by :func:`_store`
+    """
+    with open(path, 'rb') as state_file:
+        data = state_file.read().decode('utf-8')
+    if path.endswith('.txt'):
+        return data
+    return _from_json(name, json.loads(data))
+
+
+def _store(logdir, name, data, extension):
+    """
+    Stores the (encoded) field in the test logdir
+
+    The file name contains the digest of the data, so the same value
+    (such as the params, sent in every state) is stored only once.
+
+    :return: the path or None when it can't be stored
+    """
+    digest = hashlib.sha1(data).hexdigest()[:16]
+    directory = os.path.join(os.path.abspath(logdir), STATE_DIR)
+    path = os.path.join(directory, '%s-%s.%s' % (name, digest, extension))
+    if os.path.exists(path):
+        return path
+    tmp_path = '%s.%s.tmp' % (path, os.getpid())
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp_path, 'wb') as state_file:
+            state_file.write(data)
+        os.rename(tmp_path, path)
+    except (IOError, OSError) as details:
+        LOG_JOB.debug("Unable to store the test state field %s in %s: %s",
+                      name, directory, details)
+        return None
+    return path
+
+
+def pack(state, inline_max=None):
+    """
+    Moves the large fields of the test state into files
+
+    :param state: the test state
+    :type state: dict
+    :param inline_max: maximum size (in bytes) of the fields kept in the
+                       state (see :func:`get_inline_max`, used by default)
+    :return: the state to be sent to the runner, the original one when
+             all the fields are small
+    :rtype: dict
+    """
+    if inline_max is None:
+        inline_max = get_inline_max()
+    logdir = state.get('logdir')
+    if inline_max < 0 or not logdir:
+        return state
+    external = {}
+    for name in EXTERNAL_FIELDS:
+        value = state.get(name)
+        if not value:
+            continue
+        if isinstance(value, str) and len(value) <= inline_max:
+            continue
+        encoded = _encode(name, value)
+        if encoded is None or len(encoded[0]) <= inline_max:
+            continue
+        path = _store(logdir, name, *encoded)
+        if path is not None:
+            external[name] = path
+    if not external:
+        return state
+    packed = {key: value for key, value in state.items()
+              if key not in external}
+    packed[EXTERNAL_KEY] = external
+    return packed
+
+
+def unpack(msg):
+    """
+    Returns the test state received by the runner
+
+    :param msg: a message received from the test process
+    :return: a :class:`TestState` when some fields are stored in files,
+             the message itself otherwise
+    """
+    if isinstance(msg, dict) and EXTERNAL_KEY in msg:
+        return TestState(msg)
+    return msg
+
+
+class TestState(dict):
+
+    """
+    Test state whose large fields are read from files when accessed
+
+    Values set after it was received take precedence over the ones in
+    the files.  Copies (``dict(state)``) and pickled states contain all
+    the fields.
+    """
+
+    def __init__(self, packed):
+        """
+        :param packed: the state as returned by :func:`pack`
+        """
+        packed = dict(packed)
+        #: Field name -> path of the file storing it
+        self.external = packed.pop(EXTERNAL_KEY, {})
+        super(TestState, self).__init__(packed)
+
+    def _load(self, key):
+        path = self.external[key]
+        try:
+            return _decode(key, path)
+        except (IOError, OSError, ValueError) as details:
+            LOG_JOB.warning("Unable to read the test state field %s from "
+                            "%s: %s", key, path, details)
+            return None
+
+    def __getitem__(self, key):
+        if not dict.__contains__(self, key) and key in self.external:
+            return self._load(key)
+        return super(TestState, self).__getitem__(key)
+
+    def __delitem__(self, key):
+        if key in self.external:
+            del self.external[key]
+            if not dict.__contains__(self, key):
+                return
+        super(TestState, self).__delitem__(key)
+
+    def __contains__(self, key):
+        return key in self.external or dict.__contains__(self, key)
+
+    def __iter__(self):
+        for key in dict.__iter__(self):
+            yield key
+        for key in self.external:
+            if not dict.__contains__(self, key):
+                yield key
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __reduce__(self):
+        return (dict, (dict(self.items()),))
+
+    def keys(self):
+        return list(iter(self))
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return super(TestState, self).pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self):
+        return dict(self.items())
@@ -0,0 +1,123 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Planning of the tests executed within the job timeout
+
+Without a plan, tests are executed in order and the ones left once the
+job timeout is reached are skipped.  A plan uses the durations of the
+tests executed by previous jobs (see :mod:`history`) to choose upfront
+the tests which fit in the job timeout, packing them into the slots of
+the parallel runner, and executes them first.  The remaining tests are
+skipped right away.  No plan is made when none of the durations is known.
+
+Tests are chosen greedily, either by their priority or by their value
+(priority) per second of expected duration.  The priority is given by
+the ``priority`` test tag (``:avocado: tags=priority:5``), the default
+being :data:`DEFAULT_PRIORITY`.  Tests without known durations are
+expected to take the average duration of the other tests.
+"""
+
+import heapq
+
+
+#: Ways of choosing the tests executed within the job timeout
+PLAN_MODES = ('priority', 'value')
+
+#: Priority of tests without the "priority" tag
+DEFAULT_PRIORITY = 1
+
+#: Shortest duration considered when computing the value per second, so
+#: tests which take no time at all don't get an infinite value
+MIN_DURATION = 0.001
+
+
+def get_priority(tags):
+    """
+    Priority of a test given by its "priority" tag
+
+    :param tags: the test tags (as returned by the loader)
+    :type tags: dict
+    :return: the highest integer value of the "priority" tag, or
+             :data:`DEFAULT_PRIORITY` when there is none
+    :rtype: int
+    """
+    values = (tags or {}).get('priority') or ()
+    priorities = []
+    for value in values:
+        try:
+            priorities.append(int(value))
+        except ValueError:
+            continue
+    if priorities:
+        return max(priorities)
+    return DEFAULT_PRIORITY
+
+
+def plan(keys, test_history, budget, slots=1, priorities=None,
+         mode='value'):
+    """
+    Chooses the tests which are expected to finish within the budget
+
+    Each chosen test is assigned to the slot expected to be free first,
+    tests which would finish after the budget in that slot are left out.
+
+    :param keys: list of test keys (see :func:`history.get_test_key`)
+    :param test_history: test history
+    :type test_history: :class:`avocado.core.history.TestHistory`
+    :param budget: time (in seconds) available to execute the tests
+    :param slots: number of tests executed at the same time
+    :param priorities: list of priorities of the tests (see
+                       :func:`get_priority`), all of them
+                       :data:`DEFAULT_PRIORITY` when not given
+    :param mode: one of :data:`PLAN_MODES`
+    :return: tuple(list of indexes into `keys` of the chosen tests, in
+             the order they should be started, list of indexes of the
+             tests left out, expected duration of the chosen tests), or
+             None when none of the durations is known
+    """
+    durations = [test_history.get_time(key) for key in keys]
+    known = [duration for duration in durations if duration is not None]
+    if priorities is None:
+        priorities = [DEFAULT_PRIORITY] * len(keys)
+
+    if mode == 'priority':
+        def sort_key(index):
+            return (-priorities[index], durations[index], index)
+    elif mode == 'value':
+        def sort_key(index):
+            return (-priorities[index] / max(durations[index], MIN_DURATION),
+                    index)
+    else:
+        raise ValueError("Unknown plan mode %s, it must be one of %s"
+                         % (mode, ", ".join(PLAN_MODES)))
+
+    if not known:
+        return None
+    average = sum(known) / len(known)
+    durations = [average if duration is None else duration
+                 for duration in durations]
+
+    loads = [(0.0, slot) for slot in range(max(slots, 1))]
+    chosen = []
+    left_out = []
+    for index in sorted(range(len(keys)), key=sort_key):
+        load, slot = loads[0]
+        if load + durations[index] > budget:
+            left_out.append(index)
+            continue
+        heapq.heapreplace(loads, (load + durations[index], slot))
+        chosen.append((load, len(chosen), index))
+    projected = max(load for load, _ in loads)
+    return ([index for _, _, index in sorted(chosen)], sorted(left_out),
+            projected)
@@ -0,0 +1,413 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Execution of Python unittests in batches
+
+Each :class:`avocado.core.test.PythonUnittest` executes a single test
+method with ``python -m unittest``, so an interpreter is started (and the
+test module imported) for each of them.  Instead, the runner executes the
+test methods of the same module in batches, using a single interpreter
+per batch, in the background (see :class:`Batches`).
+
+The output, exit status and duration of each of the methods (as if it
+was executed alone) are recorded in a directory of the job results,
+then each of the tests waits for its record and uses it instead of
+executing the command (see :meth:`avocado.core.test.SimpleTest._run_cmd`),
+so the results and logs of the tests are the same.  Methods without a
+record (eg. when the batch was killed) are executed by their tests as
+usual.
+
+The pending marks of the methods hold the time by which their batch is
+over (the batches are killed on timeout), so the tests don't wait past it
+even when the batches are not executed (eg. the background thread died).
+"""
+
+import hashlib
+import json
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from . import defaults
+from .output import LOG_JOB
+from .settings import settings
+from ..utils import astring
+from ..utils import process
+
+
+#: Directory (in the job results) holding the records of the methods
+RECORDS_DIR = 'unittest_batch'
+
+#: Returned by :func:`pop_output` when the method is not recorded yet
+PENDING = object()
+
+#: Interval (in seconds) between the checks of the pending records
+POLL_INTERVAL = 0.1
+
+#: Time (in seconds) given to a batch, over its timeout, to record its
+#: methods and remove their pending marks
+PENDING_GRACE = 5
+
+#: Executed in the interpreter of a batch: runs the methods given as the
+#: arguments (name and record file name pairs) one by one, the same way
+#: ``python -m unittest -q`` does, and records their (file descriptor
+#: level) output
+_BATCH_CODE = r'''
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+
+def run_method(name):
+    suite = unittest.defaultTestLoader.loadTestsFromNames([name])
+    runner = unittest.TextTestRunner(stream=sys.stderr, verbosity=0)
+    return runner.run(suite)
+
+
+def main(records_dir, args):
+    saved = [os.dup(1), os.dup(2)]
+    for name, record_name in zip(args[::2], args[1::2]):
+        streams = [tempfile.TemporaryFile(), tempfile.TemporaryFile()]
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(streams[0].fileno(), 1)
+        os.dup2(streams[1].fileno(), 2)
+        start = time.time()
+        try:
+            exit_status = 0 if run_method(name).wasSuccessful() else 1
+        finally:
+            duration = time.time() - start
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+        record = {'exit_status': exit_status, 'duration': duration}
+        for key, stream in zip(('stdout', 'stderr'), streams):
+            stream.seek(0)
+            record[key] = stream.read().decode('utf-8', 'surrogateescape')
+            stream.close()
+        path = os.path.join(records_dir, record_name)
+        with open(path + '.tmp', 'w') as record_file:
+            json.dump(record, record_file)
+        os.rename(path + '.tmp', path)
+
+
+main(sys.argv[1], sys.argv[2:])
+'''
+
+
+def _get_record_name(test_dir, name):
+    key = "%s\n%s" % (test_dir, name)
+    return hashlib.sha1(key.encode(defaults.ENCODING)).hexdigest()
+
+
+def _get_pending_path(records_dir, test_dir, name):
+    return os.path.join(records_dir,
+                        _get_record_name(test_dir, name) + '.pending')
+
+
+def _get_pending_end(pending_path):
+    """
+    :return: the time by which the batch is over, 0 when the method is not
+             pending or None when unknown (the mark is being written)
+    """
+    try:
+        with open(pending_path, 'r') as pending_file:
+            return float(pending_file.read())
+    except (IOError, OSError):
+        return 0
+    except ValueError:
+        return None
+
+
+def _get_name(test_factory):
+    params = test_factory[1]
+    return str(params.get('python_unittest_module') or params['name'].name)
+
+
+def get_batch_key(test_factory):
+    """
+    Tests of the same batch share the same key
+
+    :param test_factory: factory of a Python unittest test
+    :return: tuple(test dir, module name)
+    """
+    return (test_factory[1].get('test_dir'),
+            _get_name(test_factory).rsplit('.', 2)[0])
+
+
+def run_batch(records_dir, test_dir, names, timeout=None, interrupted=None):
+    """
+    Executes the test methods in a single interpreter
+
+    :param records_dir: directory where the records are created
+    :param test_dir: working directory of the interpreter (where the
+                     test modules are imported from)
+    :param names: names (module.Class.method) of the test methods
+    :param timeout: time after which the interpreter is killed
+    :param interrupted: event which kills the interpreter when set
+    :type interrupted: :class:`threading.Event`
+    :return: the exit status of the interpreter (None when killed)
+    """
+    args = [sys.executable, '-c', _BATCH_CODE, records_dir]
+    for name in names:
+        args.extend((name, _get_record_name(test_dir, name)))
+    proc = subprocess.Popen(args, cwd=test_dir, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+    end = None if timeout is None else time.time() + timeout
+    try:
+        while True:
+            step = None if end is None else max(0, end - time.time())
+            if interrupted is not None:
+                step = 1 if step is None else min(step, 1)
+            try:
+                return proc.wait(step)
+            except subprocess.TimeoutExpired:
+                pass
+            if end is not None and time.time() >= end:
+                LOG_JOB.warning("Batch of Python unittests of %s (%s) "
+                                "interrupted after %ss, the remaining tests "
+                                "are executed one by one",
+                                names[0].rsplit('.', 2)[0], test_dir,
+                                timeout)
+                return None
+            if interrupted is not None and interrupted.is_set():
+                return None
+    finally:
+        if proc.poll() is None:
+            process.kill_process_tree(proc.pid, signal.SIGKILL)
+            proc.wait()
+
+
+class Batches:
+
+    """
+    Executes the batches in the background, one at a time, so the runner
+    keeps monitoring the tests (including the ones waiting for their
+    records) meanwhile
+    """
+
+    def __init__(self, records_dir, deadline=None):
+        """
+        :param records_dir: directory where the records are created (it's
+                            removed by :meth:`close`)
+        :param deadline: job deadline (or None), the batches are killed
+                         when it's reached
+        """
+        self.records_dir = records_dir
+        self.deadline = deadline
+        self.timeout = settings.get_value('runner.timeout', 'unittest_batch',
+                                          key_type=int, default=3600)
+        self._queue = queue.Queue()
+        self._interrupted = threading.Event()
+        self._thread = None
+        #: Time by which all the submitted batches are over
+        self._end = 0
+
+    def _get_timeout(self):
+        if self.deadline is None:
+            return self.timeout
+        return min(self.timeout, self.deadline - time.time())
+
+    def _execute(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            test_dir, names = batch
+            try:
+                timeout = self._get_timeout()
+                if timeout > 0 and not self._interrupted.is_set():
+                    run_batch(self.records_dir, test_dir, names, timeout,
+                              self._interrupted)
+            except Exception as details:    # pylint: disable=W0703
+                LOG_JOB.warning("Unable to execute the batch of Python "
+                                "unittests of %s (%s): %s",
+                                names[0].rsplit('.', 2)[0], test_dir, details)
+            finally:
+                # The methods not recorded are executed by their tests
+                for name in names:
+                    try:
+                        os.unlink(_get_pending_path(self.records_dir,
+                                                    test_dir, name))
+                    except OSError:
+                        pass
+
+    def submit(self, test_dir, names):
+        """
+        Queues a batch, its methods are pending (see :func:`pop_output`)
+        until it's executed
+
+        :param test_dir: working directory of the batch
+        :param names: names (module.Class.method) of the test methods
+        """
+        if not os.path.isdir(self.records_dir):
+            os.makedirs(self.records_dir)
+        # Executed (and killed on timeout) after the batches already queued
+        self._end = (max(self._end, time.time()) + self.timeout +
+                     PENDING_GRACE)
+        if self.deadline is not None:
+            self._end = min(self._end, self.deadline + PENDING_GRACE)
+        for name in names:
+            with open(_get_pending_path(self.records_dir, test_dir, name),
+                      'w') as pending_file:
+                pending_file.write(repr(self._end))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._execute,
+                                            name='UnittestBatches',
+                                            daemon=True)
+            self._thread.start()
+        self._queue.put((test_dir, names))
+
+    def close(self):
+        """
+        Kills the batch being executed (the tests are over) and removes
+        the records
+        """
+        if self._thread is not None:
+            self._interrupted.set()
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        shutil.rmtree(self.records_dir, ignore_errors=True)
+
+
+def iter_batched(test_factories, size, is_batchable, batches):
+    """
+    Submits batches of the consecutive Python unittests of each module
+    before yielding their test factories
+
+    :param test_factories: iterator of (index, test_factory)
+    :param size: maximum number of test methods executed by a batch
+    :param is_batchable: function telling whether a test factory can be
+                         executed by a batch
+    :param batches: executor of the batches
+    :type batches: :class:`Batches`
+    :return: generator yielding the same (index, test_factory)
+    """
+    pending = []
+    for item in test_factories:
+        batchable = is_batchable(item[1])
+        if pending and (len(pending) == size or not batchable or
+                        (get_batch_key(item[1]) !=
+                         get_batch_key(pending[0][1]))):
+            _submit_pending(pending, batches)
+            for pending_item in pending:
+                yield pending_item
+            pending = []
+        if batchable:
+            pending.append(item)
+        else:
+            yield item
+    _submit_pending(pending, batches)
+    for pending_item in pending:
+        yield pending_item
+
+
+def _submit_pending(pending, batches):
+    if len(pending) < 2:    # Nothing to gain
+        return
+    batches.submit(get_batch_key(pending[0][1])[0],
+                   [_get_name(test_factory) for _, test_factory in pending])
+
+
+class RecordedOutput:
+
+    """
+    Output of a test method executed by a batch
+    """
+
+    def __init__(self, command, record):
+        """
+        :param command: the command line the test would execute
+        :param record: the record created by the batch
+        """
+        self.command = command
+        self.record = record
+
+    def replay(self):
+        """
+        Logs the recorded output the same way :func:`process.run` does
+
+        :return: the command result
+        :rtype: :class:`avocado.utils.process.CmdResult`
+        """
+        process.log.info("Running '%s'", self.command)
+        streams = {}
+        for name, stream_logger in (('stdout', process.stdout_log),
+                                    ('stderr', process.stderr_log)):
+            data = self.record[name].encode('utf-8', 'surrogateescape')
+            for line in data.splitlines():
+                line = astring.to_text(line, defaults.ENCODING, 'replace')
+                process.log.debug("[%s] %s", name, line)
+                stream_logger.debug(line)
+            streams[name] = data
+        process.log.info("Command '%s' finished with %s after %ss (executed "
+                         "by a batch)", self.command,
+                         self.record['exit_status'], self.record['duration'])
+        return process.CmdResult(self.command, streams['stdout'],
+                                 streams['stderr'],
+                                 self.record['exit_status'],
+                                 self.record['duration'], None,
+                                 defaults.ENCODING)
+
+
+def pop_output(records_dir, test_dir, name, command):
+    """
+    Takes the record of a test method executed by a batch
+
+    :param records_dir: directory where the records are created
+    :param test_dir: working directory of the batch
+    :param name: name (module.Class.method) of the test method
+    :param command: the command line the test would execute
+    :return: the recorded output, :data:`PENDING` when its batch is not
+             over yet or None when there's no record (including when its
+             batch is past its end)
+    :rtype: :class:`RecordedOutput`
+    """
+    path = os.path.join(records_dir, _get_record_name(test_dir, name))
+    # The record is created before the pending mark is removed
+    end = _get_pending_end(_get_pending_path(records_dir, test_dir, name))
+    pending = end is None or time.time() < end
+    try:
+        with open(path, 'r') as record_file:
+            record = json.load(record_file)
+        os.unlink(path)
+    except (IOError, OSError, ValueError):
+        return PENDING if pending else None
+    return RecordedOutput(command, record)
+
+
+def wait_output(records_dir, test_dir, name, command):
+    """
+    Takes the record of a test method, waiting for its batch when it's
+    pending (see :func:`pop_output`), up to the end of the batch
+
+    :return: the recorded output or None when there's no record
+    :rtype: :class:`RecordedOutput`
+    """
+    while True:
+        output = pop_output(records_dir, test_dir, name, command)
+        if output is not PENDING:
+            return output
+        time.sleep(POLL_INTERVAL)
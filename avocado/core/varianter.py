@@ -179,6 +179,8 @@ class Varianter:
         """
         self.default_params = {}
         self._default_params = None
+        #: Variants of all plugins (see :meth:`get_variants`)
+        self._variants = None
         if state is None:
             self.debug = debug
             self.node_class = tree.TreeNodeDebug if debug else tree.TreeNode
@@ -200,7 +202,8 @@ class Varianter:
         self.default_params.clear()
         self._variant_plugins.map_method("initialize", args)
         self._variant_plugins.map_method_copy("update_defaults", self._default_params)
-        self._no_variants = sum(self._variant_plugins.map_method("__len__"))
+        self._variants = None
+        self._no_variants = len(self.get_variants())
 
     def is_parsed(self):
         """
@@ -320,7 +323,27 @@ class Varianter:
         self.debug = False
         self.node_class = tree.TreeNode
         self._variant_plugins = FakeVariantDispatcher(state)
-        self._no_variants = sum(self._variant_plugins.map_method("__len__"))
+        self._variants = None
+        self._no_variants = len(self.get_variants())
+
+    def get_variants(self):
+        """
+        Variants of all plugins
+
+        The plugins produce (and filter) their variants only once, the
+        following calls return the same variants, which must not be
+        modified.
+
+        :return: tuple of variants (see :meth:`itertests`), empty when
+                 there are no variants
+        :rtype: tuple
+        """
+        if self._variants is None:
+            plugins_variants = self._variant_plugins.map_method("__iter__")
+            self._variants = tuple(variant
+                                   for plugin_variants in plugins_variants
+                                   for variant in plugin_variants)
+        return self._variants
 
     def itertests(self):
         """
@@ -336,11 +359,7 @@ class Varianter:
         :yield variant
         """
         if self._no_variants:  # Copy template and modify it's params
-            plugins_variants = self._variant_plugins.map_method("__iter__")
-            iter_variants = (variant
-                             for plugin_variants in plugins_variants
-                             for variant in plugin_variants)
-            for variant in iter(iter_variants):
+            for variant in self.get_variants():
                 yield variant
         else:   # No variants, use template
             yield {"variant": self._default_params.get_leaves(),
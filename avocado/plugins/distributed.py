@@ -0,0 +1,127 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Distributed execution of tests by worker agents
+"""
+
+import argparse
+
+from avocado.core import distributed
+from avocado.core import output
+from avocado.core.dispatcher import JobPrePostDispatcher
+from avocado.core.dispatcher import ResultDispatcher
+from avocado.core.plugin_interfaces import CLI, CLICmd
+
+
+def _address(string):
+    try:
+        distributed.parse_address(string)
+    except ValueError as details:
+        raise argparse.ArgumentTypeError(str(details))
+    return string
+
+
+class DistributedCLI(CLI):
+
+    """
+    Distributed execution of tests by worker agents
+    """
+
+    name = 'distributed'
+    description = "Distributed execution options for 'run' command"
+
+    def configure(self, parser):
+        run_subcommand_parser = parser.subcommands.choices.get('run', None)
+        if run_subcommand_parser is None:
+            return
+
+        msg = 'distributed execution'
+        distributed_parser = run_subcommand_parser.add_argument_group(msg)
+        distributed_parser.add_argument(
+            '--distributed', type=_address, default=None, metavar='ADDRESS',
+            help='Listen on ADDRESS ("unix:PATH" or "tcp:HOST:PORT") and '
+            'hand out the tests to the "avocado worker" processes connected '
+            'to it, instead of executing them locally.')
+        distributed_parser.add_argument(
+            '--distributed-authkey', default=None, metavar='KEY',
+            help='Key the workers have to use to connect. Defaults to the '
+            'runner.distributed.authkey setting, a random key is generated '
+            '(and displayed) when it\'s not set.')
+
+    def run(self, args):
+        if getattr(args, 'distributed', None) is not None:
+            args.test_runner = distributed.DistributedTestRunner
+
+
+class Worker(CLICmd):
+
+    """
+    Implements the avocado 'worker' subcommand
+    """
+
+    name = 'worker'
+    description = ('Executes the tests handed out by a job executed with '
+                   '"--distributed"')
+
+    def configure(self, parser):
+        """
+        Add the subparser for the worker action.
+
+        :param parser: Main test runner parser.
+        """
+        parser = super(Worker, self).configure(parser)
+
+        parser.add_argument('coordinator', type=_address, metavar='ADDRESS',
+                            help='Address the job listens on ("unix:PATH" or '
+                            '"tcp:HOST:PORT")')
+
+        parser.add_argument('--authkey', dest='distributed_authkey',
+                            default=None, metavar='KEY',
+                            help='Key used to connect to the job. Defaults '
+                            'to the runner.distributed.authkey setting.')
+
+        parser.add_argument('--connect-timeout', type=int, default=60,
+                            metavar='SECONDS',
+                            help='Time to wait for the job to start '
+                            'listening. Defaults to %(default)s seconds.')
+
+        parser.add_argument('--parallel', type=int, default=None,
+                            metavar='N',
+                            help='Number of tests to be executed at the same '
+                            'time by this worker. Defaults to the '
+                            'runner.parallel setting.')
+
+        parser.add_argument('--job-results-dir', action='store',
+                            dest='base_logdir', default=None,
+                            metavar='DIRECTORY',
+                            help='Forces to use of an alternate job results '
+                            'directory (for the worker job).')
+
+    def run(self, args):
+        args.test_runner = distributed.WorkerTestRunner
+        with distributed.WorkerJob(args) as job_instance:
+            pre_post_dispatcher = JobPrePostDispatcher()
+            try:
+                output.log_plugin_failures(pre_post_dispatcher.load_failures)
+                pre_post_dispatcher.map_method('pre', job_instance)
+                job_run = job_instance.run()
+            finally:
+                pre_post_dispatcher.map_method('post', job_instance)
+
+            result_dispatcher = ResultDispatcher()
+            if result_dispatcher.extensions:
+                result_dispatcher.map_method('render',
+                                             job_instance.result,
+                                             job_instance)
+        return job_run
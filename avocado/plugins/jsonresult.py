@@ -48,6 +48,7 @@ class JSONResult(Result):
                           'whiteboard': test.get('whiteboard', UNKNOWN),
                           'logdir': test.get('logdir', UNKNOWN),
                           'logfile': test.get('logfile', UNKNOWN),
+                          'resources': test.get('resources'),
                           'fail_reason': fail_reason})
         content = {'job_id': result.job_unique_id,
                    'debuglog': result.logfile,
@@ -59,6 +60,9 @@ class JSONResult(Result):
                    'skip': result.skipped,
                    'cancel': result.cancelled,
                    'time': result.tests_total_time}
+        if result.shard is not None:
+            content['shard'] = {'index': result.shard[0],
+                                'total': result.shard[1]}
         return json.dumps(content,
                           sort_keys=True,
                           indent=4,
@@ -69,7 +73,8 @@ class JSONResult(Result):
                 hasattr(job.args, 'json_output')):
             return
 
-        if not result.tests_total:
+        # Shards without tests are recorded, so their results can be merged
+        if not result.tests_total and result.shard is None:
             return
 
         content = self._render(result)
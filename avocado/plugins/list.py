@@ -12,6 +12,7 @@
 # Copyright: Red Hat Inc. 2013-2014
 # Author: Lucas Meneghel Rodrigues <lmr@redhat.com>
 
+import json
 import sys
 
 from avocado.core import exit_codes, output
@@ -40,56 +41,85 @@ class TestLister:
     def _extra_listing(self):
         loader.loader.get_extra_listing()
 
-    def _get_test_suite(self, paths):
+    def _get_which_tests(self):
         if self.args.verbose:
-            which_tests = loader.DiscoverMode.ALL
-        else:
-            which_tests = loader.DiscoverMode.AVAILABLE
+            return loader.DiscoverMode.ALL
+        return loader.DiscoverMode.AVAILABLE
+
+    def _get_test_suite(self, paths):
         try:
             return loader.loader.discover(paths,
-                                          which_tests=which_tests)
+                                          which_tests=self._get_which_tests())
         except loader.LoaderUnhandledReferenceError as details:
             LOG_UI.error(str(details))
             sys.exit(exit_codes.AVOCADO_FAIL)
 
-    def _get_test_matrix(self, test_suite):
-        test_matrix = []
+    def _iter_test_suite(self, paths):
+        """
+        Yields the tests as soon as they are found, filtered by tags
+        """
+        tag_filter = None
+        if getattr(self.args, 'filter_by_tags', False):
+            tag_filter = loader.TagFilter(
+                self.args.filter_by_tags,
+                self.args.filter_by_tags_include_empty,
+                self.args.filter_by_tags_include_empty_key)
+        try:
+            for test_factory in loader.loader.iter_discover(
+                    paths, which_tests=self._get_which_tests()):
+                if (tag_filter is None or
+                        tag_filter.matches(test_factory[1].get('tags'))):
+                    yield test_factory
+        except loader.LoaderUnhandledReferenceError as details:
+            LOG_UI.error(str(details))
+            sys.exit(exit_codes.AVOCADO_FAIL)
 
+    def _get_test_row(self, cls, params, stats, tag_stats):
+        """
+        Returns the type label (not decorated) and the row of a test in
+        the listing, updating the statistics
+        """
         type_label_mapping = loader.loader.get_type_label_mapping()
         decorator_mapping = loader.loader.get_decorator_mapping()
+        if isinstance(cls, str):
+            cls = test.Test
+        type_label = type_label_mapping[cls]
+        decorator = decorator_mapping[cls]
+        stats[type_label.lower()] = stats.get(type_label.lower(), 0) + 1
 
+        if self.args.verbose:
+            if 'tags' in params:
+                tags = params['tags']
+            else:
+                tags = {}
+            tags_repr = []
+            for tag, vals in tags.items():
+                if tag not in tag_stats:
+                    tag_stats[tag] = 1
+                else:
+                    tag_stats[tag] += 1
+                if vals:
+                    tags_repr.append("%s(%s)" % (tag, ",".join(vals)))
+                else:
+                    tags_repr.append(tag)
+            tags_repr = ",".join(tags_repr)
+            return type_label, (decorator(type_label), params['name'],
+                                tags_repr)
+        return type_label, (decorator(type_label), params['name'])
+
+    def _init_stats(self):
         stats = {}
-        tag_stats = {}
-        for value in type_label_mapping.values():
+        for value in loader.loader.get_type_label_mapping().values():
             stats[value.lower()] = 0
+        return stats
 
+    def _get_test_matrix(self, test_suite):
+        test_matrix = []
+        stats = self._init_stats()
+        tag_stats = {}
         for cls, params in test_suite:
-            if isinstance(cls, str):
-                cls = test.Test
-            type_label = type_label_mapping[cls]
-            decorator = decorator_mapping[cls]
-            stats[type_label.lower()] += 1
-            type_label = decorator(type_label)
-
-            if self.args.verbose:
-                if 'tags' in params:
-                    tags = params['tags']
-                else:
-                    tags = {}
-                tags_repr = []
-                for tag, vals in tags.items():
-                    if tag not in tag_stats:
-                        tag_stats[tag] = 1
-                    else:
-                        tag_stats[tag] += 1
-                    if vals:
-                        tags_repr.append("%s(%s)" % (tag, ",".join(vals)))
-                    else:
-                        tags_repr.append(tag)
-                tags_repr = ",".join(tags_repr)
-                test_matrix.append((type_label, params['name'], tags_repr))
-            else:
-                test_matrix.append((type_label, params['name']))
+            _, row = self._get_test_row(cls, params, stats, tag_stats)
+            test_matrix.append(row)
 
         return test_matrix, stats, tag_stats
 
@@ -104,6 +134,9 @@ class TestLister:
                                                 strip=True):
             LOG_UI.debug(line)
 
+        self._display_summary(stats, tag_stats)
+
+    def _display_summary(self, stats, tag_stats):
         if self.args.verbose:
             LOG_UI.info("")
             LOG_UI.info("TEST TYPES SUMMARY")
@@ -118,17 +151,68 @@ class TestLister:
                 for key in sorted(tag_stats):
                     LOG_UI.info("%s: %s", key, tag_stats[key])
 
+    def _stream(self):
+        """
+        Displays the tests as soon as they are found, only the type column
+        is aligned (to the longest type label known upfront)
+        """
+        stats = {}
+        tag_stats = {}
+        width = 0
+        header_displayed = False
+        for test_factory in self._iter_test_suite(self.args.reference):
+            if not header_displayed:
+                header_displayed = True
+                stats = self._init_stats()
+                width = max([len(label) for label in
+                             loader.loader.get_type_label_mapping().values()])
+                if self.args.verbose:
+                    LOG_UI.debug("%s%s %s %s",
+                                 output.TERM_SUPPORT.header_str('Type'),
+                                 " " * (width - len('Type')),
+                                 output.TERM_SUPPORT.header_str('Test'),
+                                 output.TERM_SUPPORT.header_str('Tag(s)'))
+            type_label, row = self._get_test_row(test_factory[0],
+                                                 test_factory[1], stats,
+                                                 tag_stats)
+            padding = " " * (width - len(type_label))
+            LOG_UI.debug(("%s%s " % (row[0], padding) +
+                          " ".join(row[1:])).rstrip())
+        if not header_displayed:
+            stats = self._init_stats()
+        self._display_summary(stats, tag_stats)
+
+    def _json_lines(self):
+        """
+        Displays a JSON object per test as soon as it is found
+        """
+        for cls, params in self._iter_test_suite(self.args.reference):
+            if isinstance(cls, str):
+                cls = test.Test
+            tags = params.get('tags') or {}
+            LOG_UI.debug(json.dumps(
+                {'type': loader.loader.get_type_label_mapping()[cls],
+                 'name': str(params['name']),
+                 'tags': {tag: None if vals is None else sorted(vals)
+                          for tag, vals in tags.items()}},
+                sort_keys=True))
+
     def _list(self):
         self._extra_listing()
-        test_suite = self._get_test_suite(self.args.reference)
-        if getattr(self.args, 'filter_by_tags', False):
-            test_suite = loader.filter_test_tags(
-                test_suite,
-                self.args.filter_by_tags,
-                self.args.filter_by_tags_include_empty,
-                self.args.filter_by_tags_include_empty_key)
-        test_matrix, stats, tag_stats = self._get_test_matrix(test_suite)
-        self._display(test_matrix, stats, tag_stats)
+        if getattr(self.args, 'json_lines', False):
+            self._json_lines()
+        elif getattr(self.args, 'stream', False):
+            self._stream()
+        else:
+            test_suite = self._get_test_suite(self.args.reference)
+            if getattr(self.args, 'filter_by_tags', False):
+                test_suite = loader.filter_test_tags(
+                    test_suite,
+                    self.args.filter_by_tags,
+                    self.args.filter_by_tags_include_empty,
+                    self.args.filter_by_tags_include_empty_key)
+            test_matrix, stats, tag_stats = self._get_test_matrix(test_suite)
+            self._display(test_matrix, stats, tag_stats)
 
     def list(self):
         try:
@@ -171,6 +255,15 @@ class List(CLICmd):
                             choices=('on', 'off'), default='on',
                             help='Turn the paginator on/off. '
                             'Current: %(default)s')
+        parser.add_argument('--stream', action='store_true', default=False,
+                            help='Show the tests as soon as they are found, '
+                            'without aligning the test names. Current: '
+                            '%(default)s')
+        parser.add_argument('--json-lines', action='store_true',
+                            default=False,
+                            help='Show the tests as soon as they are found, '
+                            'as JSON objects (type, name and tags), one per '
+                            'line. Current: %(default)s')
         loader.add_loader_options(parser)
 
         filtering = parser.add_argument_group('filtering parameters')
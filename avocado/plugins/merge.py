@@ -0,0 +1,131 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Merge of the results of jobs executing shards of a test suite
+"""
+
+import collections
+import json
+import os
+import sys
+
+from avocado.core import exit_codes
+from avocado.core import jobdata
+from avocado.core import shard
+from avocado.core.output import LOG_UI
+from avocado.core.plugin_interfaces import CLICmd
+from avocado.core.settings import settings
+
+
+class Merge(CLICmd):
+
+    """
+    Implements the avocado 'merge' subcommand
+    """
+
+    name = 'merge'
+    description = ('Combines the results of jobs executed with "--shard" '
+                   'into a single job view.')
+
+    def configure(self, parser):
+        """
+        Add the subparser for the merge action.
+
+        :param parser: Main test runner parser.
+        """
+        parser = super(Merge, self).configure(parser)
+
+        parser.add_argument("jobids", default=[], nargs='+',
+                            metavar="<JOB>",
+                            help='A job reference, identified by a (partial) '
+                            'unique ID (SHA1), test results directory or '
+                            'results.json file.')
+
+        parser.add_argument('--json', type=str, metavar='FILE',
+                            dest='merge_json_output',
+                            help='Write the merged results (in the '
+                            'results.json format) to FILE. Use \'-\' to '
+                            'redirect to the standard output.')
+
+    @staticmethod
+    def _get_results(job_id):
+        if os.path.isfile(job_id):
+            results_json = job_id
+        else:
+            if os.path.isdir(job_id):
+                resultsdir = os.path.expanduser(job_id)
+            else:
+                logdir = settings.get_value(section='datadir.paths',
+                                            key='logs_dir', key_type='path',
+                                            default=None)
+                try:
+                    resultsdir = jobdata.get_resultsdir(logdir, job_id)
+                except ValueError as exception:
+                    LOG_UI.error(exception)
+                    sys.exit(exit_codes.AVOCADO_FAIL)
+                if resultsdir is None:
+                    LOG_UI.error("Can't find job results directory for '%s' "
+                                 "in '%s'", job_id, logdir)
+                    sys.exit(exit_codes.AVOCADO_FAIL)
+            results_json = os.path.join(resultsdir, 'results.json')
+        try:
+            with open(results_json, 'r') as json_file:
+                return json.load(json_file)
+        except (IOError, OSError, ValueError) as details:
+            LOG_UI.error("Unable to read the results of job '%s': %s",
+                         job_id, details)
+            sys.exit(exit_codes.AVOCADO_FAIL)
+
+    def run(self, args):
+        results = [self._get_results(job_id) for job_id in args.jobids]
+        try:
+            merged = shard.merge_results(results)
+        except ValueError as details:
+            LOG_UI.error(details)
+            return exit_codes.AVOCADO_FAIL
+
+        json_output = getattr(args, 'merge_json_output', None)
+        if json_output != '-':
+            total = len(merged['shards']) + len(merged['missing'])
+            for entry in merged['shards']:
+                LOG_UI.info("SHARD %s/%s  : %s", entry['index'], total,
+                            entry['job_id'])
+            for test in merged['tests']:
+                LOG_UI.debug(" (%s) %s: %s", test['shard'], test['id'],
+                             test['status'])
+            statuses = collections.Counter(test['status']
+                                           for test in merged['tests'])
+            LOG_UI.info("RESULTS    : PASS %d | ERROR %d | FAIL %d | SKIP %d "
+                        "| WARN %d | INTERRUPT %s | CANCEL %s",
+                        statuses['PASS'], statuses['ERROR'],
+                        statuses['FAIL'], statuses['SKIP'], statuses['WARN'],
+                        statuses['INTERRUPTED'], statuses['CANCEL'])
+            LOG_UI.info("TESTS TIME : %.2f s", merged['time'])
+        if json_output is not None:
+            content = json.dumps(merged, sort_keys=True, indent=4,
+                                 separators=(',', ': '))
+            if json_output == '-':
+                LOG_UI.debug(content)
+            else:
+                with open(json_output, 'w') as json_file:
+                    json_file.write(content)
+
+        if merged['missing']:
+            LOG_UI.error("Results of shard(s) %s are missing",
+                         ", ".join(str(index)
+                                   for index in merged['missing']))
+            return exit_codes.AVOCADO_FAIL
+        if merged['failures'] or merged['errors']:
+            return exit_codes.AVOCADO_TESTS_FAIL
+        return exit_codes.AVOCADO_ALL_OK
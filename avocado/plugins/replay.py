@@ -210,7 +210,10 @@ class Replay(CLI):
                      'external_runner_chdir',
                      'failfast',
                      'ignore_missing_references',
-                     'execution_order']
+                     'execution_order',
+                     'shard',
+                     'shard_mode',
+                     'shard_history']
         if replay_args is None:
             LOG_UI.warn('Source job args data not found. These options will '
                         'not be loaded in this replay job: %s',
@@ -270,6 +273,13 @@ class Replay(CLI):
                                                  args.replay_teststatus)
             setattr(args, 'replay_map', replay_map)
 
+        # Execute the tests in the same order as the source job
+        recorded_order = jobdata.retrieve_execution_order(resultsdir)
+        if (recorded_order is not None and
+                recorded_order.get('execution_order') ==
+                getattr(args, 'execution_order', None)):
+            setattr(args, 'replay_execution_order', recorded_order['order'])
+
         # Use the original directory to resolve test references properly
         pwd = jobdata.retrieve_pwd(resultsdir)
         if pwd is not None:
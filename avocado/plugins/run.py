@@ -19,10 +19,13 @@ Base Test Runner Plugins.
 import argparse
 import sys
 
+from avocado.core import asyncrunner
 from avocado.core import exit_codes
 from avocado.core import job
 from avocado.core import loader
 from avocado.core import output
+from avocado.core import shard
+from avocado.core import timebox
 from avocado.core.output import LOG_UI
 from avocado.core.plugin_interfaces import CLICmd
 from avocado.core.dispatcher import ResultDispatcher
@@ -51,6 +54,13 @@ class Run(CLICmd):
             raise argparse.ArgumentTypeError(msg)
         return param_name_value
 
+    @staticmethod
+    def _shard(string):
+        try:
+            return shard.parse(string)
+        except ValueError as details:
+            raise argparse.ArgumentTypeError(str(details))
+
     def configure(self, parser):
         """
         Add the subparser for the run action.
@@ -106,6 +116,18 @@ class Run(CLICmd):
                             'You can also use suffixes, like: '
                             ' s (seconds), m (minutes), h (hours). ')
 
+        parser.add_argument('--job-timeout-plan',
+                            choices=timebox.PLAN_MODES + ('off',),
+                            default=None,
+                            help="Choose upfront the tests executed within "
+                            "the job timeout, based on the durations of the "
+                            "tests executed by previous jobs, and skip the "
+                            "others. \"priority\" chooses the tests with "
+                            "the highest \"priority\" tag first, \"value\" "
+                            "the ones with the highest priority per second. "
+                            "Defaults to the runner.job_timeout_plan "
+                            "setting (off).")
+
         parser.add_argument('--failfast', choices=('on', 'off'),
                             help='Enable or disable the job interruption on '
                             'first failed test.')
@@ -130,9 +152,99 @@ class Run(CLICmd):
 
         parser.add_argument("--execution-order",
                             choices=("tests-per-variant",
-                                     "variants-per-test"),
+                                     "variants-per-test",
+                                     "longest-first",
+                                     "failed-first"),
                             help="Defines the order of iterating through test "
-                            "suite and test variants")
+                            "suite and test variants. \"longest-first\" and "
+                            "\"failed-first\" reorder the tests (and "
+                            "variants) based on the results of previous "
+                            "jobs, starting by the tests that took the "
+                            "longest or that failed in their last execution")
+
+        parser.add_argument("--parallel", type=int, default=None,
+                            metavar="N",
+                            help="Number of tests to be executed at the same "
+                            "time. Results are still reported in the test "
+                            "suite order. Defaults to the runner.parallel "
+                            "setting (1, one test at a time).")
+
+        parser.add_argument("--engine", choices=asyncrunner.ENGINES,
+                            default=None,
+                            help="Engine executing the tests. \"asyncio\" "
+                            "executes the commands of tests which only wrap "
+                            "an executable (SIMPLE, external runner, GLib "
+                            "and Golang tests) from a single event loop "
+                            "instead of a test process each, the other "
+                            "tests are executed as usual. Defaults to the "
+                            "runner.engine setting (process).")
+
+        parser.add_argument("--async-parallel", type=int, default=None,
+                            metavar="N",
+                            help="Number of test commands executed at the "
+                            "same time by the asyncio engine. Defaults to "
+                            "the runner.async_parallel setting (100).")
+
+        parser.add_argument("--result-cache", choices=("on", "off"),
+                            help="Skip tests whose inputs (test file, its "
+                            "data dir, params, configuration and avocado "
+                            "version) did not change since they passed. "
+                            "Passing results are recorded in the avocado "
+                            "data dir. Defaults to the runner.result_cache "
+                            "setting (off).")
+
+        parser.add_argument("--cgroup", choices=("on", "off"),
+                            help="Isolate each test process (and all the "
+                            "processes it starts) in its own cgroup (v2), "
+                            "which limits its resources and is killed as a "
+                            "whole (not supported by the asyncio engine). "
+                            "Defaults to the runner.cgroup setting (off).")
+
+        parser.add_argument("--prefork", choices=("on", "off"),
+                            help="Fork the test processes ahead of time, so "
+                            "they are ready when the tests are about to be "
+                            "executed. Defaults to the runner.prefork "
+                            "setting (off).")
+
+        parser.add_argument("--preload-module", action="append",
+                            dest="preload_modules", metavar="MODULE",
+                            help="Python module to be imported by the runner "
+                            "before the test processes are forked, so it's "
+                            "not imported again by each test. May be given "
+                            "any number of times. Defaults to the "
+                            "runner.preload setting.")
+
+        parser.add_argument("--unittest-batch", type=int, default=None,
+                            metavar="N",
+                            help="Execute up to N consecutive Python "
+                            "unittests of the same module in a single "
+                            "interpreter before their tests are started, "
+                            "each test then reports the outcome and output "
+                            "of its method. Defaults to the "
+                            "runner.unittest_batch setting (0, disabled).")
+
+        parser.add_argument("--shard", type=self._shard, default=None,
+                            metavar="INDEX/TOTAL",
+                            help="Split the tests (and variants) into TOTAL "
+                            "shards and execute only the INDEX-th one "
+                            "(starting at 1), so the test suite can be "
+                            "spread across independent jobs. Use \"avocado "
+                            "merge\" to combine the results of the shards.")
+
+        parser.add_argument("--shard-mode", choices=shard.SHARD_MODES,
+                            default=None,
+                            help="Way of splitting the tests into shards. "
+                            "\"hash\" (default) assigns tests to shards by "
+                            "the hash of their names, \"duration\" balances "
+                            "the shards by the durations of tests given by "
+                            "--shard-history.")
+
+        parser.add_argument("--shard-history", default=None, metavar="FILE",
+                            help="Snapshot of the test history used by all "
+                            "the shards in the \"duration\" shard mode, "
+                            "such as a copy of the test_history.json file "
+                            "of the avocado data dir taken before the shards "
+                            "are executed.")
 
         parser.output = parser.add_argument_group('output and result format')
 
@@ -20,6 +20,7 @@ import os
 import string
 from xml.dom.minidom import Document
 
+from avocado.core import resources
 from avocado.core.parser import FileOrStdoutAction
 from avocado.core.output import LOG_UI
 from avocado.core.plugin_interfaces import CLI, Result
@@ -51,11 +52,21 @@ class XUnitResult(Result):
     def _format_time(time):
         return "{:.3f}".format(float(time))
 
-    def _create_testcase_element(self, document, state):
+    def _create_testcase_element(self, document, state, resources_on=False):
         testcase = document.createElement('testcase')
         testcase.setAttribute('classname', self._get_attr(state, 'class_name'))
         testcase.setAttribute('name', self._get_attr(state, 'name'))
         testcase.setAttribute('time', self._format_time(self._get_attr(state, 'time_elapsed')))
+        # Not allowed by the Jenkins JUnit schema, so only on request
+        usage = state.get('resources')
+        if resources_on and usage:
+            properties = document.createElement('properties')
+            for key in resources.KEYS:
+                prop = document.createElement('property')
+                prop.setAttribute('name', key)
+                prop.setAttribute('value', self._escape_attr(usage[key]))
+                properties.appendChild(prop)
+            testcase.appendChild(properties)
         return testcase
 
     def _create_failure_or_error(self, document, test, element_type,
@@ -91,7 +102,8 @@ class XUnitResult(Result):
         system_out.appendChild(system_out_cdata)
         return element, system_out
 
-    def _render(self, result, max_test_log_size, job_name):
+    def _render(self, result, max_test_log_size, job_name,
+                resources_on=False):
         document = Document()
         testsuite = document.createElement('testsuite')
         if job_name:
@@ -106,7 +118,8 @@ class XUnitResult(Result):
         testsuite.setAttribute('timestamp', self._escape_attr(datetime.datetime.now().isoformat()))
         document.appendChild(testsuite)
         for test in result.tests:
-            testcase = self._create_testcase_element(document, test)
+            testcase = self._create_testcase_element(document, test,
+                                                     resources_on)
             status = test.get('status', 'ERROR')
             if status in ('PASS', 'WARN'):
                 pass
@@ -141,7 +154,9 @@ class XUnitResult(Result):
 
         max_test_log_size = getattr(job.args, 'xunit_max_test_log_chars', None)
         job_name = getattr(job.args, 'xunit_job_name', None)
-        content = self._render(result, max_test_log_size, job_name)
+        resources_on = getattr(job.args, 'xunit_resources', 'off') == 'on'
+        content = self._render(result, max_test_log_size, job_name,
+                               resources_on)
         if getattr(job.args, 'xunit_job_result', 'off') == 'on':
             xunit_path = os.path.join(job.logdir, 'results.xml')
             with open(xunit_path, 'wb') as xunit_file:
@@ -196,5 +211,12 @@ class XUnitCLI(CLI):
             "attached job log to given number of characters (k/m/g suffix "
             "allowed)")
 
+        run_subcommand_parser.output.add_argument(
+            '--xunit-resources', dest='xunit_resources',
+            choices=('on', 'off'), default='off',
+            help=('Records the resources used by each test as the '
+                  'properties of its test case, which the Jenkins JUnit '
+                  'schema does not allow. Defaults to off.'))
+
     def run(self, args):
         pass
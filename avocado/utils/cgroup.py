@@ -0,0 +1,261 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See LICENSE for more details.
+#
+# Copyright: Red Hat Inc. 2019
+
+"""
+Control groups v2 (unified hierarchy) APIs
+"""
+
+import errno
+import os
+import signal
+import time
+
+
+#: Controllers limiting the resources of processes
+CONTROLLERS = ('cpu', 'memory', 'pids')
+
+
+class CgroupError(Exception):
+    pass
+
+
+def get_mountpoint():
+    """
+    Mount point of the cgroup v2 hierarchy
+
+    :return: the path or None when it's not mounted
+    """
+    try:
+        with open('/proc/self/mounts') as mounts:
+            for line in mounts:
+                fields = line.split()
+                if len(fields) > 2 and fields[2] == 'cgroup2':
+                    return fields[1]
+    except IOError:
+        pass
+    return None
+
+
+def get_cgroup_path(pid='self'):
+    """
+    Path of the cgroup v2 of a process (relative to the mount point)
+
+    :param pid: the process ID (or "self")
+    :return: the path or None when the process is not in the v2 hierarchy
+    """
+    try:
+        with open('/proc/%s/cgroup' % pid) as cgroups:
+            for line in cgroups:
+                if line.startswith('0::'):
+                    return line[3:].strip()
+    except IOError:
+        pass
+    return None
+
+
+class Cgroup:
+
+    """
+    A cgroup of the v2 (unified) hierarchy
+    """
+
+    def __init__(self, path):
+        """
+        :param path: absolute path of the cgroup directory
+        """
+        self.path = path
+
+    def __repr__(self):
+        return "Cgroup(%r)" % self.path
+
+    def _read(self, name):
+        with open(os.path.join(self.path, name)) as cgroup_file:
+            return cgroup_file.read()
+
+    def _write(self, name, value):
+        with open(os.path.join(self.path, name), 'w') as cgroup_file:
+            cgroup_file.write(str(value))
+
+    def exists(self):
+        return os.path.isdir(self.path)
+
+    def child(self, name):
+        """
+        A child cgroup of this one (it might not exist yet)
+        """
+        return Cgroup(os.path.join(self.path, name))
+
+    def children(self):
+        """
+        The existing child cgroups
+        """
+        return [self.child(name) for name in sorted(os.listdir(self.path))
+                if os.path.isdir(os.path.join(self.path, name))]
+
+    def create(self):
+        """
+        Creates the cgroup (when it doesn't exist yet)
+
+        :raise CgroupError: when it can't be created
+        """
+        try:
+            os.mkdir(self.path)
+        except OSError as details:
+            if details.errno != errno.EEXIST:
+                raise CgroupError("Unable to create cgroup %s: %s"
+                                  % (self.path, details))
+
+    def get_controllers(self):
+        """
+        Controllers available in this cgroup
+        """
+        return self._read('cgroup.controllers').split()
+
+    def enable_controllers(self, controllers=CONTROLLERS):
+        """
+        Enables (the available) controllers for the children of this cgroup
+
+        A cgroup with processes can't enable controllers for its children
+        (unless it's the root one), so this is done on best effort basis.
+
+        :param controllers: names of the controllers to be enabled
+        :return: the controllers enabled for the children
+        :rtype: list
+        """
+        available = self.get_controllers()
+        for controller in controllers:
+            if controller not in available:
+                continue
+            try:
+                self._write('cgroup.subtree_control', '+%s' % controller)
+            except (IOError, OSError):
+                pass
+        return self._read('cgroup.subtree_control').split()
+
+    def set_limit(self, name, value):
+        """
+        Sets a limit (such as "memory.max") of the cgroup
+
+        :raise CgroupError: when the limit can't be set
+        """
+        try:
+            self._write(name, value)
+        except (IOError, OSError) as details:
+            raise CgroupError("Unable to set %s=%s of cgroup %s: %s"
+                              % (name, value, self.path, details))
+
+    def add_process(self, pid=0):
+        """
+        Moves a process (by default the current one) into the cgroup
+
+        :raise CgroupError: when the process can't be moved
+        """
+        try:
+            self._write('cgroup.procs', pid)
+        except (IOError, OSError) as details:
+            raise CgroupError("Unable to move process %s into cgroup %s: %s"
+                              % (pid or os.getpid(), self.path, details))
+
+    def get_processes(self):
+        """
+        PIDs of the processes in the cgroup (not in its children)
+        """
+        try:
+            return [int(pid) for pid in self._read('cgroup.procs').split()]
+        except (IOError, OSError):
+            return []
+
+    def _get_events(self):
+        try:
+            events = self._read('cgroup.events').split()
+        except (IOError, OSError):
+            return {}
+        return dict(zip(events[::2], events[1::2]))
+
+    def is_populated(self):
+        """
+        Whether there are processes in the cgroup (or in its children)
+        """
+        return self._get_events().get('populated') == '1'
+
+    def _freeze(self, frozen, timeout=1):
+        self._write('cgroup.freeze', int(frozen))
+        end = time.time() + timeout
+        while time.time() < end:
+            events = self._get_events()
+            if events.get('frozen', '0') == str(int(frozen)):
+                return
+            if not events.get('populated') == '1':
+                return
+            time.sleep(0.01)
+
+    def kill(self, sig=signal.SIGKILL):
+        """
+        Sends a signal to all the processes of the cgroup (and children)
+
+        SIGKILL uses "cgroup.kill" (Linux 5.14), which kills all of them
+        atomically.  Other signals are sent while the cgroup is frozen, so
+        no process can fork in the meantime.
+        """
+        if sig == signal.SIGKILL:
+            try:
+                self._write('cgroup.kill', 1)
+                return
+            except (IOError, OSError):
+                pass
+        frozen = False
+        try:
+            self._freeze(True)
+            frozen = True
+        except (IOError, OSError):
+            pass
+        try:
+            for cgroup in [self] + self._descendants():
+                for pid in cgroup.get_processes():
+                    try:
+                        os.kill(pid, sig)
+                    except OSError:
+                        pass
+        finally:
+            if frozen:
+                self._freeze(False)
+
+    def _descendants(self):
+        descendants = []
+        for child in self.children():
+            descendants.append(child)
+            descendants.extend(child._descendants())
+        return descendants
+
+    def remove(self, timeout=10):
+        """
+        Kills the remaining processes and removes the cgroup (and children)
+
+        :param timeout: how long to wait for the processes to die
+        :raise CgroupError: when the cgroup can't be removed
+        """
+        if not self.exists():
+            return
+        end = time.time() + timeout
+        if self.is_populated():
+            self.kill(signal.SIGKILL)
+            while self.is_populated() and time.time() < end:
+                time.sleep(0.01)
+        for child in self.children():
+            child.remove(max(end - time.time(), 0))
+        try:
+            os.rmdir(self.path)
+        except OSError as details:
+            if details.errno != errno.ENOENT:
+                raise CgroupError("Unable to remove cgroup %s: %s"
+                                  % (self.path, details))
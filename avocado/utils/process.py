@@ -18,7 +18,6 @@ Functions dedicated to find and run external commands.
 
 import errno
 import fnmatch
-import glob
 import logging
 import os
 import re
@@ -71,6 +70,11 @@ UNDEFINED_BEHAVIOR_EXCEPTION = None
 #: setting defines the mode.
 OUTPUT_CHECK_RECORD_MODE = None
 
+#: Whether processes can be signaled through pidfds (Linux 5.3, Python 3.9),
+#: see :func:`kill_process_tree`
+PIDFD_SUPPORTED = (hasattr(os, 'pidfd_open') and
+                   hasattr(signal, 'pidfd_send_signal'))
+
 # variable=value bash assignment
 _RE_BASH_SET_VARIABLE = re.compile(r"[a-zA-Z]\w*=.*")
 
@@ -147,6 +151,24 @@ def safe_kill(pid, signal):  # pylint: disable=W0621
         return False
 
 
+def _read_proc_stat(pid, proc='/proc'):
+    """
+    Reads the fields of /proc/[pid]/stat following the process name
+
+    The name (between parentheses) might contain spaces and parentheses,
+    so the fields are split after its last closing parenthesis.
+
+    :return: list of fields, starting with the process state, or None
+             when the process does not exist (anymore)
+    """
+    try:
+        with open(os.path.join(proc, str(pid), 'stat'), 'rb') as proc_stat:
+            data = proc_stat.read()
+    except (IOError, OSError):
+        return None
+    return data[data.rfind(b')') + 2:].split()
+
+
 def get_parent_pid(pid):
     """
     Returns the parent PID for the given process
@@ -158,15 +180,94 @@ def get_parent_pid(pid):
     :returns: The parent PID
     :rtype: int
     """
-    with open('/proc/%d/stat' % pid, 'rb') as proc_stat:
-        parent_pid = proc_stat.read().split(b' ')[-49]
-        return int(parent_pid)
+    fields = _read_proc_stat(pid)
+    if fields is None:
+        raise IOError(errno.ENOENT, "No such process", pid)
+    return int(fields[1])
+
 
+class ProcessTable:
 
-def _get_pid_from_proc_pid_stat(proc_path):
-    match = re.match(r'\/proc\/([0-9]+)\/.*', proc_path)
-    if match is not None:
-        return int(match.group(1))
+    """
+    Snapshot of the processes of the system
+
+    All the processes are read from /proc in a single pass, so their
+    relationships can be queried any number of times without scanning
+    /proc again.  The snapshot is not updated, processes started or
+    finished after it was taken are not reflected.
+    """
+
+    def __init__(self, proc='/proc'):
+        """
+        :param proc: mount point of the proc filesystem
+        """
+        #: pid -> tuple(parent pid, state, start time)
+        self._processes = {}
+        #: pid -> list of children pids
+        self._children = {}
+        pids = sorted(int(name) for name in os.listdir(proc)
+                      if name.isdigit())
+        for pid in pids:
+            fields = _read_proc_stat(pid, proc)
+            if fields is None:  # Finished in the meantime
+                continue
+            parent_pid = int(fields[1])
+            self._processes[pid] = (parent_pid,
+                                    astring.to_text(fields[0]),
+                                    int(fields[19]))
+            self._children.setdefault(parent_pid, []).append(pid)
+
+    def __contains__(self, pid):
+        return pid in self._processes
+
+    def __iter__(self):
+        return iter(self._processes)
+
+    def __len__(self):
+        return len(self._processes)
+
+    def get_parent_pid(self, pid):
+        """
+        :return: the parent PID or None when the process does not exist
+        """
+        return self._processes.get(pid, (None, None, None))[0]
+
+    def get_state(self, pid):
+        """
+        :return: the state ("R", "S", "Z", ...) of the process or None
+                 when the process does not exist
+        """
+        return self._processes.get(pid, (None, None, None))[1]
+
+    def get_start_time(self, pid):
+        """
+        :return: the start time of the process (in clock ticks after the
+                 system boot) or None when the process does not exist.
+                 Together with the PID, it identifies the process.
+        """
+        return self._processes.get(pid, (None, None, None))[2]
+
+    def is_defunct(self, pid):
+        """
+        Whether the process is defunct (zombie)
+        """
+        return self.get_state(pid) == 'Z'
+
+    def get_children_pids(self, parent_pid, recursive=False):
+        """
+        Returns the children PIDs for the given process
+
+        :param parent_pid: The PID of parent process
+        :param recursive: Whether to include all the descendants (the
+                          children first, then grandchildren, ...)
+        :returns: The PIDs for the children processes
+        :rtype: list of int
+        """
+        children = list(self._children.get(parent_pid, []))
+        if recursive:
+            for child in children:
+                children.extend(self._children.get(child, []))
+        return children
 
 
 def get_children_pids(parent_pid, recursive=False):
@@ -180,37 +281,56 @@ def get_children_pids(parent_pid, recursive=False):
     :returns: The PIDs for the children processes
     :rtype: list of int
     """
-    proc_stats = glob.glob('/proc/[123456789]*/stat')
-    children = []
-    for proc_stat in proc_stats:
-        try:
-            with open(proc_stat, 'rb') as proc_stat_fp:
-                this_parent_pid = int(proc_stat_fp.read().split(b' ')[-49])
-        except IOError:
-            continue
+    return ProcessTable().get_children_pids(parent_pid, recursive)
+
 
-        if this_parent_pid == parent_pid:
-            children.append(_get_pid_from_proc_pid_stat(proc_stat))
+def _pidfd_open(pid, table=None):
+    """
+    Opens a pidfd (Linux 5.3, Python 3.9) referring to the process
 
-    if recursive:
-        for child in children:
-            children.extend(get_children_pids(child))
-    return children
+    :param table: snapshot where the process was found, to verify the
+                  pidfd refers to the same process (and not to a new one
+                  which reused its PID)
+    :return: the pidfd or None when it can't be used
+    """
+    if not PIDFD_SUPPORTED:
+        return None
+    try:
+        pidfd = os.pidfd_open(pid)
+    except OSError:
+        return None
+    if table is not None:
+        fields = _read_proc_stat(pid)
+        if fields is None or int(fields[19]) != table.get_start_time(pid):
+            os.close(pidfd)
+            return None
+    return pidfd
 
 
 def kill_process_tree(pid, sig=signal.SIGKILL, send_sigcont=True,
-                      timeout=0):
+                      timeout=0, table=None, pidfd=False):
     """
     Signal a process and all of its children.
 
     If the process does not exist -- return.
 
+    The processes are stopped (so they can't fork anymore) while the
+    tree is walked, then signaled from the leaves up.  /proc is scanned
+    once per level of processes forked before they were stopped, which
+    usually means twice, not once per process.
+
     :param pid: The pid of the process to signal.
     :param sig: The signal to send to the processes.
     :param send_sigcont: Send SIGCONT to allow killing stopped processes
     :param timeout: How long to wait for the pid(s) to die
                     (negative=infinity, 0=don't wait,
                     positive=number_of_seconds)
+    :param table: a recent snapshot of the processes, used to find the
+                  children instead of scanning /proc first
+    :type table: :class:`ProcessTable`
+    :param pidfd: signal the processes through pidfds, when supported, so
+                  a process which finished in the meantime and whose PID
+                  was reused is never signaled
     :return: list of all PIDs we sent signal to
     :rtype: list
     """
@@ -220,18 +340,68 @@ def kill_process_tree(pid, sig=signal.SIGKILL, send_sigcont=True,
                 return False
         return True
 
+    def _signal(pid, sig):
+        if pid not in pidfds:
+            return safe_kill(pid, sig)
+        try:
+            signal.pidfd_send_signal(pidfds[pid], sig)
+            return True
+        except OSError as details:
+            if details.errno == errno.EPERM:
+                return safe_kill(pid, sig)
+            return False
+
     if timeout > 0:
         start = time.time()
 
-    if not safe_kill(pid, signal.SIGSTOP):
-        return [pid]
-    killed_pids = [pid]
-    for child in get_children_pids(pid):
-        killed_pids.extend(kill_process_tree(int(child), sig, False))
-    safe_kill(pid, sig)
-    if send_sigcont:
-        for pid in killed_pids:
-            safe_kill(pid, signal.SIGCONT)
+    pidfds = {}
+    try:
+        if pidfd:
+            pidfds[pid] = _pidfd_open(pid)
+            if pidfds[pid] is None:
+                del pidfds[pid]
+        if not _signal(pid, signal.SIGSTOP):
+            return [pid]
+        killed_pids = [pid]
+        stopped = set(killed_pids)
+        seen = set(killed_pids)
+        # Children forked before their parent was stopped might be missing
+        # in the snapshot, look for them until no new process is found
+        stale = table is not None
+        while True:
+            if table is None:
+                table = ProcessTable()
+            found = len(killed_pids)
+            stack = [pid]
+            while stack:
+                child = stack.pop()
+                if child not in seen:
+                    seen.add(child)
+                    killed_pids.append(child)
+                    if pidfd:
+                        child_pidfd = _pidfd_open(child, table)
+                        if child_pidfd is not None:
+                            pidfds[child] = child_pidfd
+                    if not _signal(child, signal.SIGSTOP):
+                        continue
+                    stopped.add(child)
+                elif child not in stopped:
+                    continue
+                stack.extend(reversed(table.get_children_pids(child)))
+            table = None
+            if len(killed_pids) == found and not stale:
+                break
+            stale = False
+        for child in reversed(killed_pids):
+            if child in stopped:
+                _signal(child, sig)
+        if send_sigcont:
+            for child in killed_pids:
+                if child in stopped:
+                    _signal(child, signal.SIGCONT)
+    finally:
+        for child_pidfd in pidfds.values():
+            os.close(child_pidfd)
     if timeout == 0:
         return killed_pids
     elif timeout > 0:
@@ -268,19 +438,13 @@ def process_in_ptree_is_defunct(ppid):
 
     :param ppid: The parent PID of the process to verify.
     """
-    # TODO: This relies on the GNU version of ps (need to fix MacOS support)
-    defunct = False
-    try:
-        pids = get_children_pids(ppid)
-    except CmdError:  # Process doesn't exist
+    table = ProcessTable()
+    if ppid not in table:   # Process doesn't exist
         return True
-    for pid in pids:
-        cmd = "ps --no-headers -o cmd %d" % int(pid)
-        proc_name = system_output(cmd, ignore_status=True, verbose=False)
-        if '<defunct>' in proc_name:
-            defunct = True
-            break
-    return defunct
+    for pid in table.get_children_pids(ppid):
+        if table.is_defunct(pid):
+            return True
+    return False
 
 
 def binary_from_shell_cmd(cmd):
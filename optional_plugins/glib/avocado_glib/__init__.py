@@ -22,12 +22,31 @@ import re
 from avocado.utils import path
 from avocado.utils import process
 
+from avocado.core import data_dir
+from avocado.core import discovery_cache
 from avocado.core import loader
 from avocado.core import output
 from avocado.core import test
 from avocado.core.plugin_interfaces import CLI
 
 
+#: Name of the cache of the tests listed by the GLib test binaries (in the
+#: avocado data dir)
+CACHE_FILENAME = 'glib_discovery_cache.json'
+
+#: Minimum number of binaries listed by each process of the discovery pool
+#: (listing the tests executes the binaries, so it's worth it even for few)
+PARALLEL_DISCOVERY_MIN_FILES = 2
+
+
+def list_tests(reference):
+    """
+    Paths of the tests of a GLib test binary, listed by executing it
+    """
+    result = process.run('%s -l' % reference)
+    return result.stdout_text.splitlines()
+
+
 class GLibTest(test.SimpleTest):
 
     """
@@ -46,13 +65,19 @@ class GLibTest(test.SimpleTest):
         """
         return self._filename.split(':')[0]
 
+    def _get_command(self):
+        """
+        Create the GLib command.
+        """
+        test_name = self._filename.split(':')[1]
+        return '%s -p=%s' % (self.filename, test_name), None, None
+
     def test(self):
         """
         Create the GLib command and execute it.
         """
-        test_name = self._filename.split(':')[1]
-        cmd = '%s -p=%s' % (self.filename, test_name)
-        result = process.run(cmd, ignore_status=True)
+        cmd = self._get_command()[0]
+        result = self._run_cmd(cmd, ignore_status=True)
         if result.exit_status != 0:
             self.fail('GLib Test execution returned a '
                       'non-0 exit code (%s)' % result)
@@ -73,6 +98,40 @@ class GLibLoader(loader.TestLoader):
 
     def __init__(self, args, extra_params):
         super(GLibLoader, self).__init__(args, extra_params)
+        self._discovery_cache = None
+        if discovery_cache.is_enabled():
+            self._discovery_cache = discovery_cache.DiscoveryCache(
+                data_dir.get_datafile_path(CACHE_FILENAME))
+        # Tests (or exception) listed by each binary ahead of time
+        self._listings = {}
+
+    @staticmethod
+    def _is_binary(reference):
+        return (os.path.isfile(reference) and
+                path.PathInspector(reference).has_exec_permission())
+
+    def _list_binaries_tests(self, binaries):
+        """
+        Lists the tests of the binaries, executing them concurrently (and
+        only the ones which changed since they were cached)
+        """
+        try:
+            listings = loader.iter_file_discovery(
+                'glib', list_tests, binaries, self._discovery_cache,
+                PARALLEL_DISCOVERY_MIN_FILES)
+            self._listings.update(zip(binaries, listings))
+        finally:
+            if self._discovery_cache is not None:
+                self._discovery_cache.save()
+
+    def prefetch(self, references, which_tests=loader.DiscoverMode.DEFAULT):
+        binaries = []
+        for reference in references:
+            reference = reference.split(':', 1)[0]
+            if (reference not in self._listings and
+                    reference not in binaries and self._is_binary(reference)):
+                binaries.append(reference)
+        self._list_binaries_tests(binaries)
 
     def discover(self, reference, which_tests=loader.DiscoverMode.DEFAULT):
         avocado_suite = []
@@ -85,18 +144,17 @@ class GLibLoader(loader.TestLoader):
             reference, _subtests_filter = reference.split(':', 1)
             subtests_filter = re.compile(_subtests_filter)
 
-        if (os.path.isfile(reference) and
-                path.PathInspector(reference).has_exec_permission()):
-            try:
-                cmd = '%s -l' % (reference)
-                result = process.run(cmd)
-            except Exception as details:
+        if self._is_binary(reference):
+            if reference not in self._listings:
+                self._list_binaries_tests([reference])
+            test_items = self._listings[reference]
+            if isinstance(test_items, Exception):
                 if which_tests == loader.DiscoverMode.ALL:
                     return [(NotGLibTest,
-                             {"name": "%s: %s" % (reference, details)})]
+                             {"name": "%s: %s" % (reference, test_items)})]
                 return []
 
-            for test_item in result.stdout_text.splitlines():
+            for test_item in test_items:
                 test_name = "%s:%s" % (reference, test_item)
                 if subtests_filter and not subtests_filter.search(test_name):
                     continue
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest.mock
+
+from avocado.core import loader
+from avocado.utils import script
+
+import avocado_glib
+
+from selftests import temp_dir_prefix
+
+
+#: Fake GLib test binary, which records each of its executions
+GLIB_TEST = """#!/bin/sh
+echo "$@" >> %s
+if [ "$1" = "-l" ]; then
+    echo /foo/bar
+    echo /foo/baz
+fi
+"""
+
+BROKEN_GLIB_TEST = """#!/bin/sh
+echo "$@" >> %s
+exit 1
+"""
+
+
+class GLibLoader(unittest.TestCase):
+
+    def setUp(self):
+        prefix = temp_dir_prefix(__name__, self, 'setUp')
+        self.tmpdir = tempfile.mkdtemp(prefix=prefix)
+        self.executions = os.path.join(self.tmpdir, 'executions')
+        patcher = unittest.mock.patch(
+            'avocado_glib.data_dir.get_datafile_path',
+            lambda *args: os.path.join(self.tmpdir, *args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_binary(self, name, content=GLIB_TEST):
+        binary = script.Script(os.path.join(self.tmpdir, name),
+                               content % self.executions)
+        binary.save()
+        return binary.path
+
+    def _count_executions(self):
+        if not os.path.exists(self.executions):
+            return 0
+        with open(self.executions) as executions:
+            return len(executions.readlines())
+
+    def test_discover(self):
+        binary = self._get_binary('binary')
+        tests = avocado_glib.GLibLoader(None, {}).discover(binary)
+        self.assertEqual([(klass, params['name']) for klass, params in tests],
+                         [(avocado_glib.GLibTest, '%s:/foo/bar' % binary),
+                          (avocado_glib.GLibTest, '%s:/foo/baz' % binary)])
+        self.assertEqual(self._count_executions(), 1)
+        # The listing is cached
+        self.assertEqual(avocado_glib.GLibLoader(None, {}).discover(binary),
+                         tests)
+        self.assertEqual(self._count_executions(), 1)
+        # Until the binary changes
+        with open(binary, 'a') as binary_file:
+            binary_file.write('# changed\n')
+        self.assertEqual(avocado_glib.GLibLoader(None, {}).discover(binary),
+                         tests)
+        self.assertEqual(self._count_executions(), 2)
+
+    def test_prefetch(self):
+        first = self._get_binary('first')
+        second = self._get_binary('second')
+        glib_loader = avocado_glib.GLibLoader(None, {})
+        glib_loader.prefetch([first, second + ':baz', first,
+                              os.path.join(self.tmpdir, 'missing')])
+        self.assertEqual(self._count_executions(), 2)
+        tests = glib_loader.discover(second + ':baz')
+        self.assertEqual([params['name'] for _, params in tests],
+                         ['%s:/foo/baz' % second])
+        self.assertEqual(len(glib_loader.discover(first)), 2)
+        # The binaries were only listed by the prefetch
+        self.assertEqual(self._count_executions(), 2)
+
+    def test_discover_error(self):
+        binary = self._get_binary('binary', BROKEN_GLIB_TEST)
+        glib_loader = avocado_glib.GLibLoader(None, {})
+        self.assertEqual(glib_loader.discover(binary), [])
+        tests = glib_loader.discover(binary, loader.DiscoverMode.ALL)
+        self.assertEqual(len(tests), 1)
+        self.assertEqual(tests[0][0], avocado_glib.NotGLibTest)
+        self.assertTrue(tests[0][1]['name'].startswith('%s: ' % binary))
+        # Errors are not cached
+        avocado_glib.GLibLoader(None, {}).discover(binary)
+        self.assertEqual(self._count_executions(), 2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,13 +21,14 @@ import glob
 import os
 import re
 
+from avocado.core import data_dir
+from avocado.core import discovery_cache
 from avocado.core import exceptions
 from avocado.core import loader
 from avocado.core import output
 from avocado.core import test
 from avocado.core.plugin_interfaces import CLI
 from avocado.utils import path as utils_path
-from avocado.utils import process
 
 
 try:
@@ -35,6 +36,22 @@ try:
 except utils_path.CmdNotFoundError:
     _GO_BIN = None
 
+#: Name of the cache of the tests found in the Golang test files (in the
+#: avocado data dir)
+CACHE_FILENAME = 'golang_discovery_cache.json'
+
+
+def find_tests(test_path):
+    """
+    Names of the tests of a Golang test file
+    """
+    test_suite = []
+    with open(test_path, 'r') as test_file_fd:
+        for line in test_file_fd:
+            if line.startswith('func Test'):
+                test_suite.append(line.split()[1].split('(')[0])
+    return test_suite
+
 
 class GolangTest(test.SimpleTest):
 
@@ -55,20 +72,29 @@ class GolangTest(test.SimpleTest):
         """
         return self._filename.split(':')[0]
 
-    def test(self):
+    def _get_command(self):
         """
-        Create the Golang command and execute it.
+        Create the Golang command (None when the go binary is missing).
         """
         if _GO_BIN is None:
-            raise exceptions.TestError("go binary not found")
+            return None
 
         test_name = '%s$' % self._filename.split(':')[1]
         if self.subtest is not None:
             test_name += '/%s' % self.subtest
 
         cmd = '%s test -v %s -run %s' % (_GO_BIN, self.filename, test_name)
+        return cmd, None, None
+
+    def test(self):
+        """
+        Create the Golang command and execute it.
+        """
+        command = self._get_command()
+        if command is None:
+            raise exceptions.TestError("go binary not found")
 
-        result = process.run(cmd, ignore_status=True)
+        result = self._run_cmd(command[0], ignore_status=True)
         if result.exit_status != 0:
             self.fail('Golang Test execution returned a '
                       'non-0 exit code (%s)' % result)
@@ -89,6 +115,65 @@ class GolangLoader(loader.TestLoader):
 
     def __init__(self, args, extra_params):
         super(GolangLoader, self).__init__(args, extra_params)
+        self._discovery_cache = None
+        if discovery_cache.is_enabled():
+            self._discovery_cache = discovery_cache.DiscoveryCache(
+                data_dir.get_datafile_path(CACHE_FILENAME))
+        # Tests (or exception) found in each of the test files so far
+        self._files_tests = {}
+
+    @staticmethod
+    def _find_package_files(url):
+        """
+        Test files of the package (in GOROOT or GOPATH)
+
+        :return: tuple(path of the packages directory, test files) or None
+                 when the package is not found
+        """
+        package_paths = []
+        go_root = os.environ.get('GOROOT')
+        go_path = os.environ.get('GOPATH')
+
+        if go_root is not None:
+            for directory in go_root.split(os.pathsep):
+                pkg_path = os.path.join(os.path.expanduser(directory), 'src')
+                package_paths.append(pkg_path)
+
+        if go_path is not None:
+            for directory in go_path.split(os.pathsep):
+                pkg_path = os.path.join(os.path.expanduser(directory), 'src')
+                package_paths.append(pkg_path)
+
+        for package_path in package_paths:
+            url_path = os.path.join(package_path, url)
+            files = GolangLoader._find_files(url_path)
+            if files:
+                return package_path, files
+        return None
+
+    def _find_reference_files(self, url):
+        """
+        Test files of a reference (a file, a directory or a package)
+        """
+        if os.path.isfile(url):
+            return [url]
+        if os.path.isdir(url):
+            return list(self._find_files(url, recursive=False))
+        package = self._find_package_files(url)
+        if package is None:
+            return []
+        return package[1]
+
+    def prefetch(self, references, which_tests=loader.DiscoverMode.DEFAULT):
+        if _GO_BIN is None:
+            return
+        test_files = []
+        for reference in references:
+            if reference is None:
+                continue
+            test_files.extend(self._find_reference_files(
+                reference.split(':', 1)[0]))
+        self._probe_files(test_files)
 
     def discover(self, url, which_tests=loader.DiscoverMode.DEFAULT):
         if _GO_BIN is None:
@@ -98,8 +183,6 @@ class GolangLoader(loader.TestLoader):
             return []
 
         avocado_suite = []
-        package_paths = []
-        test_files = []
         subtest = None
         tests_filter = None
 
@@ -113,7 +196,7 @@ class GolangLoader(loader.TestLoader):
 
         # When a file is provided
         if os.path.isfile(url):
-            for item in self._find_tests(url):
+            for item in self._find_files_tests([url])[0]:
                 test_name = "%s:%s" % (url, item)
                 if tests_filter and not tests_filter.search(test_name):
                     continue
@@ -127,8 +210,9 @@ class GolangLoader(loader.TestLoader):
 
         # When a directory is provided
         if os.path.isdir(url):
-            for test_file in self._find_files(url, recursive=False):
-                for item in self._find_tests(test_file):
+            test_files = list(self._find_files(url, recursive=False))
+            for test_file_tests in self._find_files_tests(test_files):
+                for item in test_file_tests:
                     test_name = "%s:%s" % (item, item)
                     if tests_filter and not tests_filter.search(test_name):
                         continue
@@ -141,29 +225,16 @@ class GolangLoader(loader.TestLoader):
                                                    'reference.')
 
         # When a package is provided
-        go_root = os.environ.get('GOROOT')
-        go_path = os.environ.get('GOPATH')
-
-        if go_root is not None:
-            for directory in go_root.split(os.pathsep):
-                pkg_path = os.path.join(os.path.expanduser(directory), 'src')
-                package_paths.append(pkg_path)
-
-        if go_path is not None:
-            for directory in go_path.split(os.pathsep):
-                pkg_path = os.path.join(os.path.expanduser(directory), 'src')
-                package_paths.append(pkg_path)
-
-        for package_path in package_paths:
-            url_path = os.path.join(package_path, url)
-            files = self._find_files(url_path)
-            if files:
-                test_files.append((package_path, files))
-                break
+        test_files = []
+        package = self._find_package_files(url)
+        if package is not None:
+            test_files.append(package)
 
         for package_path, test_files_list in test_files:
-            for test_file in test_files_list:
-                for item in self._find_tests(test_file):
+            files_tests = self._find_files_tests(test_files_list)
+            for test_file, test_file_tests in zip(test_files_list,
+                                                  files_tests):
+                for item in test_file_tests:
                     common_prefix = os.path.commonprefix([package_path,
                                                           test_file])
                     match_package = os.path.relpath(test_file, common_prefix)
@@ -186,15 +257,36 @@ class GolangLoader(loader.TestLoader):
             return [(NotGolangTest, {"name": "%s: %s" % (url, msg)})]
         return []
 
-    @staticmethod
-    def _find_tests(test_path):
-        test_suite = []
-        with open(test_path, 'r') as test_file_fd:
-            for line in test_file_fd.readlines():
-                if line.startswith('func Test'):
-                    test_suite.append(line.split()[1].split('(')[0])
-
-        return test_suite
+    def _probe_files(self, test_files):
+        """
+        Finds the tests of the test files not probed yet, in parallel
+        (when there are many of them) and cached by the content of the
+        files
+        """
+        pending = []
+        for test_file in test_files:
+            if test_file not in self._files_tests and test_file not in pending:
+                pending.append(test_file)
+        if not pending:
+            return
+        try:
+            self._files_tests.update(zip(pending, loader.iter_file_discovery(
+                'golang', find_tests, pending, self._discovery_cache)))
+        finally:
+            if self._discovery_cache is not None:
+                self._discovery_cache.save()
+
+    def _find_files_tests(self, test_files):
+        """
+        Tests of each of the test files (see :meth:`_probe_files`)
+        """
+        self._probe_files(test_files)
+        files_tests = [self._files_tests[test_file]
+                       for test_file in test_files]
+        for test_file_tests in files_tests:
+            if isinstance(test_file_tests, Exception):
+                raise test_file_tests
+        return files_tests
 
     @staticmethod
     def _find_files(path, recursive=True):
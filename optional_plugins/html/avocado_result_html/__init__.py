@@ -26,6 +26,7 @@ import time
 import jinja2 as jinja
 
 from avocado.core import exit_codes
+from avocado.core import resources
 from avocado.core.output import LOG_UI
 from avocado.core.plugin_interfaces import CLI, Result
 from avocado.utils import astring
@@ -109,6 +110,15 @@ class ReportModel:
                                                    self.html_output_dir)
             formatted['logfile_basename'] = os.path.basename(logfile)
             formatted['time'] = "%.2f" % tst['time_elapsed']
+            usage = tst.get('resources')
+            if usage:
+                formatted['cpu'] = "%.2f" % (usage['cpu_user'] +
+                                             usage['cpu_system'])
+                formatted['max_rss'] = "%.1f" % (usage['max_rss'] / 1024.0)
+                formatted['resources'] = resources.format_usage(usage)
+            else:
+                formatted['cpu'] = formatted['max_rss'] = ''
+                formatted['resources'] = ''
             local_time_start = time.localtime(tst['time_start'])
             formatted['time_start'] = time.strftime("%Y-%m-%d %H:%M:%S",
                                                     local_time_start)
@@ -17,8 +17,11 @@ Plugin to run Robot Framework tests in Avocado
 """
 
 import logging
+import os
 import re
 
+from avocado.core import data_dir
+from avocado.core import discovery_cache
 from avocado.core import loader
 from avocado.core import output
 from avocado.core import test
@@ -32,6 +35,37 @@ from robot.output.logger import LOGGER
 
 LOGGER.unregister_console_logger()
 
+#: Name of the cache of the tests found in the robot suite files (in the
+#: avocado data dir)
+CACHE_FILENAME = 'robot_discovery_cache.json'
+
+#: Minimum number of suite files parsed by each process of the discovery
+#: pool
+PARALLEL_DISCOVERY_MIN_FILES = 8
+
+
+def _find_tests(data, test_suite):
+    test_suite[data.name] = []
+    for test_case in data.testcase_table:
+        test_suite[data.name].append({'test_name': test_case.name,
+                                      'test_source': test_case.source})
+    for child_data in data.children:
+        _find_tests(child_data, test_suite)
+    return test_suite
+
+
+def find_tests(url):
+    """
+    Tests of each of the suites of a robot suite file (or directory)
+
+    :return: dict of suite name: list of dicts with the test name and
+             source
+    """
+    test_data = TestData(parent=None,
+                         source=url,
+                         include_suites=SuiteNamePatterns())
+    return _find_tests(test_data, test_suite={})
+
 
 class RobotTest(test.SimpleTest):
 
@@ -39,6 +73,9 @@ class RobotTest(test.SimpleTest):
     Run a Robot command as a SIMPLE test.
     """
 
+    #: Robot is executed by its Python API, inside of the test process
+    ASYNC_COMMAND = False
+
     def __init__(self,
                  name,
                  params=None,
@@ -88,6 +125,35 @@ class RobotLoader(loader.TestLoader):
 
     def __init__(self, args, extra_params):
         super(RobotLoader, self).__init__(args, extra_params)
+        self._discovery_cache = None
+        if discovery_cache.is_enabled():
+            self._discovery_cache = discovery_cache.DiscoveryCache(
+                data_dir.get_datafile_path(CACHE_FILENAME))
+        # Tests (or exception) found in each suite file ahead of time
+        self._suites = {}
+
+    def _find_files_tests(self, suite_files):
+        """
+        Parses the suite files concurrently (only the ones which changed
+        since they were cached)
+        """
+        try:
+            suites = loader.iter_file_discovery(
+                'robot', find_tests, suite_files, self._discovery_cache,
+                PARALLEL_DISCOVERY_MIN_FILES)
+            self._suites.update(zip(suite_files, suites))
+        finally:
+            if self._discovery_cache is not None:
+                self._discovery_cache.save()
+
+    def prefetch(self, references, which_tests=loader.DiscoverMode.DEFAULT):
+        suite_files = []
+        for url in references:
+            url = url.split(':', 1)[0]
+            if (url not in self._suites and url not in suite_files and
+                    os.path.isfile(url)):
+                suite_files.append(url)
+        self._find_files_tests(suite_files)
 
     def discover(self, url, which_tests=loader.DiscoverMode.DEFAULT):
         avocado_suite = []
@@ -99,14 +165,20 @@ class RobotLoader(loader.TestLoader):
         if ':' in url:
             url, _subtests_filter = url.split(':', 1)
             subtests_filter = re.compile(_subtests_filter)
-        try:
-            test_data = TestData(parent=None,
-                                 source=url,
-                                 include_suites=SuiteNamePatterns())
-            robot_suite = self._find_tests(test_data, test_suite={})
-        except Exception as data:
+        # Directories are parsed as a whole, they are not cached
+        if os.path.isfile(url):
+            if url not in self._suites:
+                self._find_files_tests([url])
+            robot_suite = self._suites[url]
+        else:
+            try:
+                robot_suite = find_tests(url)
+            except Exception as details:
+                robot_suite = details
+        if isinstance(robot_suite, Exception):
             if which_tests == loader.DiscoverMode.ALL:
-                return [(NotRobotTest, {"name": "%s: %s" % (url, data)})]
+                return [(NotRobotTest, {"name": "%s: %s" % (url,
+                                                          robot_suite)})]
             return []
 
         for item in robot_suite:
@@ -123,15 +195,6 @@ class RobotLoader(loader.TestLoader):
                                     % url})]
         return avocado_suite
 
-    def _find_tests(self, data, test_suite):
-        test_suite[data.name] = []
-        for test_case in data.testcase_table:
-            test_suite[data.name].append({'test_name': test_case.name,
-                                          'test_source': test_case.source})
-        for child_data in data.children:
-            self._find_tests(child_data, test_suite)
-        return test_suite
-
     @staticmethod
     def get_type_label_mapping():
         return {RobotTest: 'ROBOT',
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import unittest.mock
+
+from avocado.core import loader
+
+import avocado_robot
+
+from selftests import temp_dir_prefix
+
+
+def _get_test_data(name, test_names, source):
+    """
+    Mocked robot TestData of a suite (without children)
+    """
+    test_data = unittest.mock.Mock(children=[])
+    test_data.name = name
+    test_data.testcase_table = []
+    for test_name in test_names:
+        test_case = unittest.mock.Mock(source=source)
+        test_case.name = test_name
+        test_data.testcase_table.append(test_case)
+    return test_data
+
+
+class RobotLoader(unittest.TestCase):
+
+    def setUp(self):
+        prefix = temp_dir_prefix(__name__, self, 'setUp')
+        self.tmpdir = tempfile.mkdtemp(prefix=prefix)
+        patcher = unittest.mock.patch(
+            'avocado_robot.data_dir.get_datafile_path',
+            lambda *args: os.path.join(self.tmpdir, *args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_suite_file(self, name):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as suite_file:
+            suite_file.write('*** Test Cases ***\n')
+        return path
+
+    def test_discover(self):
+        path = self._get_suite_file('suite.robot')
+        test_data = _get_test_data('Suite', ['First', 'Second'], path)
+        with unittest.mock.patch('avocado_robot.TestData',
+                                 return_value=test_data) as parser:
+            tests = avocado_robot.RobotLoader(None, {}).discover(path)
+            self.assertEqual(parser.call_count, 1)
+            self.assertEqual([(klass, params['name'])
+                              for klass, params in tests],
+                             [(avocado_robot.RobotTest,
+                               '%s:Suite.First' % path),
+                              (avocado_robot.RobotTest,
+                               '%s:Suite.Second' % path)])
+            # The tests found in the suite file are cached
+            self.assertEqual(avocado_robot.RobotLoader(None, {}).discover(path),
+                             tests)
+            self.assertEqual(parser.call_count, 1)
+
+    def test_prefetch(self):
+        first = self._get_suite_file('first.robot')
+        second = self._get_suite_file('second.robot')
+        suites = {first: _get_test_data('First', ['Test'], first),
+                  second: _get_test_data('Second', ['Test'], second)}
+        with unittest.mock.patch('avocado_robot.TestData',
+                                 side_effect=lambda **kwargs:
+                                 suites[kwargs['source']]) as parser:
+            robot_loader = avocado_robot.RobotLoader(None, {})
+            robot_loader.prefetch([first, second + ':Test', first])
+            self.assertEqual(parser.call_count, 2)
+            tests = robot_loader.discover(second + ':Test')
+            self.assertEqual([params['name'] for _, params in tests],
+                             ['%s:Second.Test' % second])
+            self.assertEqual(len(robot_loader.discover(first)), 1)
+            # The suite files were only parsed by the prefetch
+            self.assertEqual(parser.call_count, 2)
+
+    def test_discover_error(self):
+        path = self._get_suite_file('suite.robot')
+        with unittest.mock.patch('avocado_robot.TestData',
+                                 side_effect=avocado_robot.DataError(
+                                     'Invalid suite')) as parser:
+            robot_loader = avocado_robot.RobotLoader(None, {})
+            self.assertEqual(robot_loader.discover(path), [])
+            tests = robot_loader.discover(path, loader.DiscoverMode.ALL)
+            self.assertEqual(tests, [(avocado_robot.NotRobotTest,
+                                      {'name': '%s: Invalid suite' % path})])
+            # Errors are not cached
+            avocado_robot.RobotLoader(None, {}).discover(path)
+            self.assertEqual(parser.call_count, 2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
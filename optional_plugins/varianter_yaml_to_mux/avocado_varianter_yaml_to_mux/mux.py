@@ -157,6 +157,8 @@ class MuxPlugin:
     default_params = None
     paths = None
     debug = None
+    #: Variants produced (and filtered) by the last iteration
+    _variants_cache = None
 
     def initialize_mux(self, root, paths, debug):
         """
@@ -170,6 +172,7 @@ class MuxPlugin:
         self.debug = debug
         self.variant_ids = [varianter.generate_variant_id(variant)
                             for variant in MuxTree(self.root)]
+        self._variants_cache = None
 
     def __iter__(self):
         """
@@ -178,10 +181,14 @@ class MuxPlugin:
         if self.root is None:
             return
 
-        for vid, variant in zip(self.variant_ids, self.variants):
-            yield {"variant_id": vid,
-                   "variant": variant,
-                   "paths": self.paths}
+        if self._variants_cache is None:
+            self._variants_cache = [{"variant_id": vid,
+                                     "variant": variant,
+                                     "paths": self.paths}
+                                    for vid, variant in zip(self.variant_ids,
+                                                            self.variants)]
+        for variant in self._variants_cache:
+            yield variant
 
     def update_defaults(self, defaults):
         """
@@ -196,6 +203,7 @@ class MuxPlugin:
         combination = defaults
         combination.merge(self.root)
         self.variants = MuxTree(combination)
+        self._variants_cache = None
 
     def to_str(self, summary, variants, **kwargs):
         """
@@ -4,6 +4,7 @@ import os
 import pickle
 import sys
 import unittest
+import unittest.mock
 
 import yaml
 
@@ -249,6 +250,23 @@ class TestMuxTree(unittest.TestCase):
             variant_list.remove(item)
         self.assertFalse(variant_list)
 
+    def test_variants_produced_once(self):
+        children = (tree.TreeNode("child1"), tree.TreeNode("child2"))
+        root = tree.TreeNode("root", children=children)
+        plugin = mux.MuxPlugin()
+        plugin.initialize_mux(root, "", False)
+        plugin.update_defaults(tree.TreeNode())
+        with unittest.mock.patch.object(mux.MuxTree, '_valid_variant',
+                                        return_value=True) as valid:
+            variants = list(plugin)
+            self.assertEqual(list(plugin), variants)
+            self.assertEqual(len(plugin), len(variants))
+            self.assertEqual(valid.call_count, len(variants))
+            # Updating the defaults produces new variants
+            plugin.update_defaults(tree.TreeNode())
+            self.assertEqual(len(plugin), len(variants))
+            self.assertEqual(valid.call_count, 2 * len(variants))
+
 
 class TestMultiplex(unittest.TestCase):
 
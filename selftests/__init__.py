@@ -57,7 +57,9 @@ PLUGINS = {'varianter_yaml_to_mux': 'avocado-framework-plugin-varianter-yaml-to-
            'runner_remote': 'avocado-framework-plugin-runner-remote',
            'runner_vm': 'avocado-framework-plugin-runner-vm',
            'varianter_cit': 'avocado-framework-plugin-varianter-cit',
-           'html': 'avocado-framework-plugin-result-html'}
+           'html': 'avocado-framework-plugin-result-html',
+           'glib': 'avocado-framework-plugin-glib',
+           'robot': 'avocado-framework-plugin-robot'}
 
 
 def test_suite(base_selftests=True, plugin_selftests=None):
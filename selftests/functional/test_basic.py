@@ -20,7 +20,9 @@ except ImportError:
     SCHEMA_CAPABLE = False
 
 from avocado.core import exit_codes
+from avocado.core import history
 from avocado.utils import astring
+from avocado.utils import cgroup
 from avocado.utils import genio
 from avocado.utils import process
 from avocado.utils import script
@@ -137,6 +139,14 @@ READ_BINARY = probe_binary('read')
 SLEEP_BINARY = probe_binary('sleep')
 
 
+def cgroup_v2_writable():
+    mountpoint = cgroup.get_mountpoint()
+    path = cgroup.get_cgroup_path()
+    if mountpoint is None or path is None:
+        return False
+    return os.access(os.path.join(mountpoint, path.lstrip('/')), os.W_OK)
+
+
 class RunnerOperationTest(unittest.TestCase):
 
     def setUp(self):
@@ -212,6 +222,224 @@ class RunnerOperationTest(unittest.TestCase):
         self.assertEqual(result.exit_status, expected_rc,
                          "Avocado did not return rc %d:\n%s" % (expected_rc, result))
 
+    def test_runner_parallel(self):
+        cmd_line = ('%s run --sysinfo=off --job-results-dir %s --parallel 2 '
+                    '--json - passtest.py failtest.py passtest.py'
+                    % (AVOCADO, self.tmpdir))
+        result = process.run(cmd_line, ignore_status=True)
+        expected_rc = exit_codes.AVOCADO_TESTS_FAIL
+        self.assertEqual(result.exit_status, expected_rc,
+                         "Avocado did not return rc %d:\n%s" % (expected_rc, result))
+        results = json.loads(result.stdout_text)
+        self.assertEqual([test['status'] for test in results['tests']],
+                         ['PASS', 'FAIL', 'PASS'])
+        self.assertEqual([test['id'][0] for test in results['tests']],
+                         ['1', '2', '3'])
+
+    def test_runner_parallel_failfast(self):
+        cmd_line = ('%s run --sysinfo=off --job-results-dir %s --parallel 2 '
+                    'failtest.py passtest.py passtest.py passtest.py '
+                    '--failfast on' % (AVOCADO, self.tmpdir))
+        result = process.run(cmd_line, ignore_status=True)
+        self.assertIn(b'Interrupting job (failfast).', result.stdout)
+        expected_rc = exit_codes.AVOCADO_TESTS_FAIL | exit_codes.AVOCADO_JOB_INTERRUPTED
+        self.assertEqual(result.exit_status, expected_rc,
+                         "Avocado did not return rc %d:\n%s" % (expected_rc, result))
+
+    def test_runner_prefork(self):
+        for parallel in (1, 2):
+            cmd_line = ('%s run --sysinfo=off --job-results-dir %s '
+                        '--prefork on --parallel %s --preload-module json '
+                        '--json - passtest.py failtest.py passtest.py'
+                        % (AVOCADO, self.tmpdir, parallel))
+            result = process.run(cmd_line, ignore_status=True)
+            expected_rc = exit_codes.AVOCADO_TESTS_FAIL
+            self.assertEqual(result.exit_status, expected_rc,
+                             "Avocado did not return rc %d:\n%s"
+                             % (expected_rc, result))
+            results = json.loads(result.stdout_text)
+            self.assertEqual([test['status'] for test in results['tests']],
+                             ['PASS', 'FAIL', 'PASS'])
+
+    def test_runner_engine_asyncio(self):
+        cmd_line = ('%s run --sysinfo=off --job-results-dir %s '
+                    '--engine asyncio --async-parallel 2 --json - '
+                    'examples/tests/passtest.sh examples/tests/failtest.sh '
+                    'passtest.py examples/tests/passtest.sh'
+                    % (AVOCADO, self.tmpdir))
+        result = process.run(cmd_line, ignore_status=True)
+        expected_rc = exit_codes.AVOCADO_TESTS_FAIL
+        self.assertEqual(result.exit_status, expected_rc,
+                         "Avocado did not return rc %d:\n%s" % (expected_rc, result))
+        results = json.loads(result.stdout_text)
+        self.assertEqual([test['status'] for test in results['tests']],
+                         ['PASS', 'FAIL', 'PASS', 'PASS'])
+        self.assertEqual([test['id'][0] for test in results['tests']],
+                         ['1', '2', '3', '4'])
+        debug_log = os.path.join(results['tests'][1]['logdir'], 'debug.log')
+        with open(debug_log, 'r') as log_file:
+            self.assertIn("Exit status: 1", log_file.read())
+
+    @unittest.skipUnless(cgroup_v2_writable(),
+                         "cgroup v2 hierarchy not available (writable)")
+    def test_runner_cgroup(self):
+        with script.TemporaryScript("cgroup.sh",
+                                    "#!/bin/sh\ngrep '^0::' /proc/self/cgroup",
+                                    "avocado_cgroup_functional") as tst:
+            cmd_line = ('%s run --sysinfo=off --job-results-dir %s '
+                        '--cgroup on --json - %s'
+                        % (AVOCADO, self.tmpdir, tst))
+            result = process.run(cmd_line, ignore_status=True)
+        self.assertEqual(result.exit_status, exit_codes.AVOCADO_ALL_OK,
+                         "Avocado did not return rc %d:\n%s"
+                         % (exit_codes.AVOCADO_ALL_OK, result))
+        results = json.loads(result.stdout_text)
+        debug_log = os.path.join(results['tests'][0]['logdir'], 'debug.log')
+        with open(debug_log, 'r') as log_file:
+            self.assertRegex(log_file.read(),
+                             r'\[stdout\] 0::.*/avocado-job-%s/test-\d+'
+                             % results['job_id'][:7])
+
+    def test_runner_cgroup_asyncio(self):
+        cmd_line = ('%s run --sysinfo=off --job-results-dir %s '
+                    '--cgroup on --engine asyncio passtest.py'
+                    % (AVOCADO, self.tmpdir))
+        result = process.run(cmd_line, ignore_status=True)
+        self.assertEqual(result.exit_status, exit_codes.AVOCADO_JOB_FAIL,
+                         "Avocado did not return rc %d:\n%s"
+                         % (exit_codes.AVOCADO_JOB_FAIL, result))
+        self.assertIn("can't be isolated in cgroups by the asyncio engine",
+                      result.stderr_text)
+
+    def test_runner_parallel_invalid(self):
+        cmd_line = ('%s run --sysinfo=off --job-results-dir %s --parallel 0 '
+                    'passtest.py' % (AVOCADO, self.tmpdir))
+        result = process.run(cmd_line, ignore_status=True)
+        expected_rc = exit_codes.AVOCADO_JOB_FAIL
+        self.assertEqual(result.exit_status, expected_rc,
+                         "Avocado did not return rc %d:\n%s" % (expected_rc, result))
+        self.assertIn(b'The number of parallel tests has to be positive',
+                      result.stderr)
+
+    def test_runner_shard(self):
+        tests = ['passtest.py', 'failtest.py', 'errortest.py', 'warntest.py',
+                 'canceltest.py', 'passtest.sh']
+        results_paths = []
+        for index in (1, 2, 3):
+            results_path = os.path.join(self.tmpdir, 'shard%s.json' % index)
+            cmd_line = ('%s run --sysinfo=off --job-results-dir %s '
+                        '--shard %s/3 --json %s %s'
+                        % (AVOCADO, self.tmpdir, index, results_path,
+                           ' '.join(tests)))
+            process.run(cmd_line, ignore_status=True)
+            with open(results_path, 'r') as results_file:
+                results = json.load(results_file)
+            self.assertEqual(results['shard'], {'index': index, 'total': 3})
+            results_paths.append(results_path)
+        cmd_line = ('%s merge --json - %s'
+                    % (AVOCADO, ' '.join(results_paths)))
+        result = process.run(cmd_line, ignore_status=True)
+        expected_rc = exit_codes.AVOCADO_TESTS_FAIL
+        self.assertEqual(result.exit_status, expected_rc,
+                         "Avocado did not return rc %d:\n%s" % (expected_rc, result))
+        merged = json.loads(result.stdout_text)
+        self.assertEqual(merged['total'], len(tests))
+        self.assertEqual(merged['missing'], [])
+        self.assertEqual(sorted(test['status'] for test in merged['tests']),
+                         ['CANCEL', 'ERROR', 'FAIL', 'PASS', 'PASS', 'WARN'])
+        self.assertEqual([test['id'].split('-')[0]
+                          for test in merged['tests']],
+                         ['1', '2', '3', '4', '5', '6'])
+        cmd_line = ('%s merge %s' % (AVOCADO, ' '.join(results_paths[1:])))
+        result = process.run(cmd_line, ignore_status=True)
+        expected_rc = exit_codes.AVOCADO_FAIL
+        self.assertEqual(result.exit_status, expected_rc,
+                         "Avocado did not return rc %d:\n%s" % (expected_rc, result))
+        self.assertIn(b'Results of shard(s) 1 are missing', result.stderr)
+
+    def test_runner_shard_duration(self):
+        tests = ['passtest.py', 'failtest.py', 'errortest.py', 'warntest.py',
+                 'canceltest.py', 'passtest.sh']
+        results_path = os.path.join(self.tmpdir, 'results.json')
+        cmd_line = ('%s run --sysinfo=off --job-results-dir %s --json %s %s'
+                    % (AVOCADO, self.tmpdir, results_path, ' '.join(tests)))
+        process.run(cmd_line, ignore_status=True)
+        with open(results_path, 'r') as results_file:
+            expected = sorted(history.get_test_key(test['id'])
+                              for test in json.load(results_file)['tests'])
+        history_path = os.path.join(self.tmpdir, 'history.json')
+        test_history = history.TestHistory(self.tmpdir, history_path)
+        test_history.update()
+        test_history.save()
+        cmd_line = ('%s run --sysinfo=off --job-results-dir %s --shard 1/3 '
+                    '--shard-mode duration %s'
+                    % (AVOCADO, self.tmpdir, ' '.join(tests)))
+        result = process.run(cmd_line, ignore_status=True)
+        expected_rc = exit_codes.AVOCADO_JOB_FAIL
+        self.assertEqual(result.exit_status, expected_rc,
+                         "Avocado did not return rc %d:\n%s" % (expected_rc, result))
+        self.assertIn(b'requires a snapshot of the test history',
+                      result.stderr)
+        # The shards executed one after another (whose results are added
+        # to the same job results) are split by the same snapshot
+        executed = []
+        for index in (1, 2, 3):
+            results_path = os.path.join(self.tmpdir, 'shard%s.json' % index)
+            cmd_line = ('%s run --sysinfo=off --job-results-dir %s '
+                        '--shard %s/3 --shard-mode duration '
+                        '--shard-history %s --json %s %s'
+                        % (AVOCADO, self.tmpdir, index, history_path,
+                           results_path, ' '.join(tests)))
+            process.run(cmd_line, ignore_status=True)
+            with open(results_path, 'r') as results_file:
+                results = json.load(results_file)
+            executed.extend(history.get_test_key(test['id'])
+                            for test in results['tests'])
+        self.assertEqual(sorted(executed), expected)
+
+    def test_runner_distributed(self):
+        address = 'unix:%s' % os.path.join(self.tmpdir, 'coordinator')
+        # Workers wait for the job to start listening
+        workers = []
+        for _ in range(2):
+            cmd_line = ('%s worker %s --authkey secret --job-results-dir %s'
+                        % (AVOCADO, address, self.tmpdir))
+            workers.append(process.SubProcess(cmd_line))
+            workers[-1].start()
+        cmd_line = ('%s run --sysinfo=off --job-results-dir %s '
+                    '--distributed %s --distributed-authkey secret --json - '
+                    'passtest.py sleeptest.py failtest.py errortest.py '
+                    'passtest.sh' % (AVOCADO, self.tmpdir, address))
+        coordinator = process.SubProcess(cmd_line)
+        try:
+            coordinator.start()
+            for worker in workers:
+                self.assertIn(worker.wait(60), (exit_codes.AVOCADO_ALL_OK,
+                                                exit_codes.AVOCADO_TESTS_FAIL))
+        finally:
+            result = coordinator.run(60)
+        expected_rc = exit_codes.AVOCADO_TESTS_FAIL
+        self.assertEqual(result.exit_status, expected_rc,
+                         "Avocado did not return rc %d:\n%s" % (expected_rc, result))
+        results = json.loads(result.stdout_text)
+        self.assertEqual([test['status'] for test in results['tests']],
+                         ['PASS', 'PASS', 'FAIL', 'ERROR', 'PASS'])
+        self.assertEqual([test['id'][0] for test in results['tests']],
+                         ['1', '2', '3', '4', '5'])
+
+    def test_runner_distributed_unsupported(self):
+        address = 'unix:%s' % os.path.join(self.tmpdir, 'coordinator')
+        cmd_line = ('%s run --sysinfo=off --job-results-dir %s '
+                    '--distributed %s --distributed-authkey secret '
+                    '--engine asyncio --unittest-batch 10 passtest.py'
+                    % (AVOCADO, self.tmpdir, address))
+        result = process.run(cmd_line, ignore_status=True)
+        self.assertEqual(result.exit_status, exit_codes.AVOCADO_JOB_FAIL,
+                         "Avocado did not return rc %d:\n%s"
+                         % (exit_codes.AVOCADO_JOB_FAIL, result))
+        self.assertIn("The tests handed out to workers can't use the asyncio "
+                      "engine, Python unittest batches", result.stderr_text)
+
     def test_runner_ignore_missing_references_one_missing(self):
         cmd_line = ('%s run --sysinfo=off --job-results-dir %s '
                     'passtest.py badtest.py --ignore-missing-references on'
@@ -1115,6 +1343,38 @@ class PluginsTest(AbsPluginsTest, unittest.TestCase):
         self.assertIn("TEST TAGS SUMMARY", stdout_lines)
         self.assertEqual("BIG_TAG_NAME: 1", stdout_lines[-1])
 
+    def test_list_stream(self):
+        test = script.make_script(os.path.join(self.base_outputdir, 'test.py'),
+                                  VALID_PYTHON_TEST_WITH_TAGS)
+        cmd_line = ("%s list --loaders file --stream --verbose %s"
+                    % (AVOCADO, test))
+        result = process.run(cmd_line, ignore_status=True)
+        self.assertEqual(result.exit_status, exit_codes.AVOCADO_ALL_OK,
+                         "Avocado did not return rc %d:\n%s"
+                         % (exit_codes.AVOCADO_ALL_OK, result))
+        stdout_lines = result.stdout_text.splitlines()
+        self.assertIn("Tag(s)", stdout_lines[0])
+        full_test_name = "%s:MyTest.test" % test
+        self.assertEqual("INSTRUMENTED   %s BIG_TAG_NAME" % full_test_name,
+                         stdout_lines[1])
+        self.assertIn("INSTRUMENTED: 1", stdout_lines)
+        self.assertEqual("BIG_TAG_NAME: 1", stdout_lines[-1])
+
+    def test_list_json_lines(self):
+        test = script.make_script(os.path.join(self.base_outputdir, 'test.py'),
+                                  VALID_PYTHON_TEST_WITH_TAGS)
+        cmd_line = ("%s list --loaders file --json-lines %s %s"
+                    % (AVOCADO, test, test))
+        result = process.run(cmd_line, ignore_status=True)
+        self.assertEqual(result.exit_status, exit_codes.AVOCADO_ALL_OK,
+                         "Avocado did not return rc %d:\n%s"
+                         % (exit_codes.AVOCADO_ALL_OK, result))
+        exp = {"type": "INSTRUMENTED", "name": "%s:MyTest.test" % test,
+               "tags": {"BIG_TAG_NAME": None}}
+        self.assertEqual([json.loads(line)
+                          for line in result.stdout_text.splitlines()],
+                         [exp, exp])
+
     def test_plugin_list(self):
         cmd_line = '%s plugins' % AVOCADO
         result = process.run(cmd_line, ignore_status=True)
@@ -1,4 +1,5 @@
 import glob
+import json
 import os
 import shutil
 import tempfile
@@ -181,6 +182,26 @@ class ReplayTests(unittest.TestCase):
                    % (AVOCADO, self.jobid, self.tmpdir))
         self.run_and_check(cmdline, exit_codes.AVOCADO_ALL_OK)
 
+    def test_run_replay_history_order(self):
+        """
+        Runs a replay of a job using history based execution order
+        """
+        cmd_line = ('%s run passtest.py failtest.py passtest.py '
+                    '--execution-order failed-first --job-results-dir %s '
+                    '--sysinfo=off --json -' % (AVOCADO, self.tmpdir))
+        result = self.run_and_check(cmd_line, exit_codes.AVOCADO_TESTS_FAIL)
+        names = [test['id'].split('-', 1)[1]
+                 for test in json.loads(result.stdout_text)['tests']]
+        order_path = os.path.join(self.tmpdir, 'latest', 'jobdata',
+                                  'execution_order.json')
+        self.assertTrue(os.path.exists(order_path))
+        cmd_line = ('%s run --replay latest --job-results-dir %s '
+                    '--sysinfo=off --json -' % (AVOCADO, self.tmpdir))
+        result = self.run_and_check(cmd_line, exit_codes.AVOCADO_TESTS_FAIL)
+        replay_names = [test['id'].split('-', 1)[1]
+                        for test in json.loads(result.stdout_text)['tests']]
+        self.assertEqual(names, replay_names)
+
     def tearDown(self):
         shutil.rmtree(self.tmpdir)
 
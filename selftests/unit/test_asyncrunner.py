@@ -0,0 +1,52 @@
+import unittest
+
+from avocado.core import asyncrunner
+from avocado.core import test
+
+
+class FakeTest(test.Test):
+
+    def test(self):
+        pass
+
+
+class AsyncRunnerTest(unittest.TestCase):
+
+    def test_is_async_capable(self):
+        self.assertTrue(asyncrunner.is_async_capable((test.SimpleTest, {})))
+        self.assertTrue(asyncrunner.is_async_capable(
+            (test.ExternalRunnerTest, {})))
+        self.assertFalse(asyncrunner.is_async_capable((FakeTest, {})))
+        self.assertFalse(asyncrunner.is_async_capable(('FakeTest', {})))
+
+    def test_replay(self):
+        output = asyncrunner.CommandOutput('/bin/true')
+        output.add_data(1, b'out1\nout')
+        output.add_data(2, b'err\n')
+        output.add_data(1, b'2\n')
+        output.exit_status = 0
+        output.pid = 1234
+        result = output.replay()
+        self.assertEqual(result.command, '/bin/true')
+        self.assertEqual(result.exit_status, 0)
+        self.assertEqual(result.pid, 1234)
+        self.assertEqual(result.stdout, b'out1\nout2\n')
+        self.assertEqual(result.stderr, b'err\n')
+
+    def test_replay_combined(self):
+        output = asyncrunner.CommandOutput('/bin/true', combined=True)
+        output.add_data(1, b'out\n')
+        output.add_data(1, b'err\n')
+        output.exit_status = 1
+        result = output.replay()
+        self.assertEqual(result.stdout, b'out\nerr\n')
+        self.assertEqual(result.stderr, b'')
+
+    def test_replay_error(self):
+        output = asyncrunner.CommandOutput('/non/existing')
+        output.error = OSError(2, 'No such file or directory')
+        self.assertRaises(OSError, output.replay)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+import os
+import shutil
+import tempfile
+import unittest.mock
+
+from avocado.core import discovery_cache
+from avocado.core import safeloader
+
+from .. import temp_dir_prefix
+
+
+PARENT = """from avocado import Test
+
+class Parent(Test):
+    '''
+    :avocado: tags=parent,arch:x86_64
+    '''
+    def test_parent(self):
+        pass
+"""
+
+CHILD = """import parent
+
+class Child(parent.Parent):
+    '''
+    :avocado: tags=child
+    '''
+    def test_child(self):
+        pass
+
+class Disabled(parent.Parent):
+    '''
+    :avocado: disable
+    '''
+"""
+
+UNITTEST = """import unittest
+
+class Unit(unittest.TestCase):
+    def test_one(self):
+        pass
+"""
+
+
+class DiscoveryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        prefix = temp_dir_prefix(__name__, self, 'setUp')
+        self.tmpdir = tempfile.mkdtemp(prefix=prefix)
+        self.path = os.path.join(self.tmpdir, 'cache.json')
+        self.parent = self._write('parent.py', PARENT)
+        self.child = self._write('child.py', CHILD)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as module:
+            module.write(content)
+        return path
+
+    def _find_avocado_tests(self, path):
+        """
+        Discovers the tests by a new cache instance, returning the result
+        and whether the module was parsed
+        """
+        cache = discovery_cache.DiscoveryCache(self.path)
+        with unittest.mock.patch('avocado.core.safeloader.find_avocado_tests',
+                                 wraps=safeloader.find_avocado_tests) as find:
+            result = cache.find_avocado_tests(path)
+        cache.save()
+        return result, find.called
+
+    def test_record_parsed_paths(self):
+        with safeloader.record_parsed_paths() as parsed:
+            safeloader.find_avocado_tests(self.child)
+        # The module defining avocado.Test is parsed as well
+        self.assertTrue(parsed.issuperset([self.child, self.parent]))
+        length = len(parsed)
+        safeloader.find_avocado_tests(self.child)
+        self.assertEqual(len(parsed), length)
+
+    def test_cached(self):
+        expected = safeloader.find_avocado_tests(self.child)
+        result, parsed = self._find_avocado_tests(self.child)
+        self.assertTrue(parsed)
+        self.assertEqual(result, expected)
+        result, parsed = self._find_avocado_tests(self.child)
+        self.assertFalse(parsed)
+        self.assertEqual(result, expected)
+        self.assertEqual(result[0]['Child'][0],
+                         ('test_child', {'child': None}))
+        self.assertEqual(result[0]['Child'][1],
+                         ('test_parent', {'parent': None,
+                                          'arch': set(['x86_64'])}))
+        self.assertEqual(result[1], set(['Disabled']))
+
+    def test_module_changed(self):
+        self._find_avocado_tests(self.child)
+        self._write('child.py', CHILD.replace('test_child', 'test_another'))
+        result, parsed = self._find_avocado_tests(self.child)
+        self.assertTrue(parsed)
+        self.assertEqual(result[0]['Child'][0][0], 'test_another')
+
+    def test_parent_changed(self):
+        self._find_avocado_tests(self.child)
+        self._write('parent.py', PARENT.replace('test_parent', 'test_new'))
+        result, parsed = self._find_avocado_tests(self.child)
+        self.assertTrue(parsed)
+        self.assertEqual(result[0]['Child'][1][0], 'test_new')
+
+    def test_signature(self):
+        signature = discovery_cache.get_signature(self.parent)
+        self.assertEqual(signature[:2], [os.stat(self.parent).st_mtime,
+                                         len(PARENT)])
+        with unittest.mock.patch('avocado.core.discovery_cache.open',
+                                 create=True) as mock_open:
+            # Same modification time and size, the content is not read
+            previous = signature[:2] + ['previous']
+            self.assertIs(discovery_cache.get_signature(self.parent,
+                                                        previous), previous)
+        self.assertFalse(mock_open.called)
+        self._write('parent.py', PARENT.replace('test_parent', 'test_new'))
+        self.assertNotEqual(
+            discovery_cache.get_signature(self.parent, signature)[2],
+            signature[2])
+        self.assertIsNone(discovery_cache.get_signature(
+            os.path.join(self.tmpdir, 'missing.py'), signature))
+
+    def test_touched(self):
+        self._find_avocado_tests(self.child)
+        stat = os.stat(self.parent)
+        os.utime(self.parent, (stat.st_atime, stat.st_mtime + 10))
+        _, parsed = self._find_avocado_tests(self.child)
+        self.assertFalse(parsed)
+        # The new modification time is stored
+        cache = discovery_cache.DiscoveryCache(self.path)
+        entry = cache.entries['avocado:%s' % self.child]
+        self.assertEqual(entry['deps'][self.parent][0], stat.st_mtime + 10)
+
+    def test_salt(self):
+        self._find_avocado_tests(self.child)
+        with unittest.mock.patch('avocado.core.discovery_cache.SALT', 'other'):
+            _, parsed = self._find_avocado_tests(self.child)
+        self.assertTrue(parsed)
+
+    def test_python_unittests(self):
+        path = self._write('unit.py', UNITTEST)
+        cache = discovery_cache.DiscoveryCache(self.path)
+        expected = safeloader.find_python_unittests(path)
+        self.assertEqual(cache.find_python_unittests(path), expected)
+        cache.save()
+        cache = discovery_cache.DiscoveryCache(self.path)
+        with unittest.mock.patch('avocado.core.safeloader.'
+                                 'find_python_unittests') as find:
+            self.assertEqual(cache.find_python_unittests(path), expected)
+        self.assertFalse(find.called)
+        self.assertFalse(cache.modified)
+
+    def test_new_entries(self):
+        cache = discovery_cache.DiscoveryCache(self.path)
+        cache.find_avocado_tests(self.child)
+        entries = cache.pop_new_entries()
+        self.assertEqual(list(entries), ['avocado:%s' % self.child])
+        self.assertEqual(cache.pop_new_entries(), {})
+        other = discovery_cache.DiscoveryCache(self.path)
+        other.update(entries)
+        other.save()
+        _, parsed = self._find_avocado_tests(self.child)
+        self.assertFalse(parsed)
+
+    def test_removed_module(self):
+        self._find_avocado_tests(self.child)
+        os.unlink(self.child)
+        cache = discovery_cache.DiscoveryCache(self.path)
+        cache.find_avocado_tests(self.parent)
+        cache.save()
+        cache = discovery_cache.DiscoveryCache(self.path)
+        self.assertEqual(list(cache.entries), ['avocado:%s' % self.parent])
+
+    def test_file_tests(self):
+        cache = discovery_cache.DiscoveryCache(self.path)
+        function = unittest.mock.Mock(return_value=['test_parent'])
+        self.assertEqual(cache.find_file_tests('kind', function, self.parent),
+                         ['test_parent'])
+        self.assertEqual(cache.find_file_tests('kind', function, self.parent),
+                         ['test_parent'])
+        self.assertEqual(function.call_count, 1)
+        cache.find_file_tests('other', function, self.parent)
+        self.assertEqual(function.call_count, 2)
+        cache.save()
+        cache = discovery_cache.DiscoveryCache(self.path)
+        cache.find_file_tests('kind', function, self.parent)
+        self.assertEqual(function.call_count, 2)
+        self._write('parent.py', PARENT.replace('test_parent', 'test_new'))
+        cache = discovery_cache.DiscoveryCache(self.path)
+        cache.find_file_tests('kind', function, self.parent)
+        self.assertEqual(function.call_count, 3)
+
+    def test_corrupted(self):
+        with open(self.path, 'w') as cache_file:
+            cache_file.write('{')
+        _, parsed = self._find_avocado_tests(self.child)
+        self.assertTrue(parsed)
+        _, parsed = self._find_avocado_tests(self.child)
+        self.assertFalse(parsed)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import collections
+import threading
 import unittest
 
 from avocado.core import dispatcher
@@ -19,5 +21,72 @@ class DispatcherTest(unittest.TestCase):
             self.assertEqual(ext_names, sorted(ext_names))
 
 
+class SlowPlugin:
+
+    def __init__(self):
+        self.events = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def start_test(self, result, state):
+        self.started.set()
+        self.release.wait()
+        self.events.append(('start_test', state['name']))
+
+    def test_progress(self, progress=False):
+        self.events.append(('test_progress', progress))
+
+    def end_test(self, result, state):
+        self.events.append(('end_test', state['name']))
+
+
+class BackgroundEventsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.plugin = SlowPlugin()
+        ext = collections.namedtuple('Extension', 'name obj')('slow',
+                                                              self.plugin)
+        self.background = dispatcher._BackgroundEvents(ext, 3)
+
+    def test_order(self):
+        self.plugin.release.set()
+        for name in ('1', '2'):
+            self.background.put('start_test', (None, {'name': name}))
+            self.background.put('end_test', (None, {'name': name}))
+        self.background.flush()
+        self.assertEqual(self.plugin.events,
+                         [('start_test', '1'), ('end_test', '1'),
+                          ('start_test', '2'), ('end_test', '2')])
+        self.assertEqual(self.background.dropped, 0)
+
+    def test_coalesce_progress(self):
+        self.background.put('start_test', (None, {'name': '1'}))
+        self.plugin.started.wait()
+        self.background.put('test_progress', (True,))
+        self.background.put('test_progress', (True,))
+        self.plugin.release.set()
+        self.background.flush()
+        self.assertEqual(self.plugin.events,
+                         [('start_test', '1'), ('test_progress', True)])
+        self.assertEqual(self.background.coalesced, 1)
+
+    def test_full_queue(self):
+        self.background.put('start_test', (None, {'name': '1'}))
+        self.plugin.started.wait()
+        self.background.put('end_test', (None, {'name': '1'}))
+        self.background.put('start_test', (None, {'name': '2'}))
+        self.background.put('end_test', (None, {'name': '2'}))
+        self.background.put('test_progress', (True,))
+        self.assertEqual(self.background.dropped, 1)
+        threading.Timer(0.1, self.plugin.release.set).start()
+        self.background.put('start_test', (None, {'name': '3'}))
+        self.assertEqual(self.background.late, 1)
+        self.background.flush()
+        self.assertEqual(self.plugin.events,
+                         [('start_test', '1'), ('end_test', '1'),
+                          ('start_test', '2'), ('end_test', '2'),
+                          ('start_test', '3')])
+
+
 if __name__ == '__main__':
     unittest.main()
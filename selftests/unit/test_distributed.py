@@ -0,0 +1,37 @@
+import unittest
+
+from avocado.core import distributed
+
+
+class DistributedTest(unittest.TestCase):
+
+    def test_parse_address(self):
+        self.assertEqual(distributed.parse_address('unix:/tmp/socket'),
+                         ('/tmp/socket', 'AF_UNIX'))
+        self.assertEqual(distributed.parse_address('tcp:127.0.0.1:5000'),
+                         (('127.0.0.1', 5000), 'AF_INET'))
+        self.assertEqual(distributed.parse_address('myhost:5000'),
+                         (('myhost', 5000), 'AF_INET'))
+        self.assertEqual(distributed.parse_address('tcp::5000'),
+                         (('localhost', 5000), 'AF_INET'))
+        for address in ('unix:', 'tcp:myhost', 'myhost', 'tcp:host:port'):
+            self.assertRaises(ValueError, distributed.parse_address, address)
+
+    def test_format_address(self):
+        for address in ('unix:/tmp/socket', 'tcp:127.0.0.1:5000'):
+            parsed = distributed.parse_address(address)[0]
+            self.assertEqual(distributed.format_address(parsed), address)
+
+    def test_worker_factory(self):
+        test_parameters = {'name': 'test', 'job': object(),
+                           'base_logdir': '/logdir', 'methodName': 'test'}
+        factory = distributed.DistributedTestRunner._get_worker_factory(
+            ('MyTest', test_parameters))
+        self.assertEqual(factory, ('MyTest', {'name': 'test',
+                                              'methodName': 'test'}))
+        # The original factory is kept as it is
+        self.assertIn('job', test_parameters)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from avocado.core import history
+from avocado.core.test import TestID
+
+from .. import temp_dir_prefix
+
+
+def _results(*tests):
+    return {'tests': [{'id': test_id, 'time': duration, 'status': status}
+                      for test_id, duration, status in tests]}
+
+
+class TestHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        prefix = temp_dir_prefix(__name__, self, 'setUp')
+        self.tmpdir = tempfile.mkdtemp(prefix=prefix)
+        self.logs_dir = os.path.join(self.tmpdir, 'job-results')
+        os.mkdir(self.logs_dir)
+        self.path = os.path.join(self.tmpdir, 'history.json')
+
+    def _create_job(self, name, results):
+        job_dir = os.path.join(self.logs_dir, name)
+        os.mkdir(job_dir)
+        if results is not None:
+            with open(os.path.join(job_dir, 'results.json'), 'w') as result:
+                json.dump(results, result)
+        return job_dir
+
+    def test_get_test_key(self):
+        self.assertEqual(history.get_test_key('1-a.py:Test.test;variant-1'),
+                         'a.py:Test.test;variant-1')
+        self.assertEqual(history.get_test_key('a-b.py'), 'a-b.py')
+        test_id = TestID(12, 'a-b.py', {'variant_id': 'foo'}, 3)
+        self.assertEqual(history.get_test_key(test_id), 'a-b.py;foo')
+
+    def test_update(self):
+        self._create_job('job-1', _results(('1-a', 1.0, 'PASS'),
+                                           ('2-b', 5.0, 'FAIL'),
+                                           ('3-c', -1, 'SKIP')))
+        self._create_job('job-2', _results(('1-a', 3.0, 'FAIL'),
+                                           ('2-b', 1.0, 'PASS')))
+        current = self._create_job('job-3', _results(('1-a', 100, 'PASS')))
+        unfinished = self._create_job('job-4', None)
+        test_history = history.TestHistory(self.logs_dir, self.path)
+        self.assertTrue(test_history.update(exclude=current))
+        self.assertEqual(test_history.get_time('a'), 2.0)
+        self.assertEqual(test_history.get_status('a'), 'FAIL')
+        self.assertEqual(test_history.get_time('b'), 3.0)
+        self.assertEqual(test_history.get_status('b'), 'PASS')
+        self.assertEqual(test_history.get_time('c'), None)
+        self.assertEqual(test_history.get_status('c'), 'SKIP')
+        self.assertEqual(test_history.get_time('unknown'), None)
+        self.assertNotIn(unfinished, test_history.jobs)
+        test_history.save()
+        # Already processed jobs are not read again
+        test_history = history.TestHistory(self.logs_dir, self.path)
+        self.assertEqual(test_history.get_time('a'), 2.0)
+        self.assertFalse(test_history.update(exclude=current))
+        self.assertTrue(test_history.update())
+        self.assertAlmostEqual(test_history.get_time('a'), 104.0 / 3)
+
+    def test_orders(self):
+        self._create_job('job-1', _results(('1-a', 1.0, 'PASS'),
+                                           ('2-b', 5.0, 'FAIL'),
+                                           ('3-c', 3.0, 'ERROR'),
+                                           ('4-d', 3.0, 'PASS')))
+        test_history = history.TestHistory(self.logs_dir, self.path)
+        test_history.update()
+        keys = ['a', 'b', 'new', 'c', 'd']
+        self.assertEqual(history.order_longest_first(keys, test_history),
+                         [2, 1, 3, 4, 0])
+        self.assertEqual(history.order_failed_first(keys, test_history),
+                         [1, 3, 0, 2, 4])
+
+    def test_corrupted_store(self):
+        with open(self.path, 'w') as store:
+            store.write('{not json')
+        test_history = history.TestHistory(self.logs_dir, self.path)
+        self.assertEqual(test_history.tests, {})
+        self.assertRaises(ValueError, history.TestHistory, self.logs_dir,
+                          self.path, True)
+        self.assertRaises(IOError, history.TestHistory, self.logs_dir,
+                          os.path.join(self.tmpdir, 'missing'), True)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
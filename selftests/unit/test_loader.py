@@ -1,9 +1,11 @@
+import multiprocessing
 import os
 import shutil
 import stat
 import tempfile
 import unittest.mock
 
+from avocado.core import discovery_cache
 from avocado.core import test
 from avocado.core import loader
 from avocado.utils import script
@@ -211,6 +213,11 @@ class SampleTest(TestCase):
 """
 
 
+def _find_lines(path):
+    with open(path) as test_file:
+        return test_file.read().splitlines()
+
+
 class LoaderTest(unittest.TestCase):
 
     def _check_discovery(self, exps, tests):
@@ -230,9 +237,16 @@ class LoaderTest(unittest.TestCase):
                                  % (details, exps, tests))
 
     def setUp(self):
-        self.loader = loader.FileLoader(None, {})
         prefix = temp_dir_prefix(__name__, self, 'setUp')
         self.tmpdir = tempfile.mkdtemp(prefix=prefix)
+        # Keep the discovery cache out of the avocado data dir
+        self.datadir = tempfile.mkdtemp(prefix=prefix)
+        patcher = unittest.mock.patch(
+            'avocado.core.discovery_cache.data_dir.get_datafile_path',
+            lambda *args: os.path.join(self.datadir, *args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.loader = loader.FileLoader(None, {})
 
     def test_load_simple(self):
         simple_test = script.TemporaryScript('simpletest.sh', SIMPLE_TEST,
@@ -474,8 +488,98 @@ class LoaderTest(unittest.TestCase):
                 tests = self.loader.discover(simple_test.path)
                 self.assertEqual(tests[0][1]["name"], simple_test.path)
 
+    def test_discover_parallel(self):
+        for i in range(10):
+            name = os.path.join(self.tmpdir, 'test%d.py' % i)
+            with open(name, 'w') as test_file:
+                test_file.write(AVOCADO_TEST_OK)
+        with open(os.path.join(self.tmpdir, 'simple.sh'), 'w') as test_file:
+            test_file.write(SIMPLE_TEST)
+        os.chmod(test_file.name, 0o775)
+        os.symlink(os.path.join(self.tmpdir, 'missing'),
+                   os.path.join(self.tmpdir, 'broken'))
+        for which_tests in (loader.DiscoverMode.DEFAULT,
+                            loader.DiscoverMode.ALL):
+            serial = self.loader.discover(self.tmpdir, which_tests)
+            with unittest.mock.patch('avocado.core.loader.'
+                                     'PARALLEL_DISCOVERY_MIN_FILES', 2):
+                with unittest.mock.patch('avocado.core.loader.'
+                                         'get_discovery_processes',
+                                         return_value=3):
+                    parallel = self.loader.discover(self.tmpdir, which_tests)
+            self.assertEqual(parallel, serial)
+        self.assertEqual(len(parallel), 12)
+        self.assertEqual(parallel[0][0], loader.BrokenSymlink)
+        self.assertEqual(parallel[1][0], test.SimpleTest)
+
+    def test_iter_file_discovery(self):
+        paths = []
+        for i in range(10):
+            paths.append(os.path.join(self.tmpdir, 'file%d' % i))
+            with open(paths[-1], 'w') as test_file:
+                test_file.write('test%d\nother%d\n' % (i, i))
+        serial = list(loader.iter_file_discovery('lines', _find_lines, paths))
+        self.assertEqual(serial[3], ['test3', 'other3'])
+        cache_path = os.path.join(self.tmpdir, 'cache.json')
+        cache = discovery_cache.DiscoveryCache(cache_path)
+        with unittest.mock.patch('avocado.core.loader.'
+                                 'PARALLEL_DISCOVERY_MIN_FILES', 2):
+            with unittest.mock.patch('avocado.core.loader.'
+                                     'get_discovery_processes',
+                                     return_value=3):
+                parallel = list(loader.iter_file_discovery(
+                    'lines', _find_lines, paths, cache))
+        self.assertEqual(parallel, serial)
+        # The entries added by the processes are merged
+        self.assertEqual(len(cache.entries), 10)
+        cache.save()
+        cache = discovery_cache.DiscoveryCache(cache_path)
+        find = unittest.mock.Mock(side_effect=AssertionError)
+        cached = list(loader.iter_file_discovery('lines', find, paths, cache))
+        self.assertEqual(cached, serial)
+
+    def test_iter_file_discovery_start_method(self):
+        paths = []
+        for i in range(4):
+            paths.append(os.path.join(self.tmpdir, 'file%d' % i))
+            with open(paths[-1], 'w') as test_file:
+                test_file.write('test%d\n' % i)
+        cache = discovery_cache.DiscoveryCache(os.path.join(self.tmpdir,
+                                                            'cache.json'))
+        start_method = multiprocessing.get_start_method(allow_none=True)
+        multiprocessing.set_start_method('spawn', force=True)
+        try:
+            with unittest.mock.patch('avocado.core.loader.'
+                                     'get_discovery_processes',
+                                     return_value=2):
+                # The processes are forked anyway, to inherit the cache
+                tests = list(loader.iter_file_discovery(
+                    'lines', _find_lines, paths, cache, 2))
+        finally:
+            multiprocessing.set_start_method(start_method, force=True)
+        self.assertEqual(tests, [['test0'], ['test1'], ['test2'], ['test3']])
+        self.assertEqual(len(cache.entries), 4)
+        # Discovered by the avocado process when it can't fork
+        with unittest.mock.patch('avocado.core.loader.multiprocessing.'
+                                 'get_context', side_effect=ValueError):
+            self.assertEqual(loader._get_discovery_executor(100, 2), (None, 1))
+
+    def test_iter_file_discovery_error(self):
+        path = os.path.join(self.tmpdir, 'file')
+        open(path, 'w').close()
+        missing = os.path.join(self.tmpdir, 'missing')
+        cache = discovery_cache.DiscoveryCache(os.path.join(self.tmpdir,
+                                                            'cache.json'))
+        tests = list(loader.iter_file_discovery('lines', _find_lines,
+                                                [missing, path], cache))
+        self.assertIsInstance(tests[0], IOError)
+        self.assertEqual(tests[1], [])
+        # Errors are not cached
+        self.assertEqual(list(cache.entries), ['lines:%s' % path])
+
     def tearDown(self):
         shutil.rmtree(self.tmpdir)
+        shutil.rmtree(self.datadir)
 
 
 class TagFilter(unittest.TestCase):
@@ -485,7 +589,9 @@ class TagFilter(unittest.TestCase):
                                     AVOCADO_TEST_TAGS,
                                     'avocado_loader_unittest',
                                     DEFAULT_NON_EXEC_MODE) as test_script:
-            this_loader = loader.FileLoader(None, {})
+            with unittest.mock.patch('avocado.core.loader.discovery_cache.'
+                                     'is_enabled', return_value=False):
+                this_loader = loader.FileLoader(None, {})
             self.test_suite = this_loader.discover(test_script.path,
                                                    loader.DiscoverMode.ALL)
 
@@ -669,7 +775,9 @@ class TagFilter2(unittest.TestCase):
                                     AVOCADO_TEST_OK,
                                     'avocado_loader_unittest',
                                     DEFAULT_NON_EXEC_MODE) as test_script:
-            this_loader = loader.FileLoader(None, {})
+            with unittest.mock.patch('avocado.core.loader.discovery_cache.'
+                                     'is_enabled', return_value=False):
+                this_loader = loader.FileLoader(None, {})
             test_suite = this_loader.discover(test_script.path,
                                               loader.DiscoverMode.ALL)
         self.assertEqual([], loader.filter_test_tags(test_suite, [], False, False))
@@ -694,5 +802,95 @@ class ParseFilterByTags(unittest.TestCase):
                           (set([]), set(['FOO', 'BAR', 'BAZ']))])
 
 
+class CompiledTagFilter(unittest.TestCase):
+
+    def setUp(self):
+        tags = [{}, {'fast': None}, {'fast': None, 'net': None},
+                {'arch': set(['x86_64'])}, {'arch': set(['ppc64', 'x86_64'])},
+                {'arch': None, 'slow': None}, {'slow': None, 'disk': None},
+                {'arch': set(['ppc64']), 'fast': None}]
+        self.test_suite = [('Test', {'name': 'test%d' % i, 'tags': tag})
+                           for i, tag in enumerate(tags)]
+        self.test_suite.append(('Test', {'name': 'no-tags'}))
+
+    def test_index(self):
+        index = loader.TagIndex(self.test_suite)
+        self.assertEqual(index.size, 9)
+        self.assertEqual(index.untagged, set([0, 8]))
+        self.assertEqual(index.keys['fast'], set([1, 2, 7]))
+        self.assertEqual(index.keys['arch'], set([3, 4, 5, 7]))
+        self.assertEqual(index.key_vals[('arch', 'x86_64')], set([3, 4]))
+
+    def test_same_as_matches(self):
+        filters = [['fast'], ['-fast'], ['fast,net'], ['fast', 'slow'],
+                   ['arch:x86_64'], ['arch:ppc64,-fast'], ['arch'],
+                   ['-arch,-slow'], ['arch:x86_64,arch'], ['missing'],
+                   ['-missing'], ['slow,-disk', 'arch:ppc64']]
+        index = loader.TagIndex(self.test_suite)
+        for filter_by_tags in filters:
+            for include_empty in (False, True):
+                for include_empty_key in (False, True):
+                    tag_filter = loader.TagFilter(filter_by_tags,
+                                                  include_empty,
+                                                  include_empty_key)
+                    expected = [test for test in self.test_suite
+                                if tag_filter.matches(test[1].get('tags'))]
+                    self.assertEqual(tag_filter.filter(self.test_suite,
+                                                       index),
+                                     expected,
+                                     "%s, %s, %s" % (filter_by_tags,
+                                                     include_empty,
+                                                     include_empty_key))
+
+    def test_filter(self):
+        names = [test[1]['name'] for test in loader.filter_test_tags(
+            self.test_suite, ['arch:x86_64', 'slow,-arch'], False, True)]
+        self.assertEqual(names, ['test1', 'test2', 'test3', 'test4',
+                                 'test6'])
+
+
+class LoaderProxy(unittest.TestCase):
+
+    @staticmethod
+    def _get_loader_plugin(tests):
+        loader_plugin = unittest.mock.Mock(spec=loader.TestLoader)
+        loader_plugin.iter_discover.side_effect = (
+            lambda reference, which_tests: iter([tests.get(reference, [])]))
+        loader_plugin.get_full_type_label_mapping.return_value = {}
+        loader_plugin.get_full_decorator_mapping.return_value = {}
+        return loader_plugin
+
+    def test_prefetch(self):
+        references = ['first', 'second']
+        first_test = (test.SimpleTest, {'name': 'first'})
+        second_test = (test.SimpleTest, {'name': 'second'})
+        proxy = loader.TestLoaderProxy()
+        first = self._get_loader_plugin({'first': [first_test]})
+        second = self._get_loader_plugin({'second': [second_test]})
+        proxy._initialized_plugins = [first, second]
+        self.assertEqual(list(proxy.iter_discover(references)),
+                         [first_test, second_test])
+        # Only the first loader inspects all the references
+        first.prefetch.assert_called_once_with(references,
+                                               loader.DiscoverMode.DEFAULT)
+        second.prefetch.assert_not_called()
+        # Unless all the loaders are used
+        first.prefetch.reset_mock()
+        proxy.discover(references, loader.DiscoverMode.ALL)
+        first.prefetch.assert_called_once_with(references,
+                                               loader.DiscoverMode.ALL)
+        second.prefetch.assert_called_once_with(references,
+                                                loader.DiscoverMode.ALL)
+
+    def test_prefetch_error(self):
+        first_test = (test.SimpleTest, {'name': 'first'})
+        proxy = loader.TestLoaderProxy()
+        first = self._get_loader_plugin({'first': [first_test]})
+        first.prefetch.side_effect = RuntimeError
+        proxy._initialized_plugins = [first]
+        # The references are still discovered one by one
+        self.assertEqual(proxy.discover(['first']), [first_test])
+
+
 if __name__ == '__main__':
     unittest.main()
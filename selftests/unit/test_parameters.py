@@ -50,6 +50,60 @@ class Parameters(unittest.TestCase):
         # Note: Different origin of the same value, which should produce
         # a crash, are tested in yaml2mux selftest
 
+    def test_leaves_index(self):
+        root = tree.TreeNode()
+        foo = root.get_node("/run/foo", True)
+        foo.value = {'timeout': 1}
+        bar = root.get_node("/run/bar", True)
+        bar.value = {'other': 2}
+        leaves = [foo, bar]
+        index = parameters.LeavesIndex(leaves)
+        path = parameters.AvocadoParams._greedy_path_to_re('/run/*')
+        self.assertIs(parameters.AvocadoParams._greedy_path_to_re('/run/*'),
+                      path)
+        self.assertEqual(index.get_leaves(path), [foo, bar])
+        self.assertEqual(index.get_leaves(path, 'timeout'), [foo])
+        self.assertEqual(index.get_leaves(path, 'missing'), [])
+        path = parameters.AvocadoParams._greedy_path_to_re('bar/*')
+        self.assertEqual(index.get_leaves(path), [bar])
+        self.assertEqual(index.get_leaves(path, 'timeout'), [])
+        params = parameters.AvocadoParams(leaves, ['/run/*'])
+        self.assertEqual(params.get('timeout'), 1)
+        self.assertEqual(params.get('other'), 2)
+        self.assertEqual(params.get('timeout', '/run/bar/*', 3), 3)
+
+    def test_environment_dirty(self):
+        foo = tree.TreeNode().get_node("/run/foo", True)
+        foo.value = {'a': 1}
+        params = parameters.AvocadoParams([foo], ['/run/*'])
+        self.assertEqual(params.get('a'), 1)
+        foo.value['b'] = 2
+        foo.set_environment_dirty()
+        params = parameters.AvocadoParams([foo], ['/run/*'])
+        self.assertEqual(params.get('b'), 2)
+
+    def test_flattened(self):
+        root = tree.TreeNode()
+        root.value = {'timeout': 1}
+        foo = root.get_node("/run/foo", True)
+        foo.value = {'foo': 2}
+        bar = root.get_node("/run/bar", True)
+        params = parameters.AvocadoParams([foo, bar], ['/run/*'])
+        # Inherited values are reported once
+        expected = (('/', 'timeout', 1), ('/run/foo', 'foo', 2))
+        self.assertEqual(params.get_flattened(), expected)
+        self.assertEqual(tuple(params.iteritems()), expected)
+        self.assertIs(params.get_flattened(), params.get_flattened())
+        other = parameters.AvocadoParams([foo, bar], ['/run/*'])
+        self.assertEqual(other, params)
+        # New params see the changes of the leaves
+        foo.value['foo'] = 5
+        foo.set_environment_dirty()
+        other = parameters.AvocadoParams([foo, bar], ['/run/*'])
+        self.assertEqual(other.get('foo'), 5)
+        self.assertEqual(other.get_flattened(),
+                         (('/', 'timeout', 1), ('/run/foo', 'foo', 5)))
+
 
 if __name__ == '__main__':
     unittest.main()
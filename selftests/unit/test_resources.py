@@ -0,0 +1,35 @@
+import subprocess
+import sys
+import unittest
+
+from avocado.core import resources
+
+
+class Resources(unittest.TestCase):
+
+    def test_snapshot(self):
+        usage = resources.snapshot()
+        self.assertEqual(sorted(usage), sorted(resources.KEYS))
+        self.assertGreater(usage['max_rss'], 0)
+
+    def test_usage_since_includes_children(self):
+        start = resources.snapshot()
+        subprocess.check_call([sys.executable, '-c', 'sum(range(3000000))'])
+        usage = resources.usage_since(start)
+        self.assertGreater(usage['cpu_user'] + usage['cpu_system'], 0)
+        self.assertGreaterEqual(usage['max_rss'], start['max_rss'])
+        for key in resources.KEYS:
+            self.assertGreaterEqual(usage[key], 0)
+
+    def test_format_usage(self):
+        usage = {'cpu_user': 1.5, 'cpu_system': 0.25, 'max_rss': 2048,
+                 'io_read': 512, 'io_write': 0, 'ctx_voluntary': 10,
+                 'ctx_involuntary': 2}
+        self.assertEqual(resources.format_usage(usage),
+                         "cpu 1.50s user, 0.25s system; max rss 2.0 MiB; "
+                         "io 512 B read, 0 B written; ctx switches 10 "
+                         "voluntary, 2 involuntary")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from avocado.core import result_cache
+from avocado.core import test
+from avocado.core import tree
+
+from .. import temp_dir_prefix
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        prefix = temp_dir_prefix(__name__, self, 'setUp')
+        self.tmpdir = tempfile.mkdtemp(prefix=prefix)
+        self.cache = result_cache.ResultCache(os.path.join(self.tmpdir,
+                                                           'cache'))
+        self.test_path = os.path.join(self.tmpdir, 'mytest.py')
+        with open(self.test_path, 'w') as test_file:
+            test_file.write('# test content')
+
+    def _factory(self, uid=1, value=None):
+        variant = []
+        if value is not None:
+            node = tree.TreeNode().get_node("/", True)
+            node.value = {'value': value}
+            variant = [node]
+        name = test.TestID(uid, '%s:MyTest.test' % self.test_path)
+        return ('MyTest', {'name': name,
+                           'modulePath': self.test_path,
+                           'methodName': 'test',
+                           'params': (variant, ['/'])})
+
+    def test_key(self):
+        key = self.cache.get_key(self._factory())
+        self.assertIsNotNone(key)
+        # uid does not matter
+        self.assertEqual(key, self.cache.get_key(self._factory(uid=2)))
+        # params do
+        self.assertNotEqual(key, self.cache.get_key(self._factory(value=1)))
+        self.assertNotEqual(self.cache.get_key(self._factory(value=1)),
+                            self.cache.get_key(self._factory(value=2)))
+        # test data do
+        data_dir = self.test_path + '.data'
+        os.mkdir(data_dir)
+        with open(os.path.join(data_dir, 'input'), 'w') as data_file:
+            data_file.write('data')
+        data_key = self.cache.get_key(self._factory())
+        self.assertNotEqual(key, data_key)
+        with open(os.path.join(data_dir, 'input'), 'w') as data_file:
+            data_file.write('changed data')
+        self.assertNotEqual(data_key, self.cache.get_key(self._factory()))
+        # test file does
+        key = self.cache.get_key(self._factory())
+        with open(self.test_path, 'w') as test_file:
+            test_file.write('# changed test content')
+        self.assertNotEqual(key, self.cache.get_key(self._factory()))
+
+    def test_not_cacheable(self):
+        factory = (test.DryRunTest, self._factory()[1])
+        self.assertIsNone(self.cache.get_key(factory))
+        factory = (test.SimpleTest, {'name': test.TestID(1, '/bin/true'),
+                                     'executable': '/non/existing/file'})
+        self.assertIsNone(self.cache.get_key(factory))
+
+    def test_record(self):
+        factory = self._factory()
+        key = self.cache.get_key(factory)
+        self.assertIsNone(self.cache.lookup(key))
+        self.cache.expect(factory[1]['name'], key)
+        self.cache.record({'name': factory[1]['name'], 'status': 'FAIL',
+                           'logdir': '/fail'}, 'job1')
+        self.assertIsNone(self.cache.lookup(key))
+        self.cache.expect(factory[1]['name'], key)
+        self.cache.record({'name': factory[1]['name'], 'status': 'PASS',
+                           'logdir': '/pass'}, 'job2')
+        cached = self.cache.lookup(key)
+        self.assertEqual(cached['logdir'], '/pass')
+        self.assertEqual(cached['job_id'], 'job2')
+        self.assertEqual(cached['name'], str(factory[1]['name']))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import multiprocessing
+import time
+import unittest
+
+from avocado.core.runner import TestStatus, add_runner_failure
+
+from .. import setup_avocado_loggers
+
+
+setup_avocado_loggers()
+
+
+def _sleep(duration):
+    time.sleep(duration)
+
+
+class TestStatusWait(unittest.TestCase):
+
+    """
+    Test the TestStatus wait for messages/process termination
+    """
+
+    def setUp(self):
+        self.queue = multiprocessing.SimpleQueue()
+        self.status = TestStatus(None, self.queue)
+
+    def test_wait_message(self):
+        proc = multiprocessing.Process(target=_sleep, args=(30,))
+        proc.start()
+        try:
+            self.queue.put({"early_status": True, "running": True})
+            self.assertTrue(self.status.early_status)
+            self.queue.put({"running": True, "status": "RUNNING"})
+            start = time.time()
+            self.status.wait(proc, 10)
+            self.assertLess(time.time() - start, 5)
+            self.assertEqual(self.status.status,
+                             {"running": True, "status": "RUNNING"})
+            self.assertFalse(self.status.interrupt)
+        finally:
+            proc.terminate()
+            proc.join()
+
+    def test_wait_process_finished(self):
+        proc = multiprocessing.Process(target=_sleep, args=(0.1,))
+        proc.start()
+        start = time.time()
+        while proc.is_alive():
+            self.status.wait(proc, 10)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(self.status.status, {})
+
+    def test_wait_timeout(self):
+        start = time.time()
+        self.status.wait(None, 0.1)
+        self.assertGreaterEqual(time.time() - start, 0.1)
+        self.assertEqual(self.status.status, {})
+
+    def test_messages_before_early_status(self):
+        self.queue.put({"running": True, "status": "RUNNING"})
+        self.queue.put({"early_status": True, "running": True})
+        self.queue.put({"running": False, "status": "PASS"})
+        self.assertTrue(self.status.early_status)
+        self.status.wait(None, 0)
+        self.assertEqual(self.status.status,
+                         {"running": False, "status": "PASS"})
+        self.assertTrue(self.status.interrupt)
+
+
+class RunnerFailure(unittest.TestCase):
+
+    def test_unavailable_logfile(self):
+        # Such as the log of a test executed by a lost remote worker
+        state = add_runner_failure({"status": "PASS",
+                                    "logfile": "/nonexistent/debug.log"},
+                                   "ERROR", "Worker disconnected")
+        self.assertEqual(state["status"], "ERROR")
+        self.assertIn("Worker disconnected", state["fail_reason"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ import ast
 import sys
 import os
 import re
-import unittest
+import unittest.mock
 
 from avocado.core import safeloader
 from avocado.utils import script
@@ -291,7 +291,14 @@ class FindClassAndMethods(UnlimitedDiff):
                                     'test_with_pattern_and_base_class',
                                     'test_methods_order',
                                     'test_recursive_discovery'],
-            'UnlimitedDiff': ['setUp']
+            'UnlimitedDiff': ['setUp'],
+            'ModuleIndex': ['setUp',
+                            'test_parse_once',
+                            'test_results_not_shared',
+                            'test_get_classes',
+                            'test_find_module',
+                            'test_module_index',
+                            'tearDown']
         }
         found = safeloader.find_class_and_methods(get_this_file())
         self.assertEqual(reference, found)
@@ -333,7 +340,12 @@ class FindClassAndMethods(UnlimitedDiff):
                                     'test_with_pattern_and_base_class',
                                     'test_methods_order',
                                     'test_recursive_discovery'],
-            'UnlimitedDiff': []
+            'UnlimitedDiff': [],
+            'ModuleIndex': ['test_parse_once',
+                            'test_results_not_shared',
+                            'test_get_classes',
+                            'test_find_module',
+                            'test_module_index']
         }
         found = safeloader.find_class_and_methods(get_this_file(),
                                                   re.compile(r'test.*'))
@@ -456,5 +468,86 @@ class PythonModule(unittest.TestCase):
         self.assertIn('unittest', module.mod_imports)
 
 
+class ModuleIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.base = script.TemporaryScript('recursive_discovery_test1.py',
+                                           RECURSIVE_DISCOVERY_TEST1)
+        self.base.save()
+        self.child = script.TemporaryScript('recursive_discovery_test2.py',
+                                            RECURSIVE_DISCOVERY_TEST2)
+        self.child.save()
+        sys.path.append(os.path.dirname(self.base.path))
+
+    def test_parse_once(self):
+        index = safeloader.ModuleIndex()
+        expected = safeloader.find_avocado_tests(self.child.path)
+        expected_base = safeloader.find_avocado_tests(self.base.path)
+        with unittest.mock.patch('avocado.core.safeloader.ast.parse',
+                                 wraps=ast.parse) as parse:
+            self.assertEqual(safeloader.find_avocado_tests(self.child.path,
+                                                           index),
+                             expected)
+            parsed = parse.call_count
+            # The module itself, its parent and avocado.Test module
+            self.assertEqual(parsed, 3)
+            # Only the modules of the parent classes are kept
+            self.assertEqual(safeloader.find_avocado_tests(self.base.path,
+                                                           index),
+                             expected_base)
+            self.assertEqual(parse.call_count, parsed)
+            self.assertEqual(safeloader.find_avocado_tests(self.child.path,
+                                                           index),
+                             expected)
+            self.assertEqual(parse.call_count, parsed + 1)
+
+    def test_results_not_shared(self):
+        index = safeloader.ModuleIndex()
+        tests = safeloader.find_avocado_tests(self.child.path, index)[0]
+        tests['ThirdChild'][-1][1]['new'] = None
+        tests['ThirdChild'].pop(0)
+        tests = safeloader.find_avocado_tests(self.child.path, index)[0]
+        self.assertEqual(tests['ThirdChild'][0], ('test_third_child', {}))
+        self.assertEqual(tests['ThirdChild'][-1], ('test_basic', {}))
+
+    def test_get_classes(self):
+        index = safeloader.ModuleIndex()
+        classes = index.get_classes(self.base.path)
+        self.assertEqual(sorted(classes),
+                         ['BaseClass', 'FirstChild', 'SecondChild'])
+        self.assertIs(index.get_classes(self.base.path), classes)
+
+    def test_find_module(self):
+        index = safeloader.ModuleIndex()
+        paths = [os.path.dirname(self.base.path)]
+        path = index.find_module('recursive_discovery_test1', paths)
+        self.assertEqual(path, self.base.path)
+        with unittest.mock.patch('avocado.core.safeloader.imp.find_module') \
+                as find_module:
+            self.assertEqual(index.find_module('recursive_discovery_test1',
+                                               paths),
+                             path)
+        self.assertFalse(find_module.called)
+
+    def test_module_index(self):
+        with safeloader.module_index() as index:
+            with safeloader.module_index() as inner:
+                self.assertIs(inner, index)
+            with safeloader.record_parsed_paths() as parsed:
+                safeloader.find_avocado_tests(self.child.path)
+            # Modules already in the index are recorded as well
+            with safeloader.record_parsed_paths() as parsed_again:
+                safeloader.find_avocado_tests(self.child.path)
+            self.assertEqual(parsed_again, parsed)
+            self.assertIn(self.base.path, parsed)
+        with safeloader.module_index() as other:
+            self.assertIsNot(other, index)
+
+    def tearDown(self):
+        sys.path.remove(os.path.dirname(self.base.path))
+        self.base.remove()
+        self.child.remove()
+
+
 if __name__ == '__main__':
     unittest.main()
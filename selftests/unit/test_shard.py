@@ -0,0 +1,88 @@
+import unittest
+
+from avocado.core import shard
+
+
+class FakeHistory:
+
+    def __init__(self, durations):
+        self.durations = durations
+
+    def get_time(self, key):
+        return self.durations.get(key)
+
+
+def _results(job_id, index, total, *tests):
+    return {'job_id': job_id,
+            'debuglog': '/%s/job.log' % job_id,
+            'shard': {'index': index, 'total': total},
+            'tests': [{'id': test_id, 'status': status, 'time': 1.0}
+                      for test_id, status in tests],
+            'total': len(tests),
+            'pass': len([_ for _ in tests if _[1] == 'PASS']),
+            'errors': 0,
+            'failures': len([_ for _ in tests if _[1] == 'FAIL']),
+            'skip': 0,
+            'cancel': 0,
+            'time': float(len(tests))}
+
+
+class ShardTest(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(shard.parse('1/1'), (1, 1))
+        self.assertEqual(shard.parse('3/8'), (3, 8))
+        for value in ('0/2', '3/2', '1/0', '1', '1/', 'a/2', '1/2/3', ''):
+            self.assertRaises(ValueError, shard.parse, value)
+
+    def test_split_by_hash(self):
+        keys = ['test%s.py' % _ for _ in range(50)]
+        shards = [shard.split_by_hash(keys, index, 3)
+                  for index in range(1, 4)]
+        self.assertEqual(sorted(sum(shards, [])), list(range(50)))
+        for positions in shards:
+            self.assertEqual(positions, sorted(positions))
+            self.assertTrue(positions)
+        # The shard of a test does not depend on the other tests
+        positions = shard.split_by_hash(keys[10:], 2, 3)
+        self.assertEqual([keys[10 + _] for _ in positions],
+                         [keys[_] for _ in shards[1] if _ >= 10])
+
+    def test_split_by_duration(self):
+        history = FakeHistory({'a': 10.0, 'b': 6.0, 'c': 5.0, 'd': 1.0})
+        keys = ['d', 'c', 'b', 'a', 'new']
+        shard1 = shard.split_by_duration(keys, 1, 2, history)
+        shard2 = shard.split_by_duration(keys, 2, 2, history)
+        self.assertEqual(sorted(shard1 + shard2), list(range(5)))
+        by_keys = [keys[_] for _ in shard1 if keys[_] != 'new']
+        self.assertEqual(by_keys, ['d', 'a'])
+        by_keys = [keys[_] for _ in shard2 if keys[_] != 'new']
+        self.assertEqual(by_keys, ['c', 'b'])
+
+    def test_merge(self):
+        merged = shard.merge_results([
+            _results('job2', 2, 3, ('1-c.py', 'PASS')),
+            _results('job1', 1, 3, ('1-a.py', 'PASS'), ('2-b.py', 'FAIL'))])
+        self.assertEqual([test['id'] for test in merged['tests']],
+                         ['1-a.py', '2-b.py', '3-c.py'])
+        self.assertEqual([test['shard'] for test in merged['tests']],
+                         [1, 1, 2])
+        self.assertEqual([entry['job_id'] for entry in merged['shards']],
+                         ['job1', 'job2'])
+        self.assertEqual(merged['total'], 3)
+        self.assertEqual(merged['pass'], 2)
+        self.assertEqual(merged['failures'], 1)
+        self.assertEqual(merged['time'], 3.0)
+        self.assertEqual(merged['missing'], [3])
+
+    def test_merge_invalid(self):
+        self.assertRaises(ValueError, shard.merge_results,
+                          [_results('job1', 1, 2), {'job_id': 'job2'}])
+        self.assertRaises(ValueError, shard.merge_results,
+                          [_results('job1', 1, 2), _results('job2', 2, 3)])
+        self.assertRaises(ValueError, shard.merge_results,
+                          [_results('job1', 1, 2), _results('job2', 1, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import copy
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from avocado.core import teststate
+
+
+class TestStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.logdir = tempfile.mkdtemp(prefix='avocado_' + __name__)
+        self.state = {'name': '1-test', 'logdir': self.logdir,
+                      'status': 'PASS', 'whiteboard': 'x' * 100,
+                      'params': [('/run', 'key%s' % _, _) for _ in range(20)],
+                      'traceback': 'short', 'fail_reason': None}
+
+    def test_pack_small(self):
+        self.assertIs(teststate.pack(self.state, 1000), self.state)
+        self.assertIs(teststate.pack(self.state, -1), self.state)
+        self.assertFalse(os.path.exists(os.path.join(self.logdir,
+                                                     teststate.STATE_DIR)))
+
+    def test_pack(self):
+        packed = teststate.pack(self.state, 50)
+        self.assertEqual(sorted(packed[teststate.EXTERNAL_KEY]),
+                         ['params', 'whiteboard'])
+        self.assertNotIn('whiteboard', packed)
+        self.assertNotIn('params', packed)
+        self.assertEqual(packed['traceback'], 'short')
+        self.assertIn('whiteboard', self.state)
+        self.assertLess(len(pickle.dumps(packed)),
+                        len(pickle.dumps(self.state)))
+        # The same values are stored only once
+        again = teststate.pack(self.state, 50)
+        self.assertEqual(again[teststate.EXTERNAL_KEY],
+                         packed[teststate.EXTERNAL_KEY])
+        self.assertEqual(len(os.listdir(os.path.join(self.logdir,
+                                                     teststate.STATE_DIR))),
+                         2)
+
+    def test_pack_files(self):
+        self.state['traceback'] = 'y' * 100
+        packed = teststate.pack(self.state, 50)
+        paths = packed[teststate.EXTERNAL_KEY]
+        with open(paths['traceback']) as state_file:
+            self.assertEqual(state_file.read(), self.state['traceback'])
+        self.assertTrue(paths['params'].endswith('.json'))
+        with open(paths['params']) as state_file:
+            self.assertEqual(json.load(state_file)[0], ['/run', 'key0', 0])
+        state = teststate.unpack(packed)
+        self.assertEqual(state['params'], self.state['params'])
+
+    def test_pack_not_json(self):
+        # Values which are not kept as they are by JSON are not stored
+        self.state['params'] = [('/run', 'key%s' % _, (_, object))
+                                for _ in range(20)]
+        self.assertIs(teststate.pack(self.state, 50)['params'],
+                      self.state['params'])
+        self.state['params'] = [('/run', 'key%s' % _, (_,))
+                                for _ in range(20)]
+        self.assertIs(teststate.pack(self.state, 50)['params'],
+                      self.state['params'])
+
+    def test_pack_unable_to_store(self):
+        self.state['logdir'] = os.path.join(self.logdir, 'file')
+        open(self.state['logdir'], 'w').close()
+        self.assertIs(teststate.pack(self.state, 50), self.state)
+
+    def test_unpack(self):
+        msg = {'func_at_exit': 'something'}
+        self.assertIs(teststate.unpack(msg), msg)
+        state = teststate.unpack(pickle.loads(pickle.dumps(
+            teststate.pack(self.state, 50))))
+        self.assertIsInstance(state, teststate.TestState)
+        self.assertEqual(state, self.state)
+        self.assertEqual(dict(state), self.state)
+        self.assertEqual(state.copy(), self.state)
+        self.assertEqual(copy.deepcopy(state), self.state)
+        self.assertEqual(pickle.loads(pickle.dumps(state)), self.state)
+        self.assertEqual(sorted(state), sorted(self.state))
+        self.assertEqual(len(state), len(self.state))
+        self.assertEqual(state['whiteboard'], self.state['whiteboard'])
+        self.assertEqual(state.get('params'), self.state['params'])
+        self.assertIn('params', state)
+        self.assertIsNone(state.get('missing'))
+        self.assertNotIn(teststate.EXTERNAL_KEY, state)
+
+    def test_modify(self):
+        state = teststate.unpack(teststate.pack(self.state, 50))
+        state['whiteboard'] = 'new'
+        self.assertEqual(state['whiteboard'], 'new')
+        self.assertEqual(len(state), len(self.state))
+        self.assertEqual(state.pop('params'), self.state['params'])
+        self.assertNotIn('params', state)
+        self.assertEqual(state.setdefault('params', []), [])
+        del state['whiteboard']
+        self.assertNotIn('whiteboard', state)
+        self.assertRaises(KeyError, state.__getitem__, 'whiteboard')
+
+    def test_missing_file(self):
+        state = teststate.unpack(teststate.pack(self.state, 50))
+        shutil.rmtree(os.path.join(self.logdir, teststate.STATE_DIR))
+        self.assertIsNone(state['whiteboard'])
+        self.assertEqual(state['status'], 'PASS')
+
+    def tearDown(self):
+        shutil.rmtree(self.logdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from avocado.core import timebox
+
+
+class FakeHistory:
+
+    def __init__(self, durations):
+        self.durations = durations
+
+    def get_time(self, key):
+        return self.durations.get(key)
+
+
+class TimeboxTest(unittest.TestCase):
+
+    def test_get_priority(self):
+        self.assertEqual(timebox.get_priority(None), timebox.DEFAULT_PRIORITY)
+        self.assertEqual(timebox.get_priority({'fast': None}),
+                         timebox.DEFAULT_PRIORITY)
+        self.assertEqual(timebox.get_priority({'priority': {'3'}}), 3)
+        self.assertEqual(timebox.get_priority({'priority': {'2', '7', 'x'}}),
+                         7)
+        self.assertEqual(timebox.get_priority({'priority': {'high'}}),
+                         timebox.DEFAULT_PRIORITY)
+
+    def test_plan_all_fit(self):
+        history = FakeHistory({'a': 1.0, 'b': 2.0, 'c': 3.0})
+        chosen, left_out, projected = timebox.plan(['a', 'b', 'c'], history,
+                                                   10)
+        self.assertEqual(chosen, [0, 1, 2])
+        self.assertEqual(left_out, [])
+        self.assertEqual(projected, 6.0)
+
+    def test_plan_value(self):
+        history = FakeHistory({'a': 8.0, 'b': 2.0, 'c': 3.0, 'd': 4.0})
+        chosen, left_out, projected = timebox.plan(['a', 'b', 'c', 'd'],
+                                                   history, 10)
+        # The shortest tests first, "a" does not fit anymore
+        self.assertEqual(chosen, [1, 2, 3])
+        self.assertEqual(left_out, [0])
+        self.assertEqual(projected, 9.0)
+        # Unless it's worth it
+        chosen, left_out, projected = timebox.plan(['a', 'b', 'c', 'd'],
+                                                   history, 10,
+                                                   priorities=[10, 1, 1, 1])
+        self.assertEqual(chosen, [0, 1])
+        self.assertEqual(left_out, [2, 3])
+        self.assertEqual(projected, 10.0)
+
+    def test_plan_priority(self):
+        history = FakeHistory({'a': 8.0, 'b': 2.0, 'c': 3.0, 'd': 4.0})
+        chosen, left_out, _ = timebox.plan(['a', 'b', 'c', 'd'], history, 10,
+                                           priorities=[1, 1, 2, 2],
+                                           mode='priority')
+        # The highest priority first, then the shortest that fit
+        self.assertEqual(chosen, [2, 3, 1])
+        self.assertEqual(left_out, [0])
+
+    def test_plan_slots(self):
+        history = FakeHistory({'a': 6.0, 'b': 5.0, 'c': 4.0, 'd': 3.0,
+                               'e': 1.0})
+        keys = ['a', 'b', 'c', 'd', 'e']
+        chosen, left_out, projected = timebox.plan(keys, history, 7, slots=2,
+                                                   mode='priority')
+        # e (0-1) and c (1-5) in one slot, d (0-3) in the other one, then
+        # b and a don't fit anymore
+        self.assertEqual(chosen, [4, 3, 2])
+        self.assertEqual(left_out, [0, 1])
+        self.assertEqual(projected, 5.0)
+
+    def test_plan_unknown(self):
+        history = FakeHistory({'a': 2.0, 'b': 4.0})
+        chosen, left_out, projected = timebox.plan(['new', 'a', 'b'],
+                                                   history, 6)
+        # "new" is expected to take 3s
+        self.assertEqual(chosen, [1, 0])
+        self.assertEqual(left_out, [2])
+        self.assertEqual(projected, 5.0)
+        # No plan without any known duration
+        self.assertIsNone(timebox.plan(['x', 'y'], FakeHistory({}), 1))
+
+    def test_plan_invalid_mode(self):
+        self.assertRaises(ValueError, timebox.plan, ['a'], FakeHistory({}),
+                          1, mode='random')
+
+
+if __name__ == '__main__':
+    unittest.main()
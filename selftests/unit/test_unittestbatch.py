@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest.mock
+
+from avocado.core import test
+from avocado.core import unittestbatch
+
+from .. import temp_dir_prefix
+
+
+MODULE = """import os
+import unittest
+
+class Batch(unittest.TestCase):
+    def test_pass(self):
+        print("pid %s" % os.getpid())
+
+    def test_fail(self):
+        print("pid %s" % os.getpid())
+        self.fail("boom")
+
+    def test_skip(self):
+        self.skipTest("skipped")
+"""
+
+
+class UnittestBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        prefix = temp_dir_prefix(__name__, self, 'setUp')
+        self.tmpdir = tempfile.mkdtemp(prefix=prefix)
+        self.records_dir = os.path.join(self.tmpdir, 'records')
+        with open(os.path.join(self.tmpdir, 'batchmod.py'), 'w') as module:
+            module.write(MODULE)
+
+    def _factory(self, name, klass=test.PythonUnittest):
+        return (klass, {'name': test.TestID(1, name),
+                        'test_dir': self.tmpdir})
+
+    def _pop_output(self, name):
+        return unittestbatch.pop_output(self.records_dir, self.tmpdir, name,
+                                        'python -m unittest %s' % name)
+
+    def test_batch_key(self):
+        self.assertEqual(unittestbatch.get_batch_key(
+            self._factory('pkg.mod.Class.test')), (self.tmpdir, 'pkg.mod'))
+
+    def test_run_batch(self):
+        os.makedirs(self.records_dir)
+        names = ['batchmod.Batch.test_pass', 'batchmod.Batch.test_fail',
+                 'batchmod.Batch.test_skip']
+        self.assertEqual(unittestbatch.run_batch(self.records_dir,
+                                                 self.tmpdir, names), 0)
+        passed, failed, skipped = [self._pop_output(name).replay()
+                                   for name in names]
+        self.assertEqual(passed.exit_status, 0)
+        self.assertIn(b"Ran 1 test in", passed.stderr)
+        self.assertEqual(failed.exit_status, 1)
+        self.assertIn(b"FAILED (failures=1)", failed.stderr)
+        self.assertIn(b"boom", failed.stderr)
+        self.assertEqual(skipped.exit_status, 0)
+        self.assertIn(b"OK (skipped=1)", skipped.stderr)
+        # All the methods were executed by the same interpreter
+        self.assertEqual(passed.stdout, failed.stdout)
+        self.assertTrue(passed.stdout.startswith(b"pid "))
+        # The records are taken
+        self.assertIsNone(self._pop_output(names[0]))
+
+    def test_iter_batched(self):
+        factories = [self._factory('batchmod.Batch.test_pass'),
+                     self._factory('batchmod.Batch.test_fail'),
+                     self._factory('batchmod.Batch.test_skip'),
+                     self._factory('other.Other.test', test.SimpleTest),
+                     self._factory('batchmod.Batch.test_pass')]
+        items = list(enumerate(factories))
+        batches = unittest.mock.Mock()
+        result = []
+        for item in unittestbatch.iter_batched(
+                iter(items), 2,
+                lambda factory: factory[0] is test.PythonUnittest, batches):
+            # The batch is submitted before its tests are yielded
+            result.append((item, batches.submit.call_count))
+        self.assertEqual([item for item, _ in result], items)
+        self.assertEqual([count for _, count in result], [1, 1, 1, 1, 1])
+        # Batches are limited by their size and a single test is executed
+        # as usual
+        batches.submit.assert_called_once_with(
+            self.tmpdir, ['batchmod.Batch.test_pass',
+                          'batchmod.Batch.test_fail'])
+
+    def test_batches(self):
+        names = ['batchmod.Batch.test_pass', 'batchmod.Batch.test_fail']
+        batches = unittestbatch.Batches(self.records_dir)
+        batches.submit(self.tmpdir, names)
+        passed = unittestbatch.wait_output(self.records_dir, self.tmpdir,
+                                           names[0], 'command')
+        self.assertEqual(passed.record['exit_status'], 0)
+        failed = unittestbatch.wait_output(self.records_dir, self.tmpdir,
+                                           names[1], 'command')
+        self.assertEqual(failed.record['exit_status'], 1)
+        batches.close()
+        self.assertFalse(os.path.exists(self.records_dir))
+
+    def test_batches_deadline(self):
+        names = ['batchmod.Batch.test_pass', 'batchmod.Batch.test_fail']
+        batches = unittestbatch.Batches(self.records_dir, time.time() - 1)
+        with unittest.mock.patch('avocado.core.unittestbatch.run_batch') \
+                as run_batch:
+            batches.submit(self.tmpdir, names)
+            self.assertIn(self._pop_output(names[0]),
+                          (unittestbatch.PENDING, None))
+            # Not executed after the job deadline, the tests execute the
+            # methods themselves
+            self.assertIsNone(unittestbatch.wait_output(
+                self.records_dir, self.tmpdir, names[0], 'command'))
+            batches.close()
+        self.assertFalse(run_batch.called)
+
+    def test_batches_dead(self):
+        names = ['batchmod.Batch.test_pass', 'batchmod.Batch.test_fail']
+        batches = unittestbatch.Batches(self.records_dir)
+        batches.timeout = 0.2
+        with unittest.mock.patch('avocado.core.unittestbatch.PENDING_GRACE',
+                                 0):
+            with unittest.mock.patch.object(batches, '_execute'):
+                batches.submit(self.tmpdir, names)
+                self.assertIs(self._pop_output(names[0]),
+                              unittestbatch.PENDING)
+                # The batch is never executed, the tests stop waiting for
+                # it once it's past its timeout
+                self.assertIsNone(unittestbatch.wait_output(
+                    self.records_dir, self.tmpdir, names[0], 'command'))
+                self.assertIsNone(self._pop_output(names[1]))
+        batches.close()
+        self.assertFalse(os.path.exists(self.records_dir))
+
+    def test_not_popped_by_init(self):
+        os.makedirs(self.records_dir)
+        name = 'batchmod.Batch.test_pass'
+        unittestbatch.run_batch(self.records_dir, self.tmpdir, [name])
+        job = unittest.mock.Mock(logdir=self.tmpdir, tmpdir=self.tmpdir,
+                                 args=None)
+        with unittest.mock.patch('avocado.core.unittestbatch.RECORDS_DIR',
+                                 'records'):
+            for uid in (1, 2):
+                test.PythonUnittest(test.TestID(uid, name),
+                                    base_logdir=self.tmpdir, job=job,
+                                    test_dir=self.tmpdir)
+        self.assertIsNotNone(self._pop_output(name))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import signal
+import tempfile
+import unittest.mock
+
+from avocado.core import isolation
+from avocado.utils import cgroup
+
+from .. import temp_dir_prefix
+
+
+class CgroupTest(unittest.TestCase):
+
+    def setUp(self):
+        prefix = temp_dir_prefix(__name__, self, 'setUp')
+        self.tmpdir = tempfile.mkdtemp(prefix=prefix)
+        self.cgroup = cgroup.Cgroup(self.tmpdir)
+
+    def write(self, name, content):
+        with open(os.path.join(self.tmpdir, name), 'w') as cgroup_file:
+            cgroup_file.write(content)
+
+    def read(self, name):
+        with open(os.path.join(self.tmpdir, name)) as cgroup_file:
+            return cgroup_file.read()
+
+    def test_get_processes(self):
+        self.write('cgroup.procs', '12\n345\n')
+        self.assertEqual(self.cgroup.get_processes(), [12, 345])
+
+    def test_is_populated(self):
+        self.write('cgroup.events', 'populated 1\nfrozen 0\n')
+        self.assertTrue(self.cgroup.is_populated())
+        self.write('cgroup.events', 'populated 0\nfrozen 0\n')
+        self.assertFalse(self.cgroup.is_populated())
+
+    def test_enable_controllers(self):
+        self.write('cgroup.controllers', 'cpu io memory\n')
+        self.write('cgroup.subtree_control', 'cpu memory\n')
+        with unittest.mock.patch.object(self.cgroup, '_write') as write:
+            self.assertEqual(self.cgroup.enable_controllers(),
+                             ['cpu', 'memory'])
+        self.assertEqual(write.call_args_list,
+                         [unittest.mock.call('cgroup.subtree_control', '+cpu'),
+                          unittest.mock.call('cgroup.subtree_control',
+                                             '+memory')])
+
+    def test_children(self):
+        child = self.cgroup.child('test-1')
+        self.assertFalse(child.exists())
+        child.create()
+        child.create()
+        self.assertTrue(child.exists())
+        self.assertEqual([_.path for _ in self.cgroup.children()],
+                         [child.path])
+
+    def test_kill(self):
+        self.write('cgroup.kill', '')
+        self.cgroup.kill(signal.SIGKILL)
+        self.assertEqual(self.read('cgroup.kill'), '1')
+
+    def test_set_limit_error(self):
+        self.assertRaises(cgroup.CgroupError, self.cgroup.set_limit,
+                          os.path.join('missing', 'memory.max'), '1G')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+class TestCgroupsLimits(unittest.TestCase):
+
+    def test_get_limits(self):
+        test_cgroups = isolation.TestCgroups.__new__(isolation.TestCgroups)
+        test_cgroups.defaults = {'cgroup_cpu_max': '',
+                                 'cgroup_memory_max': '1G',
+                                 'cgroup_pids_max': None}
+        test = unittest.mock.Mock()
+        test.params.get = {'cgroup_pids_max': 100}.get
+        test.tags = {'cgroup_cpu_max': set(['50000/100000']),
+                     'fast': None}
+        self.assertEqual(test_cgroups.get_limits(test),
+                         [('cpu.max', '50000 100000'),
+                          ('memory.max', '1G'),
+                          ('pids.max', '100')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,10 @@ import io
 import logging
 import os
 import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
 import unittest.mock
 import sys
 import time
@@ -12,6 +16,7 @@ from avocado.utils import script
 from avocado.utils import gdb
 from avocado.utils import process
 from avocado.utils import path
+from avocado.utils import wait
 
 from .. import setup_avocado_loggers
 
@@ -508,23 +513,23 @@ class MiscProcessTests(unittest.TestCase):
 
     @unittest.mock.patch('avocado.utils.process.time.sleep')
     @unittest.mock.patch('avocado.utils.process.safe_kill')
-    @unittest.mock.patch('avocado.utils.process.get_children_pids')
-    def test_kill_process_tree_nowait(self, get_children_pids, safe_kill,
+    @unittest.mock.patch('avocado.utils.process.ProcessTable')
+    def test_kill_process_tree_nowait(self, table, safe_kill,
                                       sleep):
         safe_kill.return_value = True
-        get_children_pids.return_value = []
+        table.return_value.get_children_pids.return_value = []
         self.assertEqual([1], process.kill_process_tree(1))
         self.assertEqual(sleep.call_count, 0)
 
     @unittest.mock.patch('avocado.utils.process.safe_kill')
-    @unittest.mock.patch('avocado.utils.process.get_children_pids')
+    @unittest.mock.patch('avocado.utils.process.ProcessTable')
     @unittest.mock.patch('avocado.utils.process.time.time')
     @unittest.mock.patch('avocado.utils.process.time.sleep')
     @unittest.mock.patch('avocado.utils.process.pid_exists')
     def test_kill_process_tree_timeout_3s(self, pid_exists, sleep, p_time,
-                                          get_children_pids, safe_kill):
+                                          table, safe_kill):
         safe_kill.return_value = True
-        get_children_pids.return_value = []
+        table.return_value.get_children_pids.return_value = []
         p_time.side_effect = [500, 502, 502, 502, 502, 502, 502,
                               504, 504, 504, 520, 520, 520]
         sleep.return_value = None
@@ -534,15 +539,15 @@ class MiscProcessTests(unittest.TestCase):
         self.assertLess(p_time.call_count, 10)
 
     @unittest.mock.patch('avocado.utils.process.safe_kill')
-    @unittest.mock.patch('avocado.utils.process.get_children_pids')
+    @unittest.mock.patch('avocado.utils.process.ProcessTable')
     @unittest.mock.patch('avocado.utils.process.time.time')
     @unittest.mock.patch('avocado.utils.process.time.sleep')
     @unittest.mock.patch('avocado.utils.process.pid_exists')
     def test_kill_process_tree_dont_timeout_3s(self, pid_exists, sleep,
-                                               p_time, get_children_pids,
+                                               p_time, table,
                                                safe_kill):
         safe_kill.return_value = True
-        get_children_pids.return_value = []
+        table.return_value.get_children_pids.return_value = []
         p_time.side_effect = [500, 502, 502, 502, 502, 502, 502, 502, 502, 503]
         sleep.return_value = None
         pid_exists.side_effect = [True, False]
@@ -550,14 +555,13 @@ class MiscProcessTests(unittest.TestCase):
         self.assertLess(p_time.call_count, 10)
 
     @unittest.mock.patch('avocado.utils.process.safe_kill')
-    @unittest.mock.patch('avocado.utils.process.get_children_pids')
+    @unittest.mock.patch('avocado.utils.process.ProcessTable')
     @unittest.mock.patch('avocado.utils.process.time.sleep')
     @unittest.mock.patch('avocado.utils.process.pid_exists')
     def test_kill_process_tree_dont_timeout_infinity(self, pid_exists, sleep,
-                                                     get_children_pids,
-                                                     safe_kill):
+                                                     table, safe_kill):
         safe_kill.return_value = True
-        get_children_pids.return_value = []
+        table.return_value.get_children_pids.return_value = []
         sleep.return_value = None
         pid_exists.side_effect = [True, True, True, True, True, False]
 
@@ -568,15 +572,111 @@ class MiscProcessTests(unittest.TestCase):
 
     @unittest.mock.patch('avocado.utils.process.time.sleep')
     @unittest.mock.patch('avocado.utils.process.safe_kill')
-    @unittest.mock.patch('avocado.utils.process.get_children_pids')
-    def test_kill_process_tree_children(self, get_children_pids, safe_kill,
+    @unittest.mock.patch('avocado.utils.process.ProcessTable')
+    def test_kill_process_tree_children(self, table, safe_kill,
                                         sleep):
         safe_kill.return_value = True
-        get_children_pids.side_effect = [[53, 12], [78, 58, 41], [], [13],
-                                         [], [], []]
+        children = {31: [53, 12], 53: [78, 58, 41], 58: [13]}
+        table.return_value.get_children_pids.side_effect = (
+            lambda pid: children.get(pid, []))
         self.assertEqual([31, 53, 78, 58, 13, 41, 12],
                          process.kill_process_tree(31))
         self.assertEqual(sleep.call_count, 0)
+        # The first snapshot, plus one finding no new process
+        self.assertEqual(table.call_count, 2)
+        # Stopped top-down, signaled from the leaves up
+        signals = [call[0] for call in safe_kill.call_args_list]
+        self.assertEqual(signals[:7], [(pid, signal.SIGSTOP) for pid in
+                                       [31, 53, 78, 58, 13, 41, 12]])
+        self.assertEqual(signals[7:14], [(pid, signal.SIGKILL) for pid in
+                                         [12, 41, 13, 58, 78, 53, 31]])
+
+    @unittest.mock.patch('avocado.utils.process.safe_kill')
+    @unittest.mock.patch('avocado.utils.process.ProcessTable')
+    def test_kill_process_tree_forked_meanwhile(self, table, safe_kill):
+        safe_kill.side_effect = lambda pid, sig: pid != 66
+        snapshots = [{10: [20], 20: [30]},
+                     {10: [20], 20: [30, 40, 66], 40: [50], 66: [67]},
+                     {10: [20], 20: [30, 40, 66], 40: [50], 66: [67]}]
+        tables = []
+        for snapshot in snapshots:
+            tables.append(unittest.mock.Mock())
+            tables[-1].get_children_pids.side_effect = (
+                lambda pid, snapshot=snapshot: snapshot.get(pid, []))
+        table.side_effect = tables
+        # 66 couldn't be stopped (finished), its children are ignored
+        self.assertEqual([10, 20, 30, 40, 50, 66],
+                         process.kill_process_tree(10, send_sigcont=False))
+        self.assertEqual(table.call_count, 3)
+        self.assertNotIn(unittest.mock.call(66, signal.SIGKILL),
+                         safe_kill.call_args_list)
+
+    @unittest.mock.patch('avocado.utils.process.safe_kill')
+    @unittest.mock.patch('avocado.utils.process.ProcessTable')
+    def test_kill_process_tree_table(self, table, safe_kill):
+        safe_kill.return_value = True
+        given = unittest.mock.Mock()
+        given.get_children_pids.return_value = []
+        table.return_value.get_children_pids.return_value = []
+        self.assertEqual([5], process.kill_process_tree(5, table=given))
+        given.get_children_pids.assert_called_once_with(5)
+        self.assertEqual(table.call_count, 1)
+
+    def test_process_table(self):
+        stats = {1: b'1 (init) S 0 1 1 0 -1 4194560 1 2 3 4 5 6 7 8 20 0 1 '
+                    b'0 10 1 1',
+                 7: b'7 (a (b) c) S 1 7 7 0 -1 4194560 1 2 3 4 5 6 7 8 20 0 '
+                    b'1 0 700 1 1',
+                 8: b'8 (zombie) Z 7 7 7 0 -1 4194560 1 2 3 4 5 6 7 8 20 0 '
+                    b'1 0 800 1 1',
+                 9: b'9 (sh) R 1 9 9 0 -1 4194560 1 2 3 4 5 6 7 8 20 0 1 0 '
+                    b'900 1 1',
+                 12: b'12 (sleep) S 8 7 7 0 -1 4194560 1 2 3 4 5 6 7 8 20 0 '
+                     b'1 0 1200 1 1'}
+        proc = tempfile.mkdtemp(prefix='avocado_' + __name__)
+        try:
+            for pid, stat in stats.items():
+                os.mkdir(os.path.join(proc, str(pid)))
+                with open(os.path.join(proc, str(pid), 'stat'), 'wb') as fd:
+                    fd.write(stat)
+            os.mkdir(os.path.join(proc, 'self'))
+            os.mkdir(os.path.join(proc, '15'))  # Finished meanwhile
+            table = process.ProcessTable(proc)
+        finally:
+            shutil.rmtree(proc)
+        self.assertEqual(len(table), 5)
+        self.assertNotIn(15, table)
+        self.assertEqual(table.get_parent_pid(7), 1)
+        self.assertIsNone(table.get_parent_pid(15))
+        self.assertEqual(table.get_state(9), 'R')
+        self.assertEqual(table.get_start_time(12), 1200)
+        self.assertTrue(table.is_defunct(8))
+        self.assertFalse(table.is_defunct(7))
+        self.assertEqual(table.get_children_pids(1), [7, 9])
+        self.assertEqual(table.get_children_pids(1, True), [7, 9, 8, 12])
+        self.assertEqual(table.get_children_pids(12), [])
+
+    @unittest.skipUnless(sys.platform.startswith('linux'),
+                         'Linux specific feature and test')
+    def test_process_table_self(self):
+        table = process.ProcessTable()
+        self.assertIn(os.getpid(), table)
+        self.assertEqual(table.get_parent_pid(os.getpid()), os.getppid())
+        self.assertIn(os.getpid(), table.get_children_pids(os.getppid()))
+
+    @unittest.skipUnless(sys.platform.startswith('linux'),
+                         'Linux specific feature and test')
+    def test_process_in_ptree_is_defunct(self):
+        proc = subprocess.Popen(['sleep', '10'])
+        try:
+            self.assertFalse(process.process_in_ptree_is_defunct(os.getpid()))
+            proc.kill()
+            self.assertTrue(wait.wait_for(
+                lambda: process.process_in_ptree_is_defunct(os.getpid()),
+                5, step=0.01))
+        finally:
+            proc.kill()
+            proc.wait()
 
 
 class CmdResultTests(unittest.TestCase):
@@ -0,0 +1,31 @@
+import unittest.mock
+
+from avocado.core import varianter
+
+
+class VarianterTest(unittest.TestCase):
+
+    @staticmethod
+    def _state():
+        return [{'paths': ['/run/*'], 'variant_id': 'a-1234',
+                 'variant': [('/run/a', [('/run/a', 'key', 'a')])]},
+                {'paths': ['/run/*'], 'variant_id': 'b-5678',
+                 'variant': [('/run/b', [('/run/b', 'key', 'b')])]}]
+
+    def test_variants_produced_once(self):
+        variants = varianter.Varianter(state=self._state())
+        with unittest.mock.patch.object(varianter.FakeVariantDispatcher,
+                                        '__iter__') as plugin_iter:
+            self.assertEqual(len(variants), 2)
+            self.assertEqual(variants.get_number_of_tests([1, 2, 3]), 6)
+            first = list(variants.itertests())
+            self.assertEqual([_['variant_id'] for _ in first],
+                             ['a-1234', 'b-5678'])
+            self.assertEqual(list(variants.itertests()), first)
+            self.assertIs(variants.get_variants(), variants.get_variants())
+            self.assertEqual(len(variants.dump()), 2)
+            self.assertEqual(plugin_iter.call_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
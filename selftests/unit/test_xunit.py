@@ -99,6 +99,38 @@ class xUnitSucceedTest(unittest.TestCase):
         xml_schema = xmlschema.XMLSchema(junit_xsd)
         self.assertTrue(xml_schema.is_valid(self.job.args.xunit_output))
 
+    def test_resources(self):
+        self.test1.resources = {'cpu_user': 1.5, 'cpu_system': 0.25,
+                                'max_rss': 2048, 'io_read': 0,
+                                'io_write': 4096, 'ctx_voluntary': 10,
+                                'ctx_involuntary': 2}
+        self.test_result.start_test(self.test1)
+        self.test_result.end_test(self.test1.get_state())
+        self.test_result.end_tests()
+        xunit_result = xunit.XUnitResult()
+        xunit_result.render(self.test_result, self.job)
+        dom = minidom.parse(self.job.args.xunit_output)
+        # Only recorded on request, as the Jenkins JUnit schema does not
+        # allow them
+        self.assertEqual(dom.getElementsByTagName('property'), [])
+        if SCHEMA_CAPABLE:
+            junit_xsd = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                     os.path.pardir, ".data",
+                                                     'jenkins-junit.xsd'))
+            xml_schema = xmlschema.XMLSchema(junit_xsd)
+            self.assertTrue(xml_schema.is_valid(self.job.args.xunit_output))
+        self.job.args.xunit_resources = 'on'
+        xunit_result.render(self.test_result, self.job)
+        dom = minidom.parse(self.job.args.xunit_output)
+        testcase = dom.getElementsByTagName('testcase')[0]
+        properties = {prop.attributes['name'].value:
+                      prop.attributes['value'].value
+                      for prop in testcase.getElementsByTagName('property')}
+        self.assertEqual(properties['cpu_user'], '1.5')
+        self.assertEqual(properties['max_rss'], '2048')
+        self.assertEqual(properties['io_write'], '4096')
+        self.assertEqual(len(properties), 7)
+
     def test_max_test_log_size(self):
         def get_system_out(out):
             return out[out.find(b"<system-out>"):out.find(b"<system-out/>")]
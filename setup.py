@@ -72,6 +72,7 @@ if __name__ == '__main__':
                   'tap = avocado.plugins.tap:TAP',
                   'zip_archive = avocado.plugins.archive:ArchiveCLI',
                   'json_variants = avocado.plugins.json_variants:JsonVariantsCLI',
+                  'distributed = avocado.plugins.distributed:DistributedCLI',
                   ],
               'avocado.plugins.cli.cmd': [
                   'config = avocado.plugins.config:Config',
@@ -84,6 +85,8 @@ if __name__ == '__main__':
                   'sysinfo = avocado.plugins.sysinfo:SysInfo',
                   'plugins = avocado.plugins.plugins:Plugins',
                   'diff = avocado.plugins.diff:Diff',
+                  'merge = avocado.plugins.merge:Merge',
+                  'worker = avocado.plugins.distributed:Worker',
                   ],
               'avocado.plugins.job.prepost': [
                   'jobscripts = avocado.plugins.jobscripts:JobScripts',